@@ -0,0 +1,117 @@
+"""
+PKG2020 Bulk Insert Benchmark - OWLReady2 Attribute API vs bulk_ingest.BulkLoader
+PURPOSE: Measures what the populate_* steps gain from writing columns of triples with executemany instead of creating Python
+         individuals and assigning their properties one row at a time.
+HOW: Both modes write the same --rows records into a fresh SQLite-backed World: one individual per record (two rdf:type triples),
+     a string and an integer data value, and an object edge to one of --rows / 10 hub individuals, committed every --batch records.
+     The attribute mode is what the steps did before (Cls(name), ind.prop = [value], ind.edge.append(hub)); the bulk mode calls
+     add_individuals(), add_data_values() and add_object_edges() once per batch.
+OUTPUT: Seconds, triples and seconds per million triples for each mode, and the speedup.
+USAGE: python benchmarks/bench_bulk_insert.py [--rows 200000] [--batch 50000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import pandas as pd
+from owlready2 import World, Thing, DataProperty, ObjectProperty
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(PROJECT_DIR, "scripts"))
+
+from bulk_ingest import BulkLoader  # noqa: E402
+
+
+def open_world(path):
+    """A fresh store with a Record/Hub schema shaped like the populate_* steps' (one class, two data properties, one edge)"""
+    world = World(filename=path)
+    onto = world.get_ontology("http://example.org/bench.owl#")
+    with onto:
+        class Record(Thing):
+            pass
+
+        class Hub(Thing):
+            pass
+
+        class label(DataProperty):
+            range = [str]
+
+        class year(DataProperty):
+            range = [int]
+
+        class linkedTo(ObjectProperty):
+            domain = [Record]
+            range = [Hub]
+    return world, onto
+
+
+def count_triples(world):
+    db = world.graph.db
+    return sum(db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ("objs", "datas"))
+
+
+def attribute_insert(onto, frame, batch):
+    with onto:
+        hubs = {}
+        for start in range(0, len(frame), batch):
+            for row in frame.iloc[start:start + batch].itertuples(index=False):
+                record = onto.Record(row.name)
+                record.label = [row.label]
+                record.year = [row.year]
+                if row.hub not in hubs:
+                    hubs[row.hub] = onto.Hub(row.hub)
+                record.linkedTo.append(hubs[row.hub])
+            onto.world.graph.commit()
+
+
+def bulk_insert(onto, frame, batch):
+    loader = BulkLoader(onto)
+    for start in range(0, len(frame), batch):
+        rows = frame.iloc[start:start + batch]
+        records = loader.add_individuals(onto.Record, rows["name"])
+        loader.add_data_values(onto.label, records, rows["label"])
+        loader.add_data_values(onto.year, records, rows["year"], int)
+        loader.add_object_edges(onto.linkedTo, records, loader.add_individuals(onto.Hub, rows["hub"]))
+        loader.commit()
+
+
+def run(mode, insert, frame, batch, directory):
+    world, onto = open_world(os.path.join(directory, f"{mode}.sqlite3"))
+    before = count_triples(world)
+    start = time.perf_counter()
+    insert(onto, frame, batch)
+    seconds = time.perf_counter() - start
+    nb_triples = count_triples(world) - before
+    world.close()
+    return seconds, nb_triples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Insert throughput of the OWLReady2 attribute API vs BulkLoader")
+    parser.add_argument("--rows", type=int, default=200000, help="records to insert")
+    parser.add_argument("--batch", type=int, default=50000, help="records per commit (the steps' chunk size)")
+    args = parser.parse_args()
+
+    ids = pd.RangeIndex(args.rows)
+    frame = pd.DataFrame({
+        "name": "Record_" + ids.astype(str),
+        "label": "label " + ids.astype(str),
+        "year": 1950 + ids % 70,
+        "hub": "Hub_" + (ids % max(args.rows // 10, 1)).astype(str),
+    })
+
+    print(f"{'mode':<10} {'seconds':>8} {'triples':>10} {'s / M triples':>14}")
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode, insert in [("attribute", attribute_insert), ("bulk", bulk_insert)]:
+            seconds, nb_triples = results[mode] = run(mode, insert, frame, args.batch, tmp)
+            print(f"{mode:<10} {seconds:>8.2f} {nb_triples:>10} {seconds / nb_triples * 1e6:>14.2f}")
+    if results["attribute"][1] != results["bulk"][1]:
+        print("Warning: the two modes wrote a different number of triples")
+    print(f"Speedup: {results['attribute'][0] / results['bulk'][0]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
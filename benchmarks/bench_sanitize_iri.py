@@ -0,0 +1,98 @@
+"""
+PKG2020 IRI Sanitization Benchmark - Per-Row re.sub vs Memoized vs Column-Wise
+PURPOSE: Shows what the shared iri_utils module saves over the per-script sanitize_iri copies (two uncompiled re.sub calls per row).
+HOW: Takes the heavily repeating PI_Name / ProjectNumber columns of data/OA07_NIH_Projects.csv, tiled up to --rows values, and times
+     the old function, the memoized sanitize_iri() and sanitize_series(). A cProfile run of an iterrows() loop - the populate steps'
+     access pattern - shows the share of the loop spent inside sanitization before and after.
+OUTPUT: Two tables: microseconds per value per variant, and sanitize share of the profiled row loop.
+USAGE: python benchmarks/bench_sanitize_iri.py [--rows 500000] [--profile-rows 50000]
+"""
+import argparse
+import cProfile
+import os
+import pstats
+import re
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(PROJECT_DIR, "scripts"))
+
+from iri_utils import sanitize_iri, sanitize_series, _sanitize  # noqa: E402
+
+
+def legacy_sanitize_iri(name):
+    """The copy the populate scripts used to carry"""
+    name = re.sub(r'[^a-zA-Z0-9_]', '_', str(name))
+    name = re.sub(r'_+', '_', name)
+    name = name.strip('_')
+    return name[:100] if name else "Unknown"
+
+
+def load_names(nrows):
+    """OA07 PI names and project numbers, tiled to nrows values"""
+    sample = pd.read_csv(os.path.join(PROJECT_DIR, "data", "OA07_NIH_Projects.csv"), usecols=["PI_Name", "ProjectNumber"])
+    names = pd.concat([sample["PI_Name"], sample["ProjectNumber"]]).dropna().astype(str).to_numpy()
+    return pd.Series(np.resize(names, nrows))
+
+
+def time_variants(names):
+    rows = []
+    start = time.perf_counter()
+    legacy = [legacy_sanitize_iri(name) for name in names]
+    rows.append(("legacy re.sub per row", time.perf_counter() - start))
+
+    _sanitize.cache_clear()
+    start = time.perf_counter()
+    memoized = [sanitize_iri(name) for name in names]
+    rows.append(("memoized sanitize_iri", time.perf_counter() - start))
+
+    start = time.perf_counter()
+    column = sanitize_series(names)
+    rows.append(("sanitize_series", time.perf_counter() - start))
+
+    assert legacy == memoized == column.tolist(), "variants disagree"
+    return rows
+
+
+def sanitize_share(df, sanitize):
+    """Fraction of an iterrows() loop spent inside sanitize, from cProfile"""
+    def loop():
+        for idx, row in df.iterrows():
+            sanitize(row["PI_Name"])
+            sanitize(row["ProjectNumber"])
+
+    _sanitize.cache_clear()
+    profiler = cProfile.Profile()
+    profiler.runcall(loop)
+    stats = pstats.Stats(profiler)
+    total = stats.total_tt
+    inside = sum(cumulative for (_, _, name), (_, _, _, cumulative, _) in stats.stats.items() if name == sanitize.__name__)
+    return inside / total, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost of IRI sanitization per variant")
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--profile-rows", type=int, default=50000)
+    args = parser.parse_args()
+
+    names = load_names(args.rows)
+    print(f"{len(names)} values, {names.nunique()} distinct")
+    print(f"{'variant':<24} {'seconds':>9} {'us/value':>9}")
+    for variant, seconds in time_variants(names):
+        print(f"{variant:<24} {seconds:>9.2f} {seconds / len(names) * 1e6:>9.2f}")
+
+    df = pd.DataFrame({"PI_Name": load_names(args.profile_rows), "ProjectNumber": load_names(args.profile_rows)[::-1].to_numpy()})
+    print(f"\nProfiled iterrows() loop over {len(df)} rows")
+    print(f"{'variant':<24} {'loop s':>9} {'sanitize share':>15}")
+    for variant, sanitize in [("legacy re.sub per row", legacy_sanitize_iri), ("memoized sanitize_iri", sanitize_iri)]:
+        share, total = sanitize_share(df, sanitize)
+        print(f"{variant:<24} {total:>9.2f} {share:>14.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+PKG2020 Scaling Benchmark - Every Pipeline Stage at Growing Synthetic Scales
+PURPOSE: Catches super-linear behaviour (a stage whose time or memory grows faster than its input) before production-size data does.
+HOW: For each --scales value, scripts/synthetic_data.py writes all seven OA0x tables with that many rows into a temp directory.
+     Every run_pipeline.py stage then populates one throw-away SQLite store in order, each in its own child process; wall time and
+     peak RSS come from wait4(). The N-Triples export of the finished store is timed as one more stage. Stages run without the
+     orchestrator's row digests or parallel waves, so each number is the stage alone.
+KEY FEATURE: The growth exponent between consecutive scales (log time / log rows) is printed per stage; above 1.15 it is flagged.
+OUTPUT: A table of stage, rows, seconds, rows/s, peak RSS (MB) and exponent, written to --csv too. Time and memory curves per
+     stage (log-log, with a linear reference) go to --plot when matplotlib is installed.
+USAGE: python benchmarks/bench_scaling.py [--scales 10000 100000 1000000] [--stages authors bioentities] [--plot scaling.png]
+"""
+import argparse
+import contextlib
+import csv
+import io
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+SCRIPTS_DIR = os.path.join(PROJECT_DIR, "scripts")
+sys.path.insert(0, SCRIPTS_DIR)
+
+from run_pipeline import STAGES, SEED_OWL  # noqa: E402
+from synthetic_data import generate  # noqa: E402
+
+SUPER_LINEAR = 1.15
+
+
+def run_stage(stage, store):
+    """Child process body: one stage against the store (the author stage seeds it), then commit"""
+    import importlib
+    from stage_store import stage_argparser, open_stage
+    args = stage_argparser("bench").parse_args(["--store", store, "--nrows", "0"])
+    onto = open_stage(SEED_OWL if stage == "authors" else None, args, seed=(stage == "authors"))
+    module_name, _, kwargs = STAGES[stage]
+    module = importlib.import_module(module_name)
+    data = module.load_data(None, 0)
+    module.populate(onto, *(data if isinstance(data, tuple) else (data,)), **kwargs)
+    onto.world.save()
+
+
+def measure(cmd, data_dir):
+    """Run cmd in a child process; returns (seconds, peak RSS in MB)"""
+    env = dict(os.environ, PKG2020_DATA_DIR=data_dir)
+    start = time.time()
+    proc = subprocess.Popen(cmd, cwd=SCRIPTS_DIR, env=env, stdout=subprocess.DEVNULL)
+    _, status, usage = os.wait4(proc.pid, 0)
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise RuntimeError(f"{' '.join(cmd)} exited with {os.waitstatus_to_exitcode(status)}")
+    # ru_maxrss is in kilobytes on Linux
+    return time.time() - start, usage.ru_maxrss / 1024
+
+
+def growth(results, stage, rows, key):
+    """log-log slope of `key` between the previous scale and this one (None at the first scale)"""
+    previous = [r for r in results if r["stage"] == stage and r["rows"] < rows]
+    if not previous:
+        return None
+    last, current = previous[-1], next(r for r in results if r["stage"] == stage and r["rows"] == rows)
+    if last[key] <= 0 or current[key] <= 0:
+        return None
+    return math.log(current[key] / last[key]) / math.log(rows / last["rows"])
+
+
+def plot(results, stages, path):
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("matplotlib is not installed: no plot (the table above and the --csv file have the same numbers)")
+        return
+    fig, axes = plt.subplots(1, 2, figsize=(13, 5))
+    for ax, key, label in [(axes[0], "seconds", "wall time (s)"), (axes[1], "peak_mb", "peak RSS (MB)")]:
+        for stage in stages:
+            points = [(r["rows"], r[key]) for r in results if r["stage"] == stage]
+            ax.plot(*zip(*points), marker="o", label=stage)
+        if key == "seconds":
+            # Linear reference through the smallest scale of the slowest stage
+            rows = sorted({r["rows"] for r in results})
+            base = max(r["seconds"] for r in results if r["rows"] == rows[0])
+            ax.plot(rows, [base * n / rows[0] for n in rows], "k--", linewidth=1, label="linear")
+        ax.set_xscale("log")
+        ax.set_yscale("log")
+        ax.set_xlabel("rows per table")
+        ax.set_ylabel(label)
+        ax.grid(True, which="both", alpha=0.3)
+    axes[0].legend(fontsize=8)
+    fig.suptitle("PKG2020 pipeline stages vs synthetic input size")
+    fig.tight_layout()
+    fig.savefig(path, dpi=120)
+    print(f"Plot: {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and peak memory of every pipeline stage at growing synthetic scales")
+    parser.add_argument("--scales", type=int, nargs="+", default=[10000, 50000, 200000], help="rows per table")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES) + ["export"], default=list(STAGES) + ["export"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", default=os.path.join(PROJECT_DIR, "owl", "bench_scaling.csv"))
+    parser.add_argument("--plot", default=os.path.join(PROJECT_DIR, "owl", "bench_scaling.png"))
+    parser.add_argument("--run-stage", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--store", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run_stage:
+        run_stage(args.run_stage, args.store)
+        return
+
+    # The author stage seeds the store every other stage joins to
+    stages = ["authors"] + [s for s in args.stages if s != "authors"]
+    results = []
+    print(f"{'stage':<14} {'rows':>10} {'seconds':>9} {'rows/s':>9} {'peak MB':>9} {'exponent':>9}")
+    for rows in sorted(args.scales):
+        with tempfile.TemporaryDirectory() as tmp:
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate(rows, tmp, seed=args.seed)
+            store = os.path.join(tmp, "bench.sqlite3")
+            for stage in stages:
+                if stage == "export":
+                    cmd = [sys.executable, "stage_store.py", "--store", store, "--export", os.path.join(tmp, "bench.nt"), "--format", "ntriples"]
+                else:
+                    cmd = [sys.executable, os.path.abspath(__file__), "--run-stage", stage, "--store", store]
+                seconds, peak_mb = measure(cmd, tmp)
+                results.append({"stage": stage, "rows": rows, "seconds": round(seconds, 2), "peak_mb": round(peak_mb, 1)})
+                exponent = growth(results, stage, rows, "seconds")
+                results[-1]["exponent"] = None if exponent is None else round(exponent, 2)
+                flag = "  super-linear" if exponent is not None and exponent > SUPER_LINEAR else ""
+                shown = "" if exponent is None else f"{exponent:.2f}"
+                print(f"{stage:<14} {rows:>10} {seconds:>9.1f} {rows / seconds:>9.0f} {peak_mb:>9.0f} {shown:>9}{flag}")
+
+    with open(args.csv, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["stage", "rows", "seconds", "peak_mb", "exponent"])
+        writer.writeheader()
+        writer.writerows(results)
+    print(f"Results: {args.csv}")
+    plot(results, stages, args.plot)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+PKG2020 Streaming Ingestion Benchmark - Peak Memory vs Input Size
+PURPOSE: Shows that --chunk-size keeps populate_authors_articles.py at flat peak memory while whole-frame loading grows with the input.
+HOW: Scales data/OA01_Author_List.csv up by repeating it with shifted PMID/AND_ID ranges, then runs the bulk author step into a
+     throw-away SQLite store for each size, once whole-frame and once chunked. Each run is a separate process; its peak RSS comes from wait4().
+OUTPUT: A table of rows, mode, wall time and peak RSS (MB) per run.
+USAGE: python benchmarks/bench_streaming_memory.py [--sizes 50000 200000 800000] [--chunk-size 50000]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+SCRIPTS_DIR = os.path.join(PROJECT_DIR, "scripts")
+
+
+def write_scaled_oa01(path, nrows):
+    """Write an OA01-shaped CSV of nrows rows: the sample repeated with PMID / AND_ID offsets per copy"""
+    sample = pd.read_csv(os.path.join(PROJECT_DIR, "data", "OA01_Author_List.csv"))
+    pmid_span = int(sample["PMID"].max()) + 1
+    and_span = int(sample["AND_ID"].max()) + 1
+    written, copy = 0, 0
+    with open(path, "w", newline="") as f:
+        while written < nrows:
+            part = sample.head(nrows - written).copy()
+            part["PMID"] += copy * pmid_span
+            part["AND_ID"] += copy * and_span
+            part.to_csv(f, header=(copy == 0), index=False)
+            written += len(part)
+            copy += 1
+
+
+def run_step(data_dir, store, nrows, chunk_size):
+    """Run the bulk author step in a child process; returns (seconds, peak RSS in MB)"""
+    cmd = [sys.executable, "populate_authors_articles.py", "--bulk", "--store", store, "--nrows", str(nrows)]
+    if chunk_size:
+        cmd += ["--chunk-size", str(chunk_size)]
+    env = dict(os.environ, PKG2020_DATA_DIR=data_dir)
+
+    start = time.time()
+    proc = subprocess.Popen(cmd, cwd=SCRIPTS_DIR, env=env, stdout=subprocess.DEVNULL)
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)} exited with {proc.returncode}")
+    # ru_maxrss is in kilobytes on Linux
+    return time.time() - start, usage.ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory of whole-frame vs chunked OA01 ingestion")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50000, 200000, 800000])
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'mode':>10} {'seconds':>9} {'peak MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = os.path.join(tmp, "bench.sqlite3")
+        for nrows in args.sizes:
+            write_scaled_oa01(os.path.join(tmp, "OA01_Author_List.csv"), nrows)
+            for mode, chunk_size in [("whole", None), ("chunked", args.chunk_size)]:
+                seconds, peak_mb = run_step(tmp, store, nrows, chunk_size)
+                print(f"{nrows:>10} {mode:>10} {seconds:>9.1f} {peak_mb:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
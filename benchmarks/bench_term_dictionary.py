@@ -0,0 +1,93 @@
+"""
+PKG2020 Term Dictionary Benchmark - String Triples vs Dictionary-Encoded int32 Triples
+PURPOSE: Measures what the term dictionary saves when the graph is held and queried locally: memory, disk and pattern-lookup time.
+HOW: Runs scripts/direct_ntriples.py twice (N-Triples text and --encode), then loads each form in-process under tracemalloc:
+     a list of (s, p, o) string tuples versus the (n, 3) int32 array plus the term dictionary. Lookups fetch every writtenBy edge
+     and every triple of one article, by scanning the tuples versus numpy masks over ids.
+OUTPUT: A table of triples, in-memory MB, on-disk MB and lookup milliseconds for both representations.
+USAGE: python benchmarks/bench_term_dictionary.py [--nrows 0]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+SCRIPTS_DIR = os.path.join(PROJECT_DIR, "scripts")
+OWL_DIR = os.path.join(PROJECT_DIR, "owl")
+sys.path.insert(0, SCRIPTS_DIR)
+
+from term_dictionary import TermDictionary, match, TERMS_FILE, TRIPLES_FILE  # noqa: E402
+
+TEXT_FILE = "bench_terms.nt"
+WRITTEN_BY = "<http://example.org/pkg2020/ontology.owl#writtenBy>"
+
+
+def export(nrows):
+    for extra in (["--output", TEXT_FILE], ["--encode"]):
+        subprocess.run([sys.executable, "direct_ntriples.py", "--nrows", str(nrows)] + extra,
+                       cwd=SCRIPTS_DIR, check=True, stdout=subprocess.DEVNULL)
+
+
+def measure(load):
+    """(loaded object, MB allocated while loading)"""
+    tracemalloc.start()
+    loaded = load()
+    size = tracemalloc.get_traced_memory()[0] / 2**20
+    tracemalloc.stop()
+    return loaded, size
+
+
+def load_strings():
+    with open(os.path.join(OWL_DIR, TEXT_FILE), encoding="utf-8") as f:
+        return [tuple(line[:-3].split(" ", 2)) for line in f]
+
+
+def load_encoded():
+    dictionary = TermDictionary.load(os.path.join(OWL_DIR, TERMS_FILE))
+    dictionary.lookup(WRITTEN_BY)  # looked up in the mapped hash index: no term -> id map is built
+    return np.load(os.path.join(OWL_DIR, TRIPLES_FILE)), dictionary
+
+
+def timed(function, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory and lookup cost of string vs dictionary-encoded triples")
+    parser.add_argument("--nrows", type=int, default=0, help="rows per CSV (0: whole tables)")
+    args = parser.parse_args()
+
+    export(args.nrows)
+    strings, strings_mb = measure(load_strings)
+    (triples, dictionary), encoded_mb = measure(load_encoded)
+    article = next(s for s, p, o in strings if p == WRITTEN_BY)
+
+    text_disk = os.path.getsize(os.path.join(OWL_DIR, TEXT_FILE)) / 2**20
+    encoded_disk = (os.path.getsize(os.path.join(OWL_DIR, TRIPLES_FILE)) + os.path.getsize(os.path.join(OWL_DIR, TERMS_FILE))) / 2**20
+
+    edges_s, edges_s_ms = timed(lambda: [t for t in strings if t[1] == WRITTEN_BY])
+    about_s, about_s_ms = timed(lambda: [t for t in strings if t[0] == article])
+    p_id, s_id = dictionary.lookup(WRITTEN_BY), dictionary.lookup(article)
+    edges_e, edges_e_ms = timed(lambda: match(triples, p=p_id))
+    about_e, about_e_ms = timed(lambda: match(triples, s=s_id))
+    assert len(edges_s) == len(edges_e) and len(about_s) == len(about_e)
+
+    print(f"{len(strings):,} triples, {len(dictionary):,} distinct terms")
+    print(f"{'form':<16} {'memory MB':>10} {'disk MB':>9} {'writtenBy ms':>13} {'one subject ms':>15}")
+    print(f"{'string tuples':<16} {strings_mb:>10.1f} {text_disk:>9.1f} {edges_s_ms:>13.1f} {about_s_ms:>15.1f}")
+    print(f"{'int32 + dict':<16} {encoded_mb:>10.1f} {encoded_disk:>9.1f} {edges_e_ms:>13.1f} {about_e_ms:>15.1f}")
+
+    for name in (TEXT_FILE, TRIPLES_FILE, TERMS_FILE):
+        os.remove(os.path.join(OWL_DIR, name))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+PKG2020 Typed CSV Benchmark - Frame Memory and Parse Time, Default vs Schema Dtypes
+PURPOSE: Shows what csv_loader.SCHEMAS buys on every OA0x table: usecols, nullable integer ids, `category` enumerations and
+         (when installed) the pyarrow engine, against a plain pd.read_csv of the same file.
+HOW: scripts/synthetic_data.py writes all seven tables with --rows rows into a temp directory; each table is then read whole,
+     --repeat times per mode, and the best parse time and the frame's deep memory_usage() are kept.
+OUTPUT: A table of table, mode, seconds, frame MB, and the default / typed ratios.
+USAGE: python benchmarks/bench_typed_csv.py [--rows 1000000] [--repeat 3]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(PROJECT_DIR, "scripts"))
+
+import csv_loader  # noqa: E402
+from synthetic_data import generate  # noqa: E402
+
+
+def best_read(read, repeat):
+    """(best seconds, frame MB) of `repeat` calls of read()"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = read()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, df.memory_usage(deep=True).sum() / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame memory and parse time of the OA0x tables, default vs typed dtypes")
+    parser.add_argument("--rows", type=int, default=1000000, help="rows per synthetic table")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"pyarrow engine: {'yes' if csv_loader.PYARROW else 'no (pip install pyarrow)'}")
+    print(f"{'table':<34} {'mode':<8} {'seconds':>8} {'frame MB':>9} {'time x':>7} {'memory x':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate(args.rows, tmp, seed=args.seed)
+        os.environ["PKG2020_DATA_DIR"] = tmp
+        totals = {"default": [0.0, 0.0], "typed": [0.0, 0.0]}
+        for filename in csv_loader.SCHEMAS:
+            default = best_read(lambda: pd.read_csv(csv_loader.data_path(filename)), args.repeat)
+            typed = best_read(lambda: csv_loader.read_table(filename), args.repeat)
+            for mode, (seconds, mb) in [("default", default), ("typed", typed)]:
+                totals[mode][0] += seconds
+                totals[mode][1] += mb
+            print(f"{filename:<34} {'default':<8} {default[0]:>8.2f} {default[1]:>9.1f}")
+            print(f"{'':<34} {'typed':<8} {typed[0]:>8.2f} {typed[1]:>9.1f} {default[0] / typed[0]:>7.1f} {default[1] / typed[1]:>9.1f}")
+        (dt, dm), (tt, tm) = totals["default"], totals["typed"]
+        print(f"{'all tables':<34} {'typed':<8} {tt:>8.2f} {tm:>9.1f} {dt / tt:>7.1f} {dm / tm:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+PKG2020 Author Index - AND_ID -> Store ID Lookup for the Enrichment Steps
+PURPOSE: Lets populate_affiliations/employment/education/nih_projects join their rows to Authors by AND_ID without materializing
+         every Author as a Python object (Author.instances() at the start of each step).
+HOW: populate_authors_articles.py writes an author_index table (AND_ID INTEGER PRIMARY KEY -> storid) into the quadstore with a single
+     INSERT ... SELECT over the rdf:type Author triples. Enrichment steps look up one chunk of AND_IDs per batched query and add
+     their link triples by storid.
+KEY FEATURE: In store mode the index lives next to the graph, so opening it is free; in file mode, where storids change with every
+     RDF/XML reload, open() rebuilds it with the same SQL statement (milliseconds, no Python objects).
+"""
+from owlready2 import rdf_type
+import pandas as pd
+
+INDEX_TABLE = "author_index"
+LOOKUP_BATCH = 500
+
+
+class AuthorIndex:
+    """AND_ID -> storid of every Author in the world"""
+
+    def __init__(self, onto):
+        self.db = onto.world.graph.db
+
+    @classmethod
+    def build(cls, onto):
+        """(Re)write the index from the Author individuals in the store"""
+        db = onto.world.graph.db
+        db.execute(f"CREATE TABLE IF NOT EXISTS {INDEX_TABLE} (and_id INTEGER PRIMARY KEY, storid INTEGER)")
+        db.execute(f"DELETE FROM {INDEX_TABLE}")
+        prefix = onto.base_iri + "Author_"
+        db.execute(f"""INSERT OR IGNORE INTO {INDEX_TABLE}
+                       SELECT CAST(substr(r.iri, ?) AS INTEGER), r.storid FROM objs o JOIN resources r ON r.storid = o.s
+                       WHERE o.p = ? AND o.o = ? AND substr(r.iri, 1, ?) = ?""",
+                   (len(prefix) + 1, rdf_type, onto.Author.storid, len(prefix), prefix))
+        db.commit()
+        return cls(onto)
+
+    @classmethod
+    def open(cls, onto):
+        """The persisted index, or a freshly built one when the store has none (file mode)"""
+        exists = onto.world.graph.db.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (INDEX_TABLE,)).fetchone()
+        return cls(onto) if exists else cls.build(onto)
+
+    def __len__(self):
+        return self.db.execute(f"SELECT COUNT(*) FROM {INDEX_TABLE}").fetchone()[0]
+
+    def lookup(self, and_ids):
+        """Store ids (Python ints, as sqlite3 binds them) for a column of AND_IDs, aligned with it; 0 where there is no such Author"""
+        and_ids = pd.to_numeric(pd.Series(and_ids), errors="coerce")
+        keys = [int(k) for k in and_ids.dropna().unique()]
+        found = {}
+        for start in range(0, len(keys), LOOKUP_BATCH):
+            batch = keys[start:start + LOOKUP_BATCH]
+            found.update(self.db.execute(f"SELECT and_id, storid FROM {INDEX_TABLE} WHERE and_id IN ({','.join('?' * len(batch))})", batch))
+        return and_ids.map(found).fillna(0).astype("int64").tolist()
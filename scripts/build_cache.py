@@ -0,0 +1,172 @@
+"""
+PKG2020 Build Cache - Content-Hash Fingerprints That Let run_pipeline.py Skip Unchanged Stages
+PURPOSE: A code change in one populate script (or a new OA07 drop) should rebuild that stage only, and a rerun with nothing changed
+         should take seconds instead of a full rebuild.
+HOW: A stage's fingerprint is a SHA-256 over:
+     - the content digests of its INPUT_CSV files (re-hashed only when a file's size or mtime changes)
+     - the fingerprints of its upstream stages (for the author layer, the seed T-Box)
+     - the source of its populate script and of the scripts/ modules that script imports directly
+     - its row limit and populate() options
+     After a stage runs, the triples it added are saved as a columnar step (columnar_stage.py: term dictionary + per-property int32
+     tables), together with its rows of the side tables (row digests, mention and mutation indexes). On the next build a stage
+     whose fingerprint matches is restored from that artifact instead of populated.
+KEY FEATURE: When every fingerprint matches and owl/pkg2020_final.owl is still the export this cache recorded, the build is a no-op.
+NOTE: A step's default sample size is random, so the cache keeps reusing the first sample it drew; pass --nrows or --no-cache for
+      a new one. --incremental builds bypass the cache.
+OUTPUT: owl/cache/<stage>/ (one artifact per stage) and owl/cache/cache.json (file digests, last build).
+"""
+from columnar_stage import read_manifest, write_manifest, save_columnar, load_step, watermark, TERMS
+from csv_loader import data_path
+from stage_store import OWL_DIR, SIDE_TABLES
+from term_dictionary import TermDictionary
+import hashlib
+import inspect
+import json
+import os
+import shutil
+
+CACHE_DIR = os.path.join(OWL_DIR, "cache")
+INDEX = "cache.json"
+SIDE_DB = "side_tables.sqlite3"
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def stage_watermark(world):
+    """Where a stage starts: the quadstore watermark plus the row count of every side table"""
+    db = world.graph.db
+    since = watermark(world)
+    existing = {name for (name,) in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    since["side_tables"] = {table: db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in SIDE_TABLES if table in existing}
+    return since
+
+
+class BuildCache:
+    """Stage fingerprints and the artifacts they key"""
+
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = directory
+        self.index_path = os.path.join(directory, INDEX)
+        self.index = {"files": {}, "build": None}
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+
+    def write_index(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.index_path + ".tmp", "w") as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(self.index_path + ".tmp", self.index_path)
+
+    def file_digest(self, path):
+        """SHA-256 of a file's content, remembered per (size, mtime) so unchanged inputs are not re-read; None if it is missing"""
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        path = os.path.abspath(path)
+        known = self.index["files"].get(path)
+        if known and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return known[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        self.index["files"][path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def source_digest(self, module):
+        """Digest of a module's source and of the scripts/ modules it imports directly"""
+        files = {os.path.abspath(module.__file__)}
+        for value in vars(module).values():
+            dependency = value if inspect.ismodule(value) else inspect.getmodule(value)
+            path = getattr(dependency, "__file__", None)
+            if path and os.path.dirname(os.path.abspath(path)) == SCRIPT_DIR:
+                files.add(os.path.abspath(path))
+        return {os.path.basename(path): self.file_digest(path) for path in sorted(files)}
+
+    def fingerprint(self, stage, module, upstream, settings):
+        """Fingerprint of a stage from its inputs, upstream fingerprints, code and settings"""
+        content = {
+            "stage": stage,
+            "inputs": {name: self.file_digest(data_path(name)) for name in module.INPUT_CSV},
+            "upstream": upstream,
+            "source": self.source_digest(module),
+            "settings": settings,
+        }
+        return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+    def artifact(self, stage):
+        return os.path.join(self.directory, stage)
+
+    def hit(self, stage, fingerprint):
+        """Whether the stage's artifact was saved by a run with this fingerprint"""
+        try:
+            return read_manifest(self.artifact(stage)).get("fingerprint") == fingerprint
+        except FileNotFoundError:
+            return False
+
+    def save(self, onto, stage, fingerprint, since):
+        """Save what the stage added to onto since stage_watermark() `since` as its artifact; returns the number of triples"""
+        directory = self.artifact(stage)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+        write_manifest(directory, {"seed": None, "steps": []})
+        nb_triples = save_columnar(onto, directory, stage, since=since)
+
+        db = onto.world.graph.db
+        db.commit()
+        db.execute("ATTACH DATABASE ? AS cache", (os.path.join(directory, SIDE_DB),))
+        for table, count in stage_watermark(onto.world)["side_tables"].items():
+            if count == since["side_tables"].get(table, 0):
+                continue
+            schema = db.execute("SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+            db.execute(schema.replace("CREATE TABLE ", "CREATE TABLE cache.", 1))
+            columns = [row[1] for row in db.execute(f"PRAGMA main.table_info({table})")]
+            # Row digests of all stages share one table (a stage's extra trackers are named <stage>_<part>, e.g. authors_names);
+            # the others belong to a single stage
+            where, params = (("WHERE stage = ?1 OR substr(stage, 1, length(?1) + 1) = ?1 || '_'", (stage,)) if "stage" in columns
+                             else ("", ()))
+            db.execute(f"INSERT INTO cache.{table} SELECT * FROM main.{table} {where}", params)
+        db.commit()
+        db.execute("DETACH DATABASE cache")
+
+        # The fingerprint goes in last: an interrupted save leaves no artifact that looks valid
+        manifest = read_manifest(directory)
+        manifest["fingerprint"] = fingerprint
+        write_manifest(directory, manifest)
+        return nb_triples
+
+    def restore(self, onto, stage):
+        """Insert a stage's cached triples and side-table rows into onto; returns the number of triples"""
+        directory = self.artifact(stage)
+        manifest = read_manifest(directory)
+        dictionary = TermDictionary.load(os.path.join(directory, TERMS))
+        nb_triples = sum(load_step(onto, directory, step, dictionary) for step in manifest["steps"])
+
+        db = onto.world.graph.db
+        db.commit()
+        db.execute("ATTACH DATABASE ? AS cache", (os.path.join(directory, SIDE_DB),))
+        for table, schema in db.execute("SELECT name, sql FROM cache.sqlite_master WHERE type = 'table'").fetchall():
+            db.execute(schema.replace("CREATE TABLE ", "CREATE TABLE IF NOT EXISTS main.", 1))
+            db.execute(f"INSERT OR REPLACE INTO main.{table} SELECT * FROM cache.{table}")
+        db.commit()
+        db.execute("DETACH DATABASE cache")
+        return nb_triples
+
+    def build_fingerprint(self, fingerprints):
+        return hashlib.sha256(json.dumps(fingerprints, sort_keys=True).encode()).hexdigest()
+
+    def up_to_date(self, fingerprints, final_path, store):
+        """Whether the last build had these stage fingerprints and its store and export are still in place, untouched"""
+        build = self.index.get("build")
+        if not build or build["fingerprint"] != self.build_fingerprint(fingerprints) or build["store"] != os.path.abspath(store):
+            return False
+        if not os.path.exists(store) or not os.path.exists(final_path):
+            return False
+        stat = os.stat(final_path)
+        return build["final"] == [os.path.abspath(final_path), stat.st_size, stat.st_mtime_ns]
+
+    def record_build(self, fingerprints, final_path, store):
+        stat = os.stat(final_path)
+        self.index["build"] = {"fingerprint": self.build_fingerprint(fingerprints), "store": os.path.abspath(store),
+                               "final": [os.path.abspath(final_path), stat.st_size, stat.st_mtime_ns]}
+        self.write_index()
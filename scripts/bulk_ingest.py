@@ -0,0 +1,119 @@
+"""
+PKG2020 Bulk Ingestion - Vectorized Triple Loading Helpers
+PURPOSE: Writes whole DataFrame columns of individuals, object triples and data triples straight into the OWLReady2 quadstore.
+HOW: IRIs are built with vectorized pandas string ops, abbreviated to storids in one pass, then inserted with executemany (one batch per property).
+     add_object_edges() / add_data_values() take storids directly (from add_individuals(), storids() or author_index), so a step
+     resolves each IRI once and writes every property of a chunk as a column.
+KEY FEATURE: No per-row Python individuals or descriptor calls - ingest time grows linearly with the number of rows and is bound by SQLite I/O.
+     Every populate_* step writes through it (benchmarks/bench_bulk_insert.py: attribute API vs BulkLoader per million triples).
+NOTE: Inserts are INSERT OR IGNORE against OWLReady2's unique indexes, so writing a triple twice is harmless. Unlike list assignment
+     (author.lastName = [...]) they add values; clear_data_values() first where an existing value must be replaced.
+USAGE: loader = BulkLoader(onto); ids = loader.add_individuals(onto.Article, names); loader.add_data_values(onto.hasPMID, ids, values); loader.commit()
+"""
+import numpy as np
+import pandas as pd
+from owlready2 import rdf_type, owl_named_individual
+from owlready2.base import _universal_datatype_2_abbrev
+
+# IRIs per resources lookup query (SQLite's default limit is 999 bound parameters)
+LOOKUP_BATCH = 500
+
+
+def prefixed(prefix, *columns):
+    """Vectorized IRI names, e.g. prefixed("Authorship_", df.PMID, df.AND_ID) -> Authorship_{pmid}_{and_id}"""
+    names = prefix + columns[0].astype(str)
+    for column in columns[1:]:
+        names = names + "_" + column.astype(str)
+    return names
+
+
+class BulkLoader:
+    """Batch writer for one ontology: every call inserts a whole column of triples in a single executemany"""
+
+    def __init__(self, onto):
+        self.onto = onto
+        self.graph = onto.world.graph
+        self.c = onto.graph.c
+        self.base_iri = onto.base_iri
+        self.nb_triples = 0
+
+    def storids(self, names):
+        """Abbreviate local names (relative to the ontology base IRI) to storids, creating missing resources in bulk"""
+        iris = [self.base_iri + name for name in names]
+        unique_iris = list(dict.fromkeys(iris))
+        cur = self.graph.db.cursor()
+
+        known = {}
+        for start in range(0, len(unique_iris), LOOKUP_BATCH):
+            batch = unique_iris[start:start + LOOKUP_BATCH]
+            known.update((iri, storid) for storid, iri in
+                         cur.execute(f"SELECT storid, iri FROM resources WHERE iri IN ({','.join('?' * len(batch))})", batch))
+
+        missing = [iri for iri in unique_iris if iri not in known]
+        if missing:
+            current = cur.execute("SELECT current_resource FROM store").fetchone()[0]
+            new_rows = list(zip(range(current + 1, current + 1 + len(missing)), missing))
+            cur.executemany("INSERT INTO resources VALUES (?,?)", new_rows)
+            cur.execute("UPDATE store SET current_resource=?", (current + len(missing),))
+            known.update((iri, storid) for storid, iri in new_rows)
+
+        return [known[iri] for iri in iris]
+
+    def existing(self, names):
+        """Boolean mask of the names that are already declared as individuals in the store"""
+        iris = [self.base_iri + name for name in names]
+        found = set()
+        for start in range(0, len(iris), LOOKUP_BATCH):
+            batch = iris[start:start + LOOKUP_BATCH]
+            found.update(iri for (iri,) in self.graph.db.execute(
+                f"""SELECT r.iri FROM resources r JOIN objs o ON o.s = r.storid AND o.p = ? AND o.o = ?
+                    WHERE r.iri IN ({','.join('?' * len(batch))})""", [rdf_type, owl_named_individual, *batch]))
+        return np.array([iri in found for iri in iris], dtype=bool)
+
+    def count_individuals(self, cls):
+        """Number of individuals of cls in the store (asserted type only, no Python objects)"""
+        return self.graph.db.execute("SELECT COUNT(*) FROM objs WHERE p = ? AND o = ?", (rdf_type, cls.storid)).fetchone()[0]
+
+    def add_individuals(self, cls, names):
+        """Declare each name as an owl:NamedIndividual of cls; returns their storids"""
+        subjects = self.storids(names)
+        rows = [(self.c, s, rdf_type, owl_named_individual) for s in subjects]
+        rows.extend((self.c, s, rdf_type, cls.storid) for s in subjects)
+        self._insert_objs(rows)
+        return subjects
+
+    def add_object_triples(self, prop, subjects, objects):
+        """Insert (subject, prop, object) for aligned columns of subject and object names"""
+        self.add_object_edges(prop, self.storids(subjects), self.storids(objects))
+
+    def add_object_edges(self, prop, subj_ids, obj_ids):
+        """Insert (subject, prop, object) for aligned columns of storids of existing resources"""
+        rows = [(self.c, int(s), prop.storid, int(o)) for s, o in zip(subj_ids, obj_ids)]
+        self._insert_objs(rows)
+
+    def add_data_triples(self, prop, subjects, values, datatype=str):
+        """Insert (subject, prop, literal) for aligned columns of subject names and values; missing values are skipped"""
+        values = pd.Series(list(values), dtype=object)
+        keep = values.notna().to_numpy()
+        self.add_data_values(prop, self.storids([s for s, k in zip(subjects, keep) if k]), values[keep], datatype)
+
+    def add_data_values(self, prop, subj_ids, values, datatype=str):
+        """Insert (subject, prop, literal) for aligned columns of storids and values; missing values are skipped"""
+        values = pd.Series(list(values), dtype=object)
+        keep = values.notna().to_numpy()
+        d = _universal_datatype_2_abbrev[datatype]
+        rows = [(self.c, int(s), prop.storid, datatype(v), d) for s, v, k in zip(subj_ids, values.tolist(), keep) if k]
+        self.graph.db.executemany("INSERT OR IGNORE INTO datas VALUES (?,?,?,?,?)", rows)
+        self.nb_triples += len(rows)
+
+    def clear_data_values(self, prop, subj_ids):
+        """Delete the values of prop on the given storids, so add_data_values() replaces them like a list assignment would"""
+        self.graph.db.executemany("DELETE FROM datas WHERE s = ? AND p = ?", [(int(s), prop.storid) for s in subj_ids])
+
+    def _insert_objs(self, rows):
+        self.graph.db.executemany("INSERT OR IGNORE INTO objs VALUES (?,?,?,?)", rows)
+        self.nb_triples += len(rows)
+
+    def commit(self):
+        """Commit the batch (call graph.analyze() once after the last batch to refresh SQLite statistics)"""
+        self.graph.commit()
@@ -0,0 +1,99 @@
+"""
+PKG2020 Ingestion Checkpoints - Resume a Crashed Populate Step From Its Last Committed Chunk
+PURPOSE: A step that dies hours into a full PKG2020 table (OOM, a bad row, a killed machine) restarts where it stopped instead of at row 0.
+HOW: With --checkpoint-every N a step streams its CSVs in N-row chunks (unless --chunk-size is set). Each time a chunk has been
+     populated, the store is committed together with the rows ingested per input table, kept in the ingest_checkpoints table of
+     the store itself. --resume reopens the store as it is (no reseeding), skips steps whose checkpoints are complete and starts
+     every input of an unfinished step after its last checkpoint; skipped rows keep their row numbers (csv_loader.resume_offsets()).
+KEY FEATURE: IRIs are deterministic and store inserts idempotent, so the rows processed after the last checkpoint are simply redone.
+NOTE: Needs --store. Resume with the same --nrows (a step's default sample size is random). run_pipeline.py runs its stages
+      in-process, one after another, while checkpointing - a staging copy would lose its checkpoints with its worker.
+USAGE: python run_pipeline.py --nrows 0 --checkpoint-every 500000  |  python run_pipeline.py --nrows 0 --resume
+"""
+import csv_loader
+import pandas as pd
+import time
+
+CHECKPOINT_TABLE = "ingest_checkpoints"
+DEFAULT_EVERY = 100000
+
+
+class IngestCheckpoints:
+    """Committed progress of one step over its input tables"""
+
+    def __init__(self, onto, stage, inputs, every=None, resume=False):
+        self.onto = onto
+        self.stage = stage
+        self.inputs = list(inputs)
+        self.every = every or DEFAULT_EVERY
+        self.db = onto.world.graph.db
+        self.db.execute(f"""CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE}
+                            (stage TEXT, input TEXT, rows INTEGER, complete INTEGER, updated TEXT, PRIMARY KEY (stage, input))""")
+        if not resume:
+            self.db.execute(f"DELETE FROM {CHECKPOINT_TABLE} WHERE stage = ?", (stage,))
+        self.progress = {input: (rows, bool(complete)) for input, rows, complete in
+                         self.db.execute(f"SELECT input, rows, complete FROM {CHECKPOINT_TABLE} WHERE stage = ?", (stage,))}
+
+    def complete(self):
+        """Whether an earlier run finished the step"""
+        return all(self.progress.get(input, (0, False))[1] for input in self.inputs)
+
+    def offsets(self):
+        return {input: rows for input, (rows, _) in self.progress.items() if rows}
+
+    def load(self, load_data, chunk_size=None, nrows=None):
+        """load_data(chunk_size, nrows) with each input starting after its last checkpoint and checkpointed as populate() consumes
+        it; the result has load_data()'s shape"""
+        offsets = self.offsets()
+        if offsets:
+            print(f"Resuming {self.stage} after " + ", ".join(f"{rows} rows of {input}" for input, rows in offsets.items()))
+        csv_loader.resume_offsets(offsets)
+        data = load_data(chunk_size or self.every, nrows)
+        if not isinstance(data, tuple):
+            return self.track(data, self.inputs[0])
+        return tuple(self.track(frames, input) for frames, input in zip(data, self.inputs))
+
+    def track(self, data, input):
+        """Frames of data (None stays None); when populate() asks for the next frame, the previous one is checkpointed"""
+        if data is None:
+            return None
+
+        def frames():
+            rows = self.progress.get(input, (0, False))[0]
+            for df in [data] if isinstance(data, pd.DataFrame) else data:
+                yield df
+                rows += len(df)
+                self.commit(input, rows)
+        return frames()
+
+    def commit(self, input, rows, complete=False):
+        """Commit the store with `rows` rows of input ingested, in the same transaction"""
+        self.db.execute(f"INSERT OR REPLACE INTO {CHECKPOINT_TABLE} VALUES (?,?,?,?,?)",
+                        (self.stage, input, rows, int(complete), time.strftime("%Y-%m-%dT%H:%M:%S")))
+        self.onto.world.save()
+        self.progress[input] = (rows, complete)
+        if not complete:
+            print(f"Checkpoint {self.stage}: {rows} rows of {input}")
+
+    def finish(self):
+        """Mark the step complete (a later --resume skips it)"""
+        for input in self.inputs:
+            self.commit(input, self.progress.get(input, (0, False))[0], complete=True)
+        csv_loader.resume_offsets({})
+
+
+def stage_checkpoints(onto, stage, inputs, args):
+    """IngestCheckpoints of a step run with --checkpoint-every or --resume, else None"""
+    if not (args.checkpoint_every or args.resume):
+        return None
+    if not args.store:
+        raise ValueError("--checkpoint-every / --resume need a persistent --store to keep the checkpoints in")
+    return IngestCheckpoints(onto, stage, inputs, args.checkpoint_every, args.resume)
+
+
+def load_stage_data(onto, stage, inputs, args, load_data):
+    """A step's load_data(args.chunk_size, args.nrows), through its checkpoints when they are on; returns (data, checkpoints or None)"""
+    checkpoints = stage_checkpoints(onto, stage, inputs, args)
+    if checkpoints is None:
+        return load_data(args.chunk_size, args.nrows), None
+    return checkpoints.load(load_data, args.chunk_size, args.nrows), checkpoints
@@ -0,0 +1,216 @@
+"""
+PKG2020 Columnar Staging - Integer Edge Tables Between Pipeline Steps Instead of RDF/XML Dumps
+PURPOSE: In file mode every populate_* step re-parses the previous step's RDF/XML (pkg2020_populated_authors.owl, step4..7) and writes
+         a new one, hundreds of MB each. With --columnar DIR (or PKG2020_COLUMNAR) a step instead appends only the triples it added,
+         as per-property numpy tables of term ids, and OWL is written once, by the final step or by this script's --export.
+HOW: A step's World is the seed T-Box (RDF/XML, a few KB) plus every earlier step's tables, inserted straight into the quadstore.
+     On save, the objs/datas rows past the load watermark are encoded with the shared term dictionary (term_dictionary.py) and
+     written as <step>/objs_<k>.npy ((n, 2) int32 subject/object ids of one property) and <step>/datas_<k>.npy (subject/value ids of
+     one property, datatype and value type); manifest.json lists the steps in order.
+KEY FEATURE: Tables and dictionary are memory-mappable .npy / PKGTERMS files; re-running a step replaces its own tables and drops
+     the steps after it (they were built on the old run), like re-running a step in file mode would before the next one.
+NOTE: Meant for full rebuilds (steps only add triples); --incremental needs --store.
+USAGE: python columnar_stage.py --columnar ../owl/columnar --export pkg2020_final.nt --format ntriples
+"""
+from owlready2 import *
+from stage_store import OWL_DIR, stage_argparser
+from term_dictionary import TermDictionary
+import numpy as np
+import pandas as pd
+import json
+import os
+import shutil
+import time
+
+MANIFEST = "manifest.json"
+TERMS = "terms.dict"
+VALUE_TYPES = {"str": str, "int": int, "float": float}
+
+_watermarks = {}  # id(World) -> rowids / blank counter after loading
+
+
+def read_manifest(directory):
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Columnar staging not found: {directory} (run populate_authors_articles.py --columnar first)")
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_manifest(directory, manifest):
+    with open(os.path.join(directory, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def watermark(world):
+    db = world.graph.db
+    return {
+        "objs": db.execute("SELECT IFNULL(MAX(rowid), 0) FROM objs").fetchone()[0],
+        "datas": db.execute("SELECT IFNULL(MAX(rowid), 0) FROM datas").fetchone()[0],
+    }
+
+
+def resource_storids(world, dictionary, term_ids):
+    """storid for every id of term_ids (a numpy lookup array indexed by term id); IRIs missing from the World are inserted in bulk,
+    every distinct blank node term gets a fresh blank id"""
+    db = world.graph.db
+    term_ids = np.unique(term_ids)
+    terms = dictionary.decode(term_ids)
+    storid_of = np.zeros(int(term_ids.max()) + 1 if len(term_ids) else 0, dtype=np.int64)
+
+    blank = np.array([term.startswith("_:") for term in terms], dtype=bool)
+    if blank.any():
+        current_blank = db.execute("SELECT current_blank FROM store").fetchone()[0]
+        storid_of[term_ids[blank]] = -np.arange(current_blank + 1, current_blank + 1 + int(blank.sum()))
+        db.execute("UPDATE store SET current_blank = ?", (current_blank + int(blank.sum()),))
+
+    iris = [term[1:-1] for term in terms[~blank]]
+    db.execute("CREATE TEMP TABLE IF NOT EXISTS columnar_terms (id INTEGER PRIMARY KEY, iri TEXT)")
+    db.execute("DELETE FROM columnar_terms")
+    db.executemany("INSERT INTO columnar_terms VALUES (?,?)", zip(term_ids[~blank].tolist(), iris))
+    known = dict(db.execute("SELECT t.id, r.storid FROM columnar_terms t JOIN resources r ON r.iri = t.iri"))
+    missing = [(term_id, iri) for term_id, iri in zip(term_ids[~blank].tolist(), iris) if term_id not in known]
+    if missing:
+        current = db.execute("SELECT current_resource FROM store").fetchone()[0]
+        new_rows = [(current + 1 + k, iri) for k, (_, iri) in enumerate(missing)]
+        db.executemany("INSERT INTO resources VALUES (?,?)", new_rows)
+        db.execute("UPDATE store SET current_resource = ?", (current + len(missing),))
+        known.update((term_id, storid) for (term_id, _), (storid, _) in zip(missing, new_rows))
+    if known:
+        storid_of[np.fromiter(known.keys(), dtype=np.int64)] = np.fromiter(known.values(), dtype=np.int64)
+    return storid_of
+
+
+def load_step(onto, directory, step, dictionary):
+    """Insert one step's tables into the World; returns the number of triples"""
+    world, c = onto.world, onto.graph.c
+    db = world.graph.db
+    tables = [(entry, np.load(os.path.join(directory, entry["file"]), mmap_mode="r")) for entry in step["tables"]]
+    ids = [np.array([entry["predicate"]]) for entry, _ in tables]
+    ids += [table[:, 0] for _, table in tables] + [table[:, 1] for entry, table in tables if entry["kind"] == "objs"]
+    storid_of = resource_storids(world, dictionary, np.concatenate(ids)) if tables else None
+
+    nb_triples = 0
+    for entry, table in tables:
+        p = int(storid_of[entry["predicate"]])
+        subjects = storid_of[table[:, 0]].tolist()
+        if entry["kind"] == "objs":
+            db.executemany("INSERT OR IGNORE INTO objs VALUES (?,?,?,?)", zip([c] * len(table), subjects, [p] * len(table),
+                                                                            storid_of[table[:, 1]].tolist()))
+        else:
+            datatype = entry["datatype"]
+            d = world._abbreviate(datatype) if datatype and not datatype.startswith("@") else (datatype or 0)
+            parse = VALUE_TYPES[entry["type"]]
+            values = [parse(value) for value in dictionary.decode(table[:, 1])]
+            db.executemany("INSERT OR IGNORE INTO datas VALUES (?,?,?,?,?)", zip([c] * len(table), subjects, [p] * len(table),
+                                                                                 values, [d] * len(table)))
+        nb_triples += len(table)
+    return nb_triples
+
+
+def step_name(owl_name):
+    """Steps are named after the RDF/XML file they replace (pkg2020_step4_affiliations_populated.owl -> pkg2020_step4_...)"""
+    return os.path.splitext(owl_name)[0]
+
+
+def open_columnar(directory, input_name, seed=False):
+    """The World of a step: seed T-Box plus the tables of every step up to the one that replaces owl/<input_name>
+    (all steps when input_name is None; seed: start an empty staging dir seeded with owl/<input_name>)"""
+    start = time.time()
+    if seed:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+        write_manifest(directory, {"seed": input_name, "steps": []})
+    manifest = read_manifest(directory)
+    steps = manifest["steps"]
+    if input_name is not None and not seed:
+        names = [entry["name"] for entry in steps]
+        if step_name(input_name) not in names:
+            raise FileNotFoundError(f"Columnar staging has no {step_name(input_name)} step (run the step that writes {input_name} first)")
+        steps = steps[:names.index(step_name(input_name)) + 1]
+
+    onto = get_ontology(os.path.join(OWL_DIR, manifest["seed"])).load()
+    nb_triples = 0
+    if steps:
+        # Bulk load with only the unique indexes (they drop duplicate triples); the others are rebuilt once at the end
+        db = onto.world.graph.db
+        deferred = db.execute(f"""SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name IN ('objs', 'datas')
+                                  AND sql NOT LIKE 'CREATE UNIQUE%'""").fetchall()
+        for name, _ in deferred:
+            db.execute(f"DROP INDEX {name}")
+        dictionary = TermDictionary.load(os.path.join(directory, TERMS))
+        for entry in steps:
+            nb_triples += load_step(onto, directory, entry, dictionary)
+        for _, sql in deferred:
+            db.execute(sql)
+    onto.world.graph.analyze()
+    _watermarks[id(onto.world)] = watermark(onto.world)
+    print(f"Opened columnar staging {directory}: {nb_triples} triples in {time.time() - start:.1f}s")
+    return onto
+
+
+def save_columnar(onto, directory, output_name, since=None):
+    """Append the triples added since open_columnar() (or since the watermark() `since`) as the tables of the step that replaces
+    owl/<output_name>; an earlier run of the step is replaced and the steps after it, built on that run, are dropped"""
+    start = time.time()
+    step = step_name(output_name)
+    world = onto.world
+    db = world.graph.db
+    since = since or _watermarks[id(world)]
+    manifest = read_manifest(directory)
+    terms_path = os.path.join(directory, TERMS)
+    dictionary = TermDictionary.load(terms_path) if os.path.exists(terms_path) else TermDictionary()
+
+    def term(column):
+        return f"IFNULL('<' || {column}.iri || '>', '_:' || -t.{column[1]})"
+
+    objs = pd.DataFrame(db.execute(f"""SELECT {term('rs')}, {term('rp')}, {term('ro')} FROM objs t
+                                       LEFT JOIN resources rs ON rs.storid = t.s LEFT JOIN resources rp ON rp.storid = t.p
+                                       LEFT JOIN resources ro ON ro.storid = t.o WHERE t.rowid > ?""", (since["objs"],)).fetchall(),
+                        columns=["s", "p", "o"])
+    datas = pd.DataFrame(db.execute(f"""SELECT {term('rs')}, {term('rp')}, t.o, t.d FROM datas t
+                                        LEFT JOIN resources rs ON rs.storid = t.s LEFT JOIN resources rp ON rp.storid = t.p
+                                        WHERE t.rowid > ?""", (since["datas"],)).fetchall(),
+                         columns=["s", "p", "o", "d"])
+
+    names = [entry["name"] for entry in manifest["steps"]]
+    kept = manifest["steps"][:names.index(step) if step in names else len(names)]
+    for stale in manifest["steps"][len(kept):]:
+        shutil.rmtree(os.path.join(directory, stale["name"]), ignore_errors=True)
+    shutil.rmtree(os.path.join(directory, step), ignore_errors=True)
+    os.makedirs(os.path.join(directory, step))
+
+    tables = []
+    for k, (predicate, rows) in enumerate(objs.groupby("p", sort=True)):
+        table = np.column_stack([dictionary.encode_series(rows["s"]), dictionary.encode_series(rows["o"])])
+        tables.append({"kind": "objs", "predicate": dictionary.encode(predicate), "file": f"{step}/objs_{k}.npy", "rows": len(table)})
+        np.save(os.path.join(directory, tables[-1]["file"]), table)
+
+    datas["type"] = [type(value).__name__ for value in datas["o"]]
+    datas["datatype"] = [world._unabbreviate(d) if isinstance(d, int) and d else (d or None) for d in datas["d"]]
+    for k, ((predicate, datatype, value_type), rows) in enumerate(datas.groupby(["p", "datatype", "type"], sort=True, dropna=False)):
+        table = np.column_stack([dictionary.encode_series(rows["s"]), dictionary.encode_series(rows["o"].astype(str))])
+        tables.append({"kind": "datas", "predicate": dictionary.encode(predicate), "datatype": None if pd.isna(datatype) else datatype,
+                       "type": value_type, "file": f"{step}/datas_{k}.npy", "rows": len(table)})
+        np.save(os.path.join(directory, tables[-1]["file"]), table)
+
+    dictionary.save(terms_path + ".tmp")
+    os.replace(terms_path + ".tmp", terms_path)
+    manifest["steps"] = kept + [{"name": step, "tables": tables}]
+    write_manifest(directory, manifest)
+    nb_triples = sum(entry["rows"] for entry in tables)
+    print(f"Saved columnar step {step}: {nb_triples} triples in {len(tables)} tables, {len(dictionary)} terms ({time.time() - start:.1f}s)")
+    return nb_triples
+
+
+if __name__ == "__main__":
+    parser = stage_argparser("Export the columnar staging tables to RDF/XML or N-Triples")
+    parser.add_argument("--export", required=True, help="output file name, written to owl/")
+    parser.add_argument("--format", default="rdfxml", choices=["rdfxml", "ntriples"])
+    args = parser.parse_args()
+    if not args.columnar:
+        parser.error("--columnar (or PKG2020_COLUMNAR) is required")
+
+    onto = open_columnar(args.columnar, None)
+    onto.save(file=os.path.join(OWL_DIR, args.export), format=args.format)
+    print(f"Exported: {args.export}")
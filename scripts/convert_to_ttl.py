@@ -1,81 +1,465 @@
 """
-PKG2020 OWL to TTL Converter - Format Conversion for GraphDB Upload
-PURPOSE: Converts the final OWL ontology (RDF/XML format) to Turtle (TTL) format for GraphDB upload.
-HOW: Loads pkg2020_final.owl using OWLReady2, then saves as N-Triples format which GraphDB can import.
-USAGE: Run after all populate scripts complete. Output file is pkg2020_final.ttl (~291MB).
-NOTE: GraphDB Sandbox has file size limits; use sample TTL for smaller uploads if needed.
-OUTPUT: Saves pkg2020_final.ttl in the owl/ directory ready for GraphDB import.
+PKG2020 OWL to TTL Converter - Streaming Turtle / N-Triples Export for GraphDB Upload
+PURPOSE: Exports the final graph as real Turtle (or N-Triples) for GraphDB upload, with memory bounded by the batch size, not the graph.
+HOW: Triples are read straight from the SQLite quadstore in (subject, predicate) order - one merge over the objs/datas (s,p)
+     indexes, IRIs joined in SQL - --batch-size rows at a time, and written as they arrive. Turtle groups a subject's predicates
+     with ';' and objects with ',', abbreviates IRIs with @prefix (pkg:, rdf:, rdfs:, owl:, xsd:, swrl:), writes rdf:type as `a`,
+     xsd:string literals as plain strings and xsd:integer literals as bare numbers.
+SOURCE: --store (or PKG2020_STORE) streams the pipeline store as it is; otherwise owl/pkg2020_final.owl is first parsed into a
+     temporary on-disk World, so no Python individual is ever created.
+COMPRESSION: --compress gzip|zstd compresses on the fly (.gz / .zst is appended; zstd needs `pip install zstandard`).
+SNAPSHOT: --format snapshot writes owl/pkg2020_final.pkgsnap instead, a compact binary graph with memory-mapped triple-pattern
+     lookups (rdf_snapshot.py).
+SHARDS: --shards N partitions subjects by a hash of their storid (--shard-by class: by class group - authors, articles,
+     bioentities, projects, other) into files written concurrently by worker processes, each streaming its own read-only
+     connection, plus manifest.json with the triples, bytes and sha256 of every shard. A subject's triples never span two
+     shards, and blank nodes (file-local labels) stay in the first / "other" shard with every subject that refers to them,
+     so each shard loads - and can be retried - on its own.
+KEY FEATURE: Statistics are SQL counts; nothing proportional to the graph (individual lists, IRI caches) is held in memory.
+NOTE: GraphDB Sandbox has file size limits: prefixed Turtle is far smaller than N-Triples (the old ~291MB .ttl was N-Triples),
+      and GraphDB imports .ttl.gz directly. --format ntriples writes the same lines as OWLReady2's ntriples serializer, except
+      that a carriage return in a literal is escaped (\r) instead of written as is.
+OUTPUT: Saves pkg2020_final.ttl (.nt with --format ntriples) in the owl/ directory ready for GraphDB import;
+        with shards, owl/pkg2020_final_shards/pkg2020_final-<shard>.ttl and manifest.json.
+PROFILE: --profile (or PKG2020_PROFILE) writes a run report to owl/profiles/ (load / export phases, see stage_profile.py).
+USAGE: python convert_to_ttl.py [--store ../owl/pkg2020.sqlite3] [--format turtle|ntriples] [--compress gzip|zstd]
+       [--shards 8 | --shard-by class] [--jobs 4]
 """
-from owlready2 import *
+from owlready2 import World, rdf_type, rdfs_subclassof, owl_named_individual, owl_class
+from stage_profile import add_profile_argument, profile_stage
+from stage_store import ONTOLOGY_IRI, STREAMING_CACHE_KB, OWL_DIR
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+import argparse
+import gzip
+import hashlib
+import json
+import multiprocessing
 import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
 
-# Get script directory for relative paths
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+try:
+    import zstandard
+    ZSTD = True
+except ImportError:
+    ZSTD = False
+
+INPUT_OWL = "pkg2020_final.owl"
+OUTPUT_NAME = "pkg2020_final"
+EXTENSIONS = {"turtle": ".ttl", "ntriples": ".nt", "snapshot": ".pkgsnap"}
+COMPRESSED = {None: "", "gzip": ".gz", "zstd": ".zst"}
+FORMAT_NAMES = {"turtle": "Turtle", "ntriples": "N-Triples", "snapshot": "a binary snapshot"}
+DEFAULT_BATCH = 50000
+MANIFEST = "manifest.json"
+HASH_MULTIPLIER = 2654435761
+# --shard-by class: one shard per group (a class and its subclasses), everything else (T-Box, affiliations, ...) in "other"
+CLASS_SHARDS = [("authors", ["Author"]), ("articles", ["Article"]), ("bioentities", ["BioEntity"]), ("projects", ["NIHProject"])]
+
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+PREFIXES = {
+    "pkg": ONTOLOGY_IRI,
+    "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "rdfs": "http://www.w3.org/2000/01/rdf-schema#",
+    "owl": "http://www.w3.org/2002/07/owl#",
+    "xsd": XSD,
+    "swrl": "http://www.w3.org/2003/11/swrl#",
+}
+NAMESPACES = {namespace: prefix for prefix, namespace in PREFIXES.items()}
+# Turtle PN_LOCAL, restricted to the characters the pipeline's sanitized names use; anything else stays a full <IRI>
+LOCAL_NAME = re.compile(r"[A-Za-z0-9_](?:[A-Za-z0-9_.-]*[A-Za-z0-9_-])?")
+INTEGER = re.compile(r"[+-]?[0-9]+")
+
+# Both tables in (s, p) order: SQLite merges the two index scans, so rows stream without a sort
+TRIPLES_QUERY = """
+    SELECT t.s, rs.iri, t.p, rp.iri, t.o, ro.iri, NULL, NULL FROM objs t INDEXED BY index_objs_sp
+        LEFT JOIN resources rs ON rs.storid = t.s JOIN resources rp ON rp.storid = t.p LEFT JOIN resources ro ON ro.storid = t.o
+        WHERE t.c = ? {where}
+    UNION ALL
+    SELECT t.s, rs.iri, t.p, rp.iri, t.o, NULL, t.d, rd.iri FROM datas t INDEXED BY index_datas_sp
+        LEFT JOIN resources rs ON rs.storid = t.s JOIN resources rp ON rp.storid = t.p LEFT JOIN resources rd ON rd.storid = t.d
+        WHERE t.c = ? {where}
+    ORDER BY 1, 3"""
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\r", "\\r")
+
+
+def iter_triples(db, c, batch_size=DEFAULT_BATCH, where="", params=()):
+    """Rows (s, s_iri, p, p_iri, o, o_iri, d, d_iri) of graph c, fetched batch_size at a time; d is None for object triples.
+    where: an extra "AND ..." condition on the subject t.s, with its params"""
+    cursor = db.execute(TRIPLES_QUERY.format(where=where), (c, *params, c, *params))
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+def ntriples_literal(o, d, d_iri):
+    """N-Triples literal of a datas value o with OWLReady2 datatype d (storid, "@lang" or 0) and its IRI d_iri"""
+    if isinstance(d, str) and d.startswith("@"):
+        return f'"{escape(o)}"{d}'
+    if d == 0:
+        return f'"{escape(o)}"'
+    return f'"{escape(o)}"^^<{d_iri}>'
+
+
+def ntriples_terms(s, s_iri, p, p_iri, o, o_iri, d, d_iri):
+    """(subject, predicate, object) N-Triples terms of an iter_triples() row"""
+    subject = f"_:{-s}" if s < 0 else f"<{s_iri}>"
+    if d is None:
+        return subject, f"<{p_iri}>", f"_:{-o}" if o < 0 else f"<{o_iri}>"
+    return subject, f"<{p_iri}>", ntriples_literal(o, d, d_iri)
+
+
+class NTriplesWriter:
+    """One line per triple, formatted like OWLReady2's ntriples serializer"""
+
+    def __init__(self, f):
+        self.f = f
+        self.nb_triples = 0
+
+    def literal(self, o, d, d_iri):
+        return ntriples_literal(o, d, d_iri)
+
+    def write(self, rows):
+        self.f.write("".join("%s %s %s .\n" % ntriples_terms(*row) for row in rows).encode("utf-8"))
+        self.nb_triples += len(rows)
+
+    def close(self):
+        pass
+
+
+class TurtleWriter(NTriplesWriter):
+    """Turtle with @prefix abbreviations; consecutive triples of a subject share it (';'), of a predicate share both (',')"""
+
+    def __init__(self, f):
+        super().__init__(f)
+        self.subject = self.predicate = None
+        self.nb_subjects = 0
+        f.write("".join(f"@prefix {prefix}: <{namespace}> .\n" for prefix, namespace in PREFIXES.items()).encode("utf-8") + b"\n")
+
+    @staticmethod
+    @lru_cache(maxsize=1 << 16)
+    def term(iri):
+        """pkg:Author_1 for an IRI in one of the PREFIXES namespaces with a plain local name, <iri> otherwise"""
+        cut = max(iri.rfind("#"), iri.rfind("/")) + 1
+        prefix = NAMESPACES.get(iri[:cut])
+        if prefix and LOCAL_NAME.fullmatch(iri[cut:]):
+            return f"{prefix}:{iri[cut:]}"
+        return f"<{iri}>"
+
+    def literal(self, o, d, d_iri):
+        if d_iri == XSD + "string":
+            return f'"{escape(o)}"'
+        if d_iri == XSD + "integer" and INTEGER.fullmatch(str(o)):
+            return str(o)
+        if d_iri is not None:
+            return f'"{escape(o)}"^^{self.term(d_iri)}'
+        return super().literal(o, d, d_iri)
+
+    def write(self, rows):
+        parts = []
+        for s, s_iri, p, p_iri, o, o_iri, d, d_iri in rows:
+            if d is None:
+                value = f"_:{-o}" if o < 0 else self.term(o_iri)
+            else:
+                value = self.literal(o, d, d_iri)
+            if s != self.subject:
+                if self.subject is not None:
+                    parts.append(" .\n")
+                parts.append(f"_:{-s}" if s < 0 else self.term(s_iri))
+                parts.append(" a " if p_iri == RDF_TYPE else f" {self.term(p_iri)} ")
+                self.subject, self.predicate = s, p
+                self.nb_subjects += 1
+            elif p != self.predicate:
+                parts.append(" ;\n    a " if p_iri == RDF_TYPE else f" ;\n    {self.term(p_iri)} ")
+                self.predicate = p
+            else:
+                parts.append(", ")
+            parts.append(value)
+        self.f.write("".join(parts).encode("utf-8"))
+        self.nb_triples += len(rows)
+
+    def close(self):
+        if self.subject is not None:
+            self.f.write(b" .\n")
+
+
+def open_output(path, compress):
+    """Binary file object for path, compressed on the fly"""
+    if compress == "gzip":
+        return gzip.open(path, "wb", compresslevel=6)
+    if compress == "zstd":
+        if not ZSTD:
+            raise ImportError("--compress zstd needs the zstandard package (pip install zstandard)")
+        return zstandard.ZstdCompressor(level=9).stream_writer(open(path, "wb"))
+    return open(path, "wb", buffering=1 << 20)
+
+
+def export_graph(db, c, path, format="turtle", compress=None, batch_size=DEFAULT_BATCH, where="", params=()):
+    """Stream graph c of the quadstore behind db to path; returns the writer (nb_triples, nb_subjects for Turtle)"""
+    with open_output(path, compress) as f:
+        writer = (TurtleWriter if format == "turtle" else NTriplesWriter)(f)
+        for rows in iter_triples(db, c, batch_size, where, params):
+            writer.write(rows)
+        writer.close()
+    return writer
+
+
+def graph_statistics(db, c):
+    """(classes, named individuals) of graph c, counted in SQL"""
+    count = "SELECT COUNT(*) FROM objs WHERE c = ? AND p = ? AND o = ?"
+    return db.execute(count, (c, rdf_type, owl_class)).fetchone()[0], db.execute(count, (c, rdf_type, owl_named_individual)).fetchone()[0]
+
+
+def open_readonly(path):
+    return sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+
+
+def store_graph(store):
+    """(read-only connection, ontology graph id) of a pipeline store"""
+    db = open_readonly(store)
+    row = db.execute("SELECT c FROM ontologies WHERE iri = ?", (ONTOLOGY_IRI,)).fetchone()
+    if row is None:
+        raise ValueError(f"{store} has no {ONTOLOGY_IRI} ontology")
+    return db, row[0]
+
+
+def open_source(store, owl_path, tmp):
+    """(read-only connection, store path, ontology graph id) of a pipeline store, or - without one - of owl_path parsed into
+    a temporary store in the directory tmp"""
+    if store:
+        db, c = store_graph(store)
+        return db, store, c
+    # Parse into a temporary on-disk World: SQLite, not Python objects, holds the graph
+    print("   (Parsing RDF/XML into a temporary store...)")
+    db_path = os.path.join(tmp, "convert.sqlite3")
+    world = World(filename=db_path)
+    world.graph.db.execute(f"PRAGMA cache_size = -{STREAMING_CACHE_KB}")
+    onto = world.get_ontology(owl_path).load()
+    world.save()
+    c = onto.graph.c
+    # OWLReady2 keeps its store locked; shard workers read it through their own connections
+    world.close()
+    return open_readonly(db_path), db_path, c
+
+
+def blank_referrers_sql(c):
+    """Subjects that must stay in the first (schema) shard: blank nodes, and subjects with a blank-node object.
+    Blank node labels are local to a file, so a blank node and every triple that mentions it have to share a shard."""
+    return f"(t.s < 0 OR t.s IN (SELECT b.s FROM objs b WHERE b.c = {int(c)} AND b.o < 0))"
+
+
+def class_groups(db, c):
+    """(shard name, storids of the group's classes and their subclasses) per CLASS_SHARDS group present in graph c"""
+    groups = []
+    for name, roots in CLASS_SHARDS:
+        ids = [row[0] for row in db.execute(f"""
+            WITH RECURSIVE sub(storid) AS (
+                SELECT storid FROM resources WHERE iri IN ({','.join('?' * len(roots))})
+                UNION SELECT o.s FROM objs o JOIN sub ON o.o = sub.storid WHERE o.p = ? AND o.c = ?)
+            SELECT storid FROM sub""", [ONTOLOGY_IRI + root for root in roots] + [rdfs_subclassof, c])]
+        if ids:
+            groups.append((name, ids))
+    return groups
+
+
+def shard_plan(db, c, shards, shard_by):
+    """(shard names, SQL expression of t.s giving its shard number); every triple of a subject lands in one shard"""
+    if shard_by == "class":
+        groups = class_groups(db, c)
+        other = len(groups)
+        cases = "".join(f" WHEN EXISTS (SELECT 1 FROM objs x INDEXED BY index_objs_sp WHERE x.s = t.s AND x.p = {rdf_type} AND x.o IN "
+                        f"({','.join(str(storid) for storid in ids)})) THEN {k}" for k, (_, ids) in enumerate(groups))
+        return [name for name, _ in groups] + ["other"], f"CASE WHEN {blank_referrers_sql(c)} THEN {other}{cases} ELSE {other} END"
+    # Multiplicative hash of the storid: consecutive storids (an author, its article, their authorship) spread evenly
+    return ([f"{k:0{len(str(shards - 1))}d}" for k in range(shards)],
+            f"CASE WHEN {blank_referrers_sql(c)} THEN 0 ELSE ((t.s * {HASH_MULTIPLIER}) % 4294967296) % {int(shards)} END")
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_shard(db_path, c, path, format, compress, batch_size, shard_sql, k):
+    """Worker: stream the triples of shard k to path through its own read-only connection; returns its manifest entry"""
+    start = time.time()
+    db = open_readonly(db_path)
+    writer = export_graph(db, c, path, format, compress, batch_size, f"AND ({shard_sql}) = ?", (k,))
+    db.close()
+    return {"file": os.path.basename(path), "triples": writer.nb_triples, "bytes": os.path.getsize(path),
+            "sha256": file_sha256(path), "seconds": round(time.time() - start, 2)}
+
+
+def export_shards(db, db_path, c, directory, base_name, format="turtle", compress=None, batch_size=DEFAULT_BATCH,
+                  shards=4, shard_by="subject", jobs=None):
+    """Write graph c as independent shard files on a process pool, plus manifest.json; returns the manifest"""
+    names, shard_sql = shard_plan(db, c, shards, shard_by)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    extension = EXTENSIONS[format] + COMPRESSED[compress]
+    paths = [os.path.join(directory, f"{base_name}-{name}{extension}") for name in names]
+
+    entries = [None] * len(names)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=jobs or min(len(names), os.cpu_count()), mp_context=context) as pool:
+        futures = {pool.submit(export_shard, db_path, c, paths[k], format, compress, batch_size, shard_sql, k): k
+                   for k in range(len(names))}
+        for future in as_completed(futures):
+            k = futures[future]
+            entries[k] = dict(future.result(), shard=names[k])
+            print(f"   Shard {names[k]}: {entries[k]['triples']:,} triples, {entries[k]['bytes'] / 2**20:.2f} MB "
+                  f"in {entries[k]['seconds']:.1f}s")
+
+    manifest = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "format": format,
+        "compress": compress,
+        "shard_by": shard_by,
+        "triples": sum(entry["triples"] for entry in entries),
+        "shards": entries,
+    }
+    with open(os.path.join(directory, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def convert_owl_to_ttl(profile_mode=None, store=None, format="turtle", compress=None, batch_size=DEFAULT_BATCH, output=None,
+                       shards=None, shard_by="subject", jobs=None):
+    """Convert the final graph to Turtle (or N-Triples) for GraphDB, as one file or as shards (shards / shard_by)"""
+    with profile_stage("convert_to_ttl", profile_mode) as profile:
+        return _convert_owl_to_ttl(profile, store, format, compress, batch_size, output, shards, shard_by, jobs)
+
+def _convert_owl_to_ttl(profile, store, format, compress, batch_size, output, shards, shard_by, jobs):
+    owl_path = os.path.join(OWL_DIR, INPUT_OWL)
+    name = output or OUTPUT_NAME + EXTENSIONS[format]
+    ttl_path = os.path.join(OWL_DIR, name + COMPRESSED[compress])
+    shard_dir = os.path.join(OWL_DIR, os.path.splitext(name)[0] + "_shards")
 
-def convert_owl_to_ttl():
-    """Convert OWL file to Turtle format for GraphDB"""
-    
-    owl_path = os.path.join(PROJECT_DIR, "owl", "pkg2020_final.owl")
-    ttl_path = os.path.join(PROJECT_DIR, "owl", "pkg2020_final.ttl")
-    
     print("=" * 60)
     print("OWL TO TTL CONVERTER")
     print("=" * 60)
-    
-    # Check if source file exists
-    if not os.path.exists(owl_path):
-        print(f"❌ ERROR: Source file not found: {owl_path}")
-        return False
-    
-    print(f"\n📥 Loading: {owl_path}")
-    print("   (This may take a while for large files...)")
-    
-    try:
-        onto = get_ontology(owl_path).load()
-        print(f"   ✅ Loaded successfully")
-        
-        # Get statistics
-        classes = list(onto.classes())
-        individuals = list(onto.individuals())
-        print(f"\n📊 Statistics:")
-        print(f"   Classes: {len(classes)}")
-        print(f"   Individuals: {len(individuals):,}")
-        
-    except Exception as e:
-        print(f"❌ ERROR loading ontology: {e}")
-        return False
-    
-    print(f"\n📤 Converting to TTL format...")
-    print(f"   Output: {ttl_path}")
-    
-    try:
-        # Save as ntriples (compatible with GraphDB)
-        onto.save(file=ttl_path, format="ntriples")
-        
-        # Get file size
-        size_bytes = os.path.getsize(ttl_path)
-        size_mb = size_bytes / (1024 * 1024)
-        
-        print(f"\n   ✅ Conversion complete!")
-        print(f"   File size: {size_mb:.2f} MB")
-        
-    except Exception as e:
-        print(f"❌ ERROR saving TTL: {e}")
+
+    # Check if source exists
+    source = store or owl_path
+    if not os.path.exists(source):
+        print(f"❌ ERROR: Source not found: {source}")
         return False
-    
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"\n📥 Opening: {source}")
+        try:
+            with profile.phase("load"):
+                db, db_path, c = open_source(store, owl_path, tmp)
+            print(f"   ✅ Opened successfully")
+
+            # Get statistics
+            nb_classes, nb_individuals = graph_statistics(db, c)
+            print(f"\n📊 Statistics:")
+            print(f"   Classes: {nb_classes}")
+            print(f"   Individuals: {nb_individuals:,}")
+
+        except Exception as e:
+            print(f"❌ ERROR loading ontology: {e}")
+            return False
+
+        print(f"\n📤 Converting to {FORMAT_NAMES[format]}{f' ({compress})' if compress else ''}...")
+        print(f"   Output: {shard_dir if shards or shard_by == 'class' else ttl_path}")
+
+        if shards or shard_by == "class":
+            try:
+                with profile.phase("export"):
+                    manifest = export_shards(db, db_path, c, shard_dir, os.path.splitext(name)[0], format, compress, batch_size,
+                                             shards, shard_by, jobs)
+                db.close()
+                size_mb = sum(entry["bytes"] for entry in manifest["shards"]) / (1024 * 1024)
+                profile.info.update(output_mb=round(size_mb, 1), triples=manifest["triples"], format=format, compress=compress,
+                                    shards=len(manifest["shards"]), shard_by=shard_by)
+                print(f"\n   ✅ Conversion complete!")
+                print(f"   Triples: {manifest['triples']:,} in {len(manifest['shards'])} shards ({size_mb:.2f} MB)")
+                print(f"   Manifest: {os.path.join(shard_dir, MANIFEST)}")
+            except Exception as e:
+                print(f"❌ ERROR writing shards: {e}")
+                return False
+            print("\nLoad the shards in parallel (GraphDB: Import > Server files or the importrdf tool); a failed shard is")
+            print(f"retried on its own and checked against the triples / sha256 recorded in {MANIFEST}.")
+            return True
+
+        if format == "snapshot":
+            from rdf_snapshot import write_snapshot
+            try:
+                with profile.phase("export"):
+                    nb_triples = write_snapshot(db, c, ttl_path, batch_size)
+                db.close()
+                size_mb = os.path.getsize(ttl_path) / (1024 * 1024)
+                profile.info.update(output_mb=round(size_mb, 1), triples=nb_triples, format=format)
+                print(f"\n   ✅ Snapshot written: {nb_triples:,} triples, {size_mb:.2f} MB")
+                print(f"   Query it with rdf_snapshot.Snapshot.open() or: python rdf_snapshot.py --match S P O")
+            except Exception as e:
+                print(f"❌ ERROR writing snapshot: {e}")
+                return False
+            return True
+
+        try:
+            with profile.phase("export"):
+                writer = export_graph(db, c, ttl_path, format, compress, batch_size)
+            db.close()
+
+            # Get file size
+            size_bytes = os.path.getsize(ttl_path)
+            size_mb = size_bytes / (1024 * 1024)
+
+            profile.info.update(output_mb=round(size_mb, 1), triples=writer.nb_triples, format=format, compress=compress)
+            print(f"\n   ✅ Conversion complete!")
+            print(f"   Triples: {writer.nb_triples:,}")
+            print(f"   File size: {size_mb:.2f} MB")
+
+        except Exception as e:
+            print(f"❌ ERROR saving TTL: {e}")
+            return False
+
     print("\n" + "=" * 60)
     print("NEXT STEPS:")
     print("=" * 60)
     print("1. Go to GraphDB Sandbox: https://graphdb.ontotext.com/")
     print("2. Create a new repository or use existing")
-    print("3. Import > Upload RDF files > Select pkg2020_final.ttl")
+    print(f"3. Import > Upload RDF files > Select {os.path.basename(ttl_path)}")
     print("4. Wait for import to complete")
     print("5. Test with SPARQL queries")
     print("=" * 60)
-    
+
     return True
 
 
 if __name__ == "__main__":
-    convert_owl_to_ttl()
+    parser = argparse.ArgumentParser(description="Stream the final graph to Turtle or N-Triples for GraphDB")
+    parser.add_argument("--store", default=os.environ.get("PKG2020_STORE"),
+                        help=f"pipeline store to export (default: $PKG2020_STORE, else owl/{INPUT_OWL})")
+    parser.add_argument("--format", default="turtle", choices=list(EXTENSIONS))
+    parser.add_argument("--compress", default=None, choices=["gzip", "zstd"], help="compress the output on the fly")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH, help="triples fetched from the store per batch")
+    parser.add_argument("--output", default=None,
+                        help=f"output file name in owl/ (default: {OUTPUT_NAME}.ttl / .nt; .gz / .zst is appended when compressing)")
+    parser.add_argument("--shards", type=int, default=None,
+                        help="write this many subject-hash shards plus a manifest to owl/<output>_shards/ instead of one file")
+    parser.add_argument("--shard-by", default="subject", choices=["subject", "class"],
+                        help="class: one shard per class group (authors, articles, bioentities, projects, other); --shards is not used")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes writing shards (default: one per shard, up to the CPUs)")
+    args = add_profile_argument(parser).parse_args()
+    if args.shards is not None and args.shards < 1:
+        parser.error("--shards must be at least 1")
+    if args.format == "snapshot" and (args.compress or args.shards or args.shard_by == "class"):
+        parser.error("--format snapshot is one uncompressed, memory-mappable file (no --compress / --shards)")
+    convert_owl_to_ttl(args.profile, args.store, args.format, args.compress, args.batch_size, args.output,
+                       args.shards, args.shard_by, args.jobs)
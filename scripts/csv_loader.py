@@ -0,0 +1,139 @@
+"""
+PKG2020 CSV Loader - Shared Reader for the OA0x Data Tables
+PURPOSE: One place where populate_* scripts read the PKG2020 CSVs, either whole or as a stream of fixed-size chunks.
+HOW: read_table() wraps pd.read_csv; with chunk_size it returns pandas' chunk iterator, whose frames keep a running row index.
+KEY FEATURE: iter_frames() lets a populate() accept a DataFrame or a chunk stream alike - only lookup state survives between chunks.
+TYPED: Tables listed in SCHEMAS are read with only the columns the steps use, integer ids and years in their narrowest width
+       (nullable Int when a value is missing, so no more float64 "1.0" ids), `category` for enumerations (Type, MutationType,
+       Country, Degree, ...) and, for whole-table reads, the pyarrow engine when it is installed. Year columns are free text in
+       places: they are parsed with errors="coerce", like the steps' int() fallbacks.
+RESUME: resume_offsets() makes read_table() skip the rows a checkpointed step already ingested (checkpoints.py).
+DATA DIR: data/ by default; set PKG2020_DATA_DIR to read the tables from somewhere else (benchmarks, synthetic data).
+"""
+import numpy as np
+import pandas as pd
+import csv
+import os
+
+try:
+    import pyarrow  # noqa: F401  (read_csv's multithreaded engine)
+    PYARROW = True
+except ImportError:
+    PYARROW = False
+
+# Get script directory for relative paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+
+# Per table: the columns the populate steps use and their dtypes; columns a file does not have are skipped.
+# Integer columns are parsed by pandas' fast int64 path and narrowed afterwards (narrow_integers); category / str go to the parser.
+SCHEMAS = {
+    "OA01_Author_List.csv": {"PMID": "int64", "AND_ID": "int64", "AuOrder": "int16", "LastName": "str", "ForeName": "str",
+                             "Initials": "str"},
+    "OA02_Bio_entities_Main.csv": {"id": "int64", "PMID": "int64", "Start": "int32", "End": "int32", "Mention": "str",
+                                   "EntityID": "str", "Type": "category"},
+    "OA03_Bio_entities_Mutation.csv": {"id": "int64", "Main_id": "int64", "Mention": "str", "MutationType": "category",
+                                       "NormalizedName": "str"},
+    "OA04_Affiliations.csv": {"id": "int64", "AND_ID": "int64", "Affiliation": "str", "City": "str", "State": "category",
+                              "Country": "category"},
+    "OA05_Researcher_Employment.csv": {"id": "int64", "AND_ID": "int64", "Organization": "str", "StartYear": "int16",
+                                       "EndYear": "int16"},
+    "OA06_Researcher_Education.csv": {"id": "int64", "AND_ID": "int64", "Institution": "str", "Degree": "category",
+                                      "StartYear": "int16", "EndYear": "int16"},
+    "OA07_NIH_Projects.csv": {"id": "int64", "AND_ID": "int64", "PMID": "int64", "ProjectNumber": "str", "PI_Name": "str"},
+}
+INTEGER_TYPES = {"int64", "int32", "int16"}
+
+_rows_read = 0
+_resume_offsets = {}  # filename -> rows ingested before the checkpoint a resumed step starts from (checkpoints.py)
+
+
+def data_path(filename):
+    """Path of a PKG2020 table inside the data directory"""
+    return os.path.join(os.environ.get("PKG2020_DATA_DIR") or os.path.join(PROJECT_DIR, "data"), filename)
+
+
+def row_limit(nrows, default):
+    """Resolve a --nrows value: None keeps the step's default sample size, 0 means the whole table"""
+    if nrows is None:
+        return default
+    return nrows or None
+
+
+def resume_offsets(offsets):
+    """Make read_table() start each table of offsets after that many rows (frames keep their original row index); {} resets"""
+    _resume_offsets.clear()
+    _resume_offsets.update(offsets)
+
+
+def resume_offset(filename):
+    """Rows of a table a resumed read_table() skips (0 when the table is read from its start)"""
+    return _resume_offsets.get(filename, 0)
+
+
+def skipped_rows(filename, columns):
+    """The rows of a table a resumed read_table() skips, reading only the given columns (empty frame when nothing is skipped)"""
+    start = _resume_offsets.get(filename, 0)
+    return read_table(filename, usecols=columns, nrows=start, start=0) if start else pd.DataFrame(columns=columns)
+
+
+def read_table(filename, chunk_size=None, start=None, **kwargs):
+    """Read a whole table, or an iterator of chunk_size-row frames when chunk_size is set; a table with a SCHEMAS entry is read typed
+    (usecols narrows its schema columns further). start skips that many data rows (default: the table's resume offset)."""
+    path = data_path(filename)
+    schema = SCHEMAS.get(filename)
+    start = _resume_offsets.get(filename, 0) if start is None else start
+    if start:
+        kwargs["skiprows"] = range(1, start + 1)
+        if kwargs.get("nrows"):
+            kwargs["nrows"] = max(kwargs["nrows"] - start, 0)
+    if schema is None:
+        data = pd.read_csv(path, chunksize=chunk_size, **kwargs)
+        return shift_index(data, start) if chunk_size is None else (shift_index(df, start) for df in data)
+
+    with open(path, newline="") as f:
+        header = next(csv.reader(f), [])
+    wanted = kwargs.pop("usecols", None) or schema
+    columns = {column: schema[column] for column in header if column in schema and column in wanted}
+    dtype = {column: kind for column, kind in columns.items() if kind not in INTEGER_TYPES}
+    # The pyarrow engine has no chunksize / nrows / skiprows
+    engine = "pyarrow" if PYARROW and chunk_size is None and kwargs.get("nrows") is None and not start else "c"
+    data = pd.read_csv(path, chunksize=chunk_size, usecols=list(columns), dtype=dtype, engine=engine, **kwargs)
+    if chunk_size is None:
+        return shift_index(narrow_integers(data, columns), start)
+    return (shift_index(narrow_integers(df, columns), start) for df in data)
+
+
+def shift_index(df, start):
+    """Row index of a frame read after skipping start rows, as if nothing had been skipped"""
+    if start:
+        df.index += start
+    return df
+
+
+def narrow_integers(df, schema):
+    """Integer columns of df in their schema width; a column with missing, non-numeric or out-of-range values (free-text years,
+    a float64 "1.0" id column) becomes the nullable Int type of that width, with those values missing"""
+    for column, kind in schema.items():
+        if kind not in INTEGER_TYPES:
+            continue
+        numbers = df[column] if pd.api.types.is_integer_dtype(df[column]) else pd.to_numeric(df[column], errors="coerce")
+        limits = np.iinfo(kind)
+        numbers = numbers.where(numbers.between(limits.min, limits.max))
+        df[column] = numbers.astype(kind if pd.api.types.is_integer_dtype(numbers) else kind.capitalize())
+    return df
+
+
+def iter_frames(data):
+    """Yield the frames of a DataFrame (itself) or of a chunk iterator; None yields nothing"""
+    global _rows_read
+    if data is None:
+        return
+    for df in [data] if isinstance(data, pd.DataFrame) else data:
+        _rows_read += len(df)
+        yield df
+
+
+def rows_read():
+    """Rows yielded by iter_frames() so far in this process (stage_profile.py's rows/s)"""
+    return _rows_read
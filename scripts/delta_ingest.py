@@ -0,0 +1,174 @@
+"""
+PKG2020 Delta Ingestion - Incremental Updates for Monthly PKG2020 Drops
+PURPOSE: Lets populate_* steps apply a new data drop to an existing store by ingesting only new or changed rows.
+HOW: Every ingested row gets a 64-bit digest (vectorized pd.util.hash_pandas_object) stored next to the graph in the SQLite store,
+     keyed by the row's natural id (PMID+AND_ID, affiliation id, project row id...); rows sharing a key get one digest over all
+     of them. A new drop is split into new / changed / unchanged rows by joining its keys against that table; unchanged rows
+     never reach the ingestion code.
+REMOVALS: When an --incremental run reads whole tables (--nrows 0, not --resume), a stored key the new drop no longer has was
+     deleted upstream: removed() drops its digest and returns it, and the stage destroys what the row created (its Affiliation,
+     Employment, Education, BioEntity / Mutation or Authorship, the NIH links of its project). An Article or Author goes
+     with its last OA01 row. Shared individuals stay: Organizations, Institutions, and canonical BioEntities that other
+     mentions still name. A sampled or resumed run has not seen every key, so it never removes anything.
+JOINS: An unchanged row can still need re-ingesting: an enrichment row is only ingested while its Author exists, a bio-entity
+     row only linked while its Article does. The authors stage records the AND_IDs / PMIDs it created or destroyed
+     (record_presence()); later stages pass their rows that join to them as force= to split(), which re-ingests them as changed.
+KEY FEATURE: Cost is proportional to the size of the change (plus one vectorized hash pass), not to the size of the graph.
+STORE MODE: Digests are recorded on every --store build, so a full build is simply a delta against an empty store.
+OUTPUT: owl/pkg2020_delta_manifest.json - per stage: row counts and the keys that were added, changed or removed in this run.
+"""
+from owlready2 import rdf_type, destroy_entity
+from stage_store import OWL_DIR
+import numpy as np
+import pandas as pd
+import json
+import os
+import time
+
+MANIFEST_PATH = os.path.join(OWL_DIR, "pkg2020_delta_manifest.json")
+PRESENCE_TABLE = "delta_presence"
+
+
+def existing_names(onto, cls):
+    """Local names of every individual of cls already in the store (SQL only, no Python individuals)"""
+    rows = onto.world.graph.db.execute(
+        "SELECT r.iri FROM objs o JOIN resources r ON r.storid = o.s WHERE o.p = ? AND o.o = ?",
+        (rdf_type, cls.storid))
+    start = len(onto.base_iri)
+    return {iri[start:] for (iri,) in rows}
+
+
+def clear_values(onto, names, props):
+    """Delete the data values of props on the named individuals, so a changed row can write fresh ones"""
+    db = onto.world.graph.db
+    storids = [row[0] for row in (db.execute("SELECT storid FROM resources WHERE iri=?", (onto.base_iri + name,)).fetchone()
+                                  for name in names) if row]
+    for prop in props:
+        db.executemany("DELETE FROM datas WHERE s=? AND p=?", [(s, prop.storid) for s in storids])
+
+
+def remove_edges(onto, prop, subjects, objects):
+    """Delete the (subject, prop, object) triples of aligned columns of local names"""
+    onto.world.graph.db.executemany(
+        """DELETE FROM objs WHERE p = ? AND s = (SELECT storid FROM resources WHERE iri = ?)
+                                     AND o = (SELECT storid FROM resources WHERE iri = ?)""",
+        [(prop.storid, onto.base_iri + s, onto.base_iri + o) for s, o in zip(subjects, objects)])
+
+
+def whole_drop(args):
+    """Whether an --incremental run reads every row of its tables, so a key missing from the drop was deleted upstream"""
+    return bool(getattr(args, "incremental", False)) and args.nrows == 0 and not getattr(args, "resume", False)
+
+
+def destroy_individuals(onto, names):
+    """Remove the named individuals and every triple about them (changed rows are re-created from scratch)"""
+    for name in names:
+        entity = onto[name]
+        if entity is not None:
+            destroy_entity(entity)
+
+
+def record_presence(onto, kind, created, destroyed):
+    """Replace the ids of kind ("Author" AND_IDs, "Article" PMIDs) whose individual the last run created or destroyed"""
+    db = onto.world.graph.db
+    db.execute(f"CREATE TABLE IF NOT EXISTS {PRESENCE_TABLE} (kind TEXT, id INTEGER, PRIMARY KEY (kind, id))")
+    db.execute(f"DELETE FROM {PRESENCE_TABLE} WHERE kind = ?", (kind,))
+    db.executemany(f"INSERT OR IGNORE INTO {PRESENCE_TABLE} VALUES (?,?)", ((kind, int(i)) for i in [*created, *destroyed]))
+
+
+def presence_changed(onto, kind):
+    """Ids of kind that the last run of the authors stage created or destroyed (a list, for Series.isin())"""
+    db = onto.world.graph.db
+    if not db.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (PRESENCE_TABLE,)).fetchone():
+        return []
+    return [i for (i,) in db.execute(f"SELECT id FROM {PRESENCE_TABLE} WHERE kind = ?", (kind,))]
+
+
+class DeltaTracker:
+    """Row digests of one stage, persisted in the store"""
+
+    def __init__(self, onto, stage, complete=False):
+        """complete: this run reads the whole drop (whole_drop()), so removed() may report the keys it lacks"""
+        self.db = onto.world.graph.db
+        self.stage = stage
+        self.complete = complete
+        self.db.execute("CREATE TABLE IF NOT EXISTS delta_digests (stage TEXT, key TEXT, digest INTEGER, PRIMARY KEY (stage, key))")
+        self.db.execute("CREATE TEMP TABLE IF NOT EXISTS delta_keys (key TEXT PRIMARY KEY)")
+        self.db.execute("CREATE TEMP TABLE IF NOT EXISTS delta_seen (stage TEXT, key TEXT, PRIMARY KEY (stage, key))")
+        self.db.execute("DELETE FROM delta_seen WHERE stage = ?", (stage,))
+        self.counts = {"rows": 0, "new": 0, "changed": 0, "unchanged": 0, "removed": 0}
+        self.new_keys = []
+        self.changed_keys = []
+        self.removed_keys = []
+
+    def split(self, df, keys, columns, force=None):
+        """Keep the rows of df that are new or changed; returns (delta frame, boolean 'changed' mask over it).
+
+        keys is a Series of row keys aligned with df; columns are the fields whose change triggers a re-ingest. The rows of df
+        sharing a key (an author listed twice on one paper) are one unit: they get one digest over all of them, in order, and are
+        kept or skipped together, so the populate step sees the same rows for the key as a full build. A key's rows are
+        expected in one frame (OA01 lists the authors of a paper together). force is an optional boolean mask over df of rows
+        to re-ingest as changed even when their digest is unchanged (rows joining to an Author or Article that came or went).
+        """
+        keys = pd.Series(keys, dtype=str).reset_index(drop=True)
+        fields = df[[c for c in columns if c in df.columns]].astype(str)
+        digests = pd.Series(pd.util.hash_pandas_object(fields, index=False).to_numpy().view("int64"))
+        repeated = keys.duplicated(keep=False).to_numpy()
+        if repeated.any():
+            groups = digests[repeated].astype(str).groupby(keys[repeated].to_numpy(), sort=False).agg(",".join)
+            combined = pd.Series(pd.util.hash_array(groups.to_numpy(dtype=object)).view("int64"), index=groups.index)
+            digests[repeated] = keys[repeated].map(combined).to_numpy()
+
+        self.db.execute("DELETE FROM delta_keys")
+        self.db.executemany("INSERT OR IGNORE INTO delta_keys VALUES (?)", ((k,) for k in keys.unique()))
+        self.db.execute("INSERT OR IGNORE INTO delta_seen SELECT ?, key FROM delta_keys", (self.stage,))
+        known = dict(self.db.execute("""SELECT d.key, d.digest FROM delta_digests d JOIN delta_keys k ON k.key = d.key
+                                        WHERE d.stage = ?""", (self.stage,)))
+
+        previous = pd.Series([known.get(k) for k in keys], dtype=object)
+        new = previous.isna()
+        changed = ~new & (previous != digests)
+        if force is not None:
+            changed |= ~new & pd.Series(np.asarray(pd.Series(force, dtype="boolean").fillna(False), dtype=bool))
+        keep = (new | changed).to_numpy()
+
+        self.db.executemany("INSERT OR REPLACE INTO delta_digests VALUES (?,?,?)",
+                            zip([self.stage] * int(keep.sum()), keys[keep], digests[keep].tolist()))
+
+        self.counts["rows"] += len(df)
+        self.counts["new"] += int(new.sum())
+        self.counts["changed"] += int(changed.sum())
+        self.counts["unchanged"] += len(df) - int(keep.sum())
+        self.new_keys.extend(keys[new.to_numpy()].unique())
+        self.changed_keys.extend(keys[changed.to_numpy()].unique())
+        return df[keep], changed[keep].to_numpy()
+
+    def removed(self, prefix=""):
+        """Call after the last frame of an input: the stored keys (starting with prefix) this drop did not have, whose digests
+        are dropped; always empty unless the tracker is complete"""
+        if not self.complete:
+            return []
+        query = """FROM delta_digests WHERE stage = ?1 AND substr(key, 1, ?2) = ?3
+                   AND key NOT IN (SELECT key FROM temp.delta_seen WHERE stage = ?1)"""
+        params = (self.stage, len(prefix), prefix)
+        keys = [key for (key,) in self.db.execute(f"SELECT key {query}", params)]
+        self.db.execute(f"DELETE {query}", params)
+        self.counts["removed"] += len(keys)
+        self.removed_keys.extend(keys)
+        return keys
+
+    def write_manifest(self, path=MANIFEST_PATH):
+        """Merge this stage's delta into the manifest file"""
+        manifest = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                manifest = json.load(f)
+        manifest[self.stage] = dict(self.counts,
+                                    generated_at=time.strftime("%Y-%m-%dT%H:%M:%S"),
+                                    new_keys=self.new_keys,
+                                    changed_keys=self.changed_keys,
+                                    removed_keys=self.removed_keys)
+        with open(path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        print(f"Delta ({self.stage}): {self.counts['new']} new, {self.counts['changed']} changed, "
+              f"{self.counts['unchanged']} unchanged, {self.counts['removed']} removed rows -> {os.path.basename(path)}")
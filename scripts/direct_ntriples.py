@@ -0,0 +1,277 @@
+"""
+PKG2020 Direct N-Triples Writer - CSV Rows Straight to Triples
+PURPOSE: Fast path for the A-Box: streams OA01/OA02/OA03/OA07 rows to N-Triples lines without creating any OWLReady2 individual.
+HOW: IRIs are fully determined by the ids (Article_{pmid}, Author_{and_id}, Authorship_{pmid}_{and_id}, BioEntity_{id}, Mutation_{row},
+     NIHProject_{number}), so each chunk becomes whole columns of formatted lines built with vectorized pandas string operations.
+     The T-Box comes from OWLReady2 itself: the seed ontology plus the populate steps' declare_schema() additions.
+KEY FEATURE: Same triples, literal escaping and sanitize_iri rules as the populate_* scripts; memory holds one chunk plus the id sets.
+ENCODED: --encode keeps every triple as int32 ids of a term dictionary (term_dictionary.py) and saves owl/pkg2020_triples.npy
+     plus owl/pkg2020_terms.dict instead of text; strings are decoded only when exporting.
+NOTE: Affiliations, employment and education are not covered.
+OUTPUT: owl/pkg2020_direct.nt (or .nt.gz with --gzip) - N-Triples, loadable by GraphDB like pkg2020_final.ttl
+USAGE: python direct_ntriples.py [--nrows 0] [--chunk-size 100000] [--gzip | --encode] [--tbox pkg2020_tbox_only.owl]
+"""
+from owlready2 import *
+from stage_store import OWL_DIR, ONTOLOGY_IRI
+from csv_loader import iter_frames
+from bulk_ingest import prefixed
+from iri_utils import sanitize_series, IriMinter
+from term_dictionary import TermDictionary, TERMS_FILE, TRIPLES_FILE
+import populate_authors_articles
+import populate_affiliations
+import populate_employment
+import populate_education
+import populate_bioentities
+import populate_nih_projects
+import numpy as np
+import pandas as pd
+import argparse
+import gzip
+import io
+import os
+import time
+
+SEED_OWL = "pkg2020_constrained.owl"
+OUTPUT_NT = "pkg2020_direct.nt"
+DEFAULT_CHUNK = 100000
+
+RDF_TYPE = "<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>"
+NAMED_INDIVIDUAL = "<http://www.w3.org/2002/07/owl#NamedIndividual>"
+XSD_STRING = "http://www.w3.org/2001/XMLSchema#string"
+XSD_INTEGER = "http://www.w3.org/2001/XMLSchema#integer"
+
+# populate_bioentities: lower-cased Type -> class, anything else is a plain BioEntity
+BIOENTITY_CLASSES = {"gene": "Gene", "chemical": "Chemical", "disease": "Disease", "species": "Species"}
+
+
+def term(name):
+    """N-Triples term of one ontology entity"""
+    return f"<{ONTOLOGY_IRI}{name}>"
+
+
+def terms(names):
+    """N-Triples terms of a Series of local names"""
+    return "<" + ONTOLOGY_IRI + names + ">"
+
+
+def literals(values, datatype=XSD_STRING):
+    """Typed literals of a Series of strings, escaped as OWLReady2's N-Triples serializer does"""
+    escaped = (values.str.replace("\\", "\\\\", regex=False)
+                     .str.replace('"', '\\"', regex=False)
+                     .str.replace("\n", "\\n", regex=False))
+    return '"' + escaped + '"^^<' + datatype + ">"
+
+
+class NTriplesWriter:
+    """Writes whole columns of triples to a binary file object"""
+
+    def __init__(self, f):
+        self.f = f
+        self.nb_triples = 0
+
+    def write(self, subjects, predicate, objects):
+        """subjects / objects are aligned Series of terms, predicate a single term"""
+        lines = subjects + " " + predicate + " " + objects + " .\n"
+        self.f.write("".join(lines).encode("utf-8"))
+        self.nb_triples += len(lines)
+
+    def individuals(self, subjects, cls):
+        self.write(subjects, RDF_TYPE, pd.Series(NAMED_INDIVIDUAL, index=subjects.index))
+        self.write(subjects, RDF_TYPE, pd.Series(term(cls), index=subjects.index))
+
+    def values(self, subjects, prop, values, datatype=XSD_STRING):
+        """Data triples; missing values are skipped like the populate steps' pd.notna() checks"""
+        present = values.notna()
+        if datatype == XSD_INTEGER:
+            values = values[present].astype("int64").astype(str)
+        else:
+            values = values[present].astype(str)
+        self.write(subjects[present], term(prop), literals(values, datatype))
+
+
+class EncodedTriplesWriter(NTriplesWriter):
+    """Keeps triples as int32 ids of a TermDictionary instead of writing lines"""
+
+    def __init__(self, dictionary):
+        super().__init__(None)
+        self.dictionary = dictionary
+        self.blocks = []
+
+    def write(self, subjects, predicate, objects):
+        block = np.empty((len(subjects), 3), dtype=np.int32)
+        block[:, 0] = self.dictionary.encode_series(subjects)
+        block[:, 1] = self.dictionary.encode(predicate)
+        block[:, 2] = self.dictionary.encode_series(objects)
+        self.blocks.append(block)
+        self.nb_triples += len(block)
+
+    def write_lines(self, text):
+        """Encode N-Triples text (subjects and predicates never contain spaces)"""
+        terms = pd.Series(text.splitlines()).str.split(" ", n=2, expand=True)
+        for predicate, rows in terms.groupby(1, sort=False):
+            self.write(rows[0], predicate, rows[2].str[:-2])
+
+    def triples(self):
+        return np.concatenate(self.blocks) if self.blocks else np.empty((0, 3), dtype=np.int32)
+
+
+def write_tbox(f, tbox_name):
+    """The seed ontology plus every populate step's schema declarations, serialized by OWLReady2"""
+    onto = get_ontology(os.path.join(OWL_DIR, tbox_name)).load()
+    for module in [populate_affiliations, populate_employment, populate_education, populate_bioentities, populate_nih_projects]:
+        module.declare_schema(onto)
+    onto.save(file=f, format="ntriples")
+
+
+def unseen(ids, seen):
+    """Boolean mask of ids not in seen; seen is updated with them"""
+    mask = np.array([i not in seen for i in ids], dtype=bool)
+    seen.update(ids)
+    return mask
+
+
+def write_authors(writer, data):
+    """Articles, Authors and Authorships (populate_authors_articles); returns (article PMIDs, author AND_IDs)"""
+    article_ids, author_ids = set(), set()
+    for df in iter_frames(data):
+        # First row per PMID / AND_ID, skipping ids written by earlier chunks
+        articles = df.drop_duplicates("PMID")
+        articles = articles[unseen(articles["PMID"], article_ids)]
+        article_names = terms(prefixed("Article_", articles["PMID"]))
+        writer.individuals(article_names, "Article")
+        writer.values(article_names, "hasPMID", articles["PMID"])
+
+        authors = df.drop_duplicates("AND_ID")
+        authors = authors[unseen(authors["AND_ID"], author_ids)]
+        author_names = terms(prefixed("Author_", authors["AND_ID"]))
+        writer.individuals(author_names, "Author")
+        writer.values(author_names, "lastName", authors["LastName"])
+        writer.values(author_names, "foreName", authors["ForeName"])
+        writer.values(author_names, "initials", authors["Initials"])
+
+        # Last row per (PMID, AND_ID) wins, as with list assignment
+        links = df.drop_duplicates(["PMID", "AND_ID"], keep="last")
+        link_articles = terms(prefixed("Article_", links["PMID"]))
+        link_authors = terms(prefixed("Author_", links["AND_ID"]))
+        link_names = terms(prefixed("Authorship_", links["PMID"], links["AND_ID"]))
+        writer.individuals(link_names, "Authorship")
+        writer.values(link_names, "authorOrder", links["AuOrder"], XSD_INTEGER)
+        writer.write(link_articles, term("writtenBy"), link_authors)
+        writer.write(link_articles, term("hasAuthorship"), link_names)
+        writer.write(link_names, term("refersToAuthor"), link_authors)
+    return article_ids, author_ids
+
+
+def mentioned_by(pmids, article_ids):
+    """(Article terms, mask) for a column of PMIDs: rows whose article was written, joined as populate_bioentities does"""
+    pmids = pd.to_numeric(pmids, errors="coerce")
+    known = pmids.isin(np.fromiter(article_ids, dtype="int64", count=len(article_ids))).to_numpy()
+    return terms(prefixed("Article_", pmids[known].astype("int64"))), known
+
+
+def write_bioentities(writer, df_main, df_mutation, article_ids):
+    """BioEntities from OA02, Mutations from OA03 and their mentionsBioEntity links (populate_bioentities)"""
+    pmid_of = []
+    for df in iter_frames(df_main):
+        entity_types = (df["Type"] if "Type" in df else pd.Series("Unknown", index=df.index)).astype(str)
+        entity_ids = (df["id"] if "id" in df else df.index.to_series()).astype(str)
+        pmids = df["PMID"] if "PMID" in df else pd.Series(index=df.index, dtype=float)
+        pmid_of.append(pd.Series(pmids.to_numpy(), index=entity_ids.to_numpy()))
+        names = terms("BioEntity_" + entity_ids)
+        classes = entity_types.str.lower().map(BIOENTITY_CLASSES).fillna("BioEntity")
+        writer.write(names, RDF_TYPE, pd.Series(NAMED_INDIVIDUAL, index=df.index))
+        writer.write(names, RDF_TYPE, terms(classes))
+        writer.values(names, "entityType", entity_types)
+        writer.values(names, "entityName", (df["Mention"] if "Mention" in df else pd.Series("Unknown", index=df.index)).astype(str))
+        writer.values(names, "entityId", entity_ids)
+        articles, known = mentioned_by(pmids, article_ids)
+        writer.write(articles, term("mentionsBioEntity"), names[known])
+
+    pmid_of = pd.concat(pmid_of) if pmid_of else pd.Series(dtype=float)
+    pmid_of = pmid_of[~pmid_of.index.duplicated()]
+    for df in iter_frames(df_mutation):
+        names = terms("Mutation_" + (df["id"] if "id" in df else df.index.to_series()).astype(str))
+        writer.individuals(names, "Mutation")
+        writer.values(names, "entityType", pd.Series("Mutation", index=df.index))
+        if "MutationType" in df:
+            writer.values(names, "entityName", df["MutationType"])
+        main_ids = df["Main_id"].astype(str) if "Main_id" in df else pd.Series(index=df.index, dtype=object)
+        articles, known = mentioned_by(pd.Series(pmid_of.reindex(main_ids.to_numpy()).to_numpy(), index=df.index), article_ids)
+        writer.write(articles, term("mentionsBioEntity"), names[known])
+
+
+def write_nih_projects(writer, data, author_ids):
+    """NIHProjects from OA07, linked both ways to the Author with the row's AND_ID"""
+    project_ids, link_ids = set(), set()
+    mint_project_iri = IriMinter("NIHProject")
+    for df in iter_frames(data):
+        numbers = df["ProjectNumber"].astype(str).where(df["ProjectNumber"].notna(), df.index.to_series().astype(str))
+        numbers = mint_project_iri.mint_series(numbers)
+        df = df.assign(project=numbers)
+
+        projects = df.drop_duplicates("project")
+        projects = projects[unseen(projects["project"], project_ids)]
+        project_names = terms("NIHProject_" + projects["project"])
+        writer.individuals(project_names, "NIHProject")
+        writer.values(project_names, "projectNumber", projects["project"])
+        if "PI_Name" in projects:
+            pi_names = sanitize_series(projects["PI_Name"].dropna())
+            writer.values(project_names, "piName", pi_names.reindex(projects.index))
+
+        # One link per (AND_ID, project) across chunks, as adding to a property list twice does in populate_nih_projects
+        links = df[df["AND_ID"].isin(author_ids)].drop_duplicates(["AND_ID", "project"])
+        links = links[unseen(list(zip(links["AND_ID"], links["project"])), link_ids)]
+        link_authors = terms(prefixed("Author_", links["AND_ID"]))
+        link_projects = terms("NIHProject_" + links["project"])
+        writer.write(link_authors, term("hasProject"), link_projects)
+        writer.write(link_projects, term("isPrincipalInvestigator"), link_authors)
+    mint_project_iri.report()
+
+
+def write_abox(writer, args):
+    article_ids, author_ids = write_authors(writer, populate_authors_articles.load_data(args.chunk_size, args.nrows))
+    print(f"Articles / authors: {len(article_ids)} / {len(author_ids)}")
+    write_bioentities(writer, *populate_bioentities.load_data(args.chunk_size, args.nrows), article_ids)
+    write_nih_projects(writer, populate_nih_projects.load_data(args.chunk_size, args.nrows), author_ids)
+
+
+def open_output(path, compress):
+    return gzip.open(path, "wb", compresslevel=6) if compress else open(path, "wb")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream OA01/OA02/OA03/OA07 straight to N-Triples")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK, help="rows per CSV chunk")
+    parser.add_argument("--nrows", type=int, default=None,
+                        help="rows to read from each CSV (default: the steps' sample sizes, 0: whole tables)")
+    parser.add_argument("--tbox", default=SEED_OWL,
+                        help="T-Box ontology in owl/ (pkg2020_tbox_only.owl from create_tbox_ontology.py also works)")
+    parser.add_argument("--output", default=OUTPUT_NT, help="output file name, written to owl/")
+    parser.add_argument("--gzip", action="store_true", help="gzip the output (.gz is appended)")
+    parser.add_argument("--encode", action="store_true",
+                        help=f"save int32 id triples ({TRIPLES_FILE}) and the term dictionary ({TERMS_FILE}) instead of text")
+    args = parser.parse_args()
+
+    start = time.time()
+    if args.encode:
+        writer = EncodedTriplesWriter(TermDictionary())
+        tbox = io.BytesIO()
+        write_tbox(tbox, args.tbox)
+        writer.write_lines(tbox.getvalue().decode("utf-8"))
+        write_abox(writer, args)
+        np.save(os.path.join(OWL_DIR, TRIPLES_FILE), writer.triples())
+        writer.dictionary.save(os.path.join(OWL_DIR, TERMS_FILE))
+        print(f"Encoded {writer.nb_triples:,} triples over {len(writer.dictionary):,} terms -> "
+              f"{TRIPLES_FILE}, {TERMS_FILE} in {time.time() - start:.1f}s")
+        return
+
+    path = os.path.join(OWL_DIR, args.output + (".gz" if args.gzip else ""))
+    with open_output(path, args.gzip) as f:
+        write_tbox(f, args.tbox)
+        writer = NTriplesWriter(f)
+        write_abox(writer, args)
+    print(f"Wrote {writer.nb_triples:,} A-Box triples to {os.path.basename(path)} in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
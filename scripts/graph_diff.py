@@ -0,0 +1,319 @@
+"""
+PKG2020 Graph Diff - Batched SPARQL UPDATE Deltas Between Two Pipeline Exports
+PURPOSE: After a rebuild, refreshes the GraphDB repository with the triples that changed instead of re-uploading the whole
+         2M-triple file, so the refresh time follows the size of the change, not the size of the graph.
+HOW: Each export becomes a stream of distinct (s, p, o) N-Triples terms in code-point order: an N-Triples file (any order,
+     .gz / .zst too) through an external merge sort - runs of --run-size triples sorted in memory, spilled to temporary files
+     and merged with heapq.merge - and a .pkgsnap snapshot (convert_to_ttl.py --format snapshot) as it is, since its SPO ids
+     follow the terms' UTF-8 byte order. One merge walk over the two streams yields the deleted and the inserted triples,
+     written as DELETE DATA / INSERT DATA payloads of --batch-size triples (GRAPH <--graph> { } around them if given).
+BLANK NODES: Their labels are file-local (OWLReady2 storids), and DELETE DATA cannot name them. Triples with a blank node are
+     compared apart, labels ignored; if they changed (the T-Box axioms did), the manifest says so and the T-Box has to be
+     reloaded - they are never part of the payloads.
+APPLY: --apply DIR posts the payloads in manifest order (deletes, then inserts) to a SPARQL 1.1 Update endpoint (--endpoint,
+     e.g. GraphDB's .../repositories/<repo>/statements, with --user / --password), or applies them to a local N-Triples file
+     with rdflib (--local, a stand-in endpoint for tests; default graph only). DATA updates are idempotent, so a failed run
+     is simply restarted.
+OUTPUT: owl/pkg2020_update/: delete-00001.ru ..., insert-00001.ru ..., manifest.json (counts, files, triples, sha256)
+USAGE: python graph_diff.py OLD.nt NEW.nt [--batch-size 10000] [--graph IRI]  |  python graph_diff.py old.pkgsnap new.pkgsnap
+       python graph_diff.py --apply ../owl/pkg2020_update --endpoint URL [--user U --password P]  |  --local graph.nt
+"""
+from convert_to_ttl import file_sha256, DEFAULT_BATCH, OWL_DIR, ZSTD
+import argparse
+import gzip
+import heapq
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+
+OUTPUT_DIR = "pkg2020_update"
+MANIFEST = "manifest.json"
+DEFAULT_UPDATE_BATCH = 10000
+DEFAULT_RUN_SIZE = 1000000
+BLANK_LABEL = re.compile(r"_:\S+")
+
+
+def parse_ntriple(line):
+    """(s, p, o) terms of an N-Triples line, or None for blank and comment lines"""
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    s, p, rest = line.split(None, 2)
+    return s, p, rest[:-1].rstrip()
+
+
+def is_blank(triple):
+    return triple[0].startswith("_:") or triple[2].startswith("_:")
+
+
+def open_text(path):
+    """Text lines of an N-Triples file, decompressed on the fly (.gz, .zst)"""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(".zst"):
+        if not ZSTD:
+            raise ImportError(f"{path}: reading .zst needs the zstandard package (pip install zstandard)")
+        import zstandard
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb")), encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+class ExportStream:
+    """The distinct non-blank triples of an export in sorted order (iterate once), and its blank-node triples apart"""
+
+    def __init__(self, path, tmp, run_size=DEFAULT_RUN_SIZE, batch_size=DEFAULT_BATCH):
+        self.path = path
+        self.tmp = tmp
+        self.run_size = run_size
+        self.batch_size = batch_size
+        self.blank = []
+        self.nb_triples = 0
+
+    def __iter__(self):
+        triples = self.snapshot_triples() if self.path.endswith(".pkgsnap") else self.sorted_triples()
+        previous = None
+        for triple in triples:
+            if triple != previous:
+                self.nb_triples += 1
+                yield triple
+            previous = triple
+
+    def snapshot_triples(self):
+        from rdf_snapshot import Snapshot
+        snapshot = Snapshot.open(self.path)
+        try:
+            for rows in snapshot.iter_triples(self.batch_size):
+                for triple in rows:
+                    if is_blank(triple):
+                        self.blank.append(triple)
+                    else:
+                        yield triple
+        finally:
+            snapshot.close()
+
+    def sorted_triples(self):
+        """External merge sort: sorted runs of run_size triples on disk, merged"""
+        runs, buffer = [], []
+        with open_text(self.path) as f:
+            for line in f:
+                triple = parse_ntriple(line)
+                if triple is None:
+                    continue
+                if is_blank(triple):
+                    self.blank.append(triple)
+                    continue
+                buffer.append(triple)
+                if len(buffer) >= self.run_size:
+                    runs.append(self.spill(buffer, len(runs)))
+                    buffer = []
+        buffer.sort()
+        if not runs:
+            yield from buffer
+            return
+        runs.append(self.spill(buffer, len(runs)))
+        files = [open(run, encoding="utf-8") for run in runs]
+        try:
+            yield from heapq.merge(*[(parse_ntriple(line) for line in f) for f in files])
+        finally:
+            for f in files:
+                f.close()
+
+    def spill(self, buffer, k):
+        buffer.sort()
+        run = os.path.join(self.tmp, f"{os.path.basename(self.path)}-{id(self)}-{k:04d}.nt")
+        with open(run, "w", encoding="utf-8") as f:
+            f.writelines("%s %s %s .\n" % triple for triple in buffer)
+        return run
+
+    def blank_shape(self):
+        """The blank-node triples with their labels dropped, sorted: equal when the axioms are"""
+        return sorted(tuple(BLANK_LABEL.sub("_:", term) for term in triple) for triple in self.blank)
+
+
+def diff_sorted(old, new):
+    """("delete" | "insert", triple) for every triple in only one of two sorted, distinct streams"""
+    old, new = iter(old), iter(new)
+    a, b = next(old, None), next(new, None)
+    while a is not None or b is not None:
+        if b is None or (a is not None and a < b):
+            yield "delete", a
+            a = next(old, None)
+        elif a is None or b < a:
+            yield "insert", b
+            b = next(new, None)
+        else:
+            a, b = next(old, None), next(new, None)
+
+
+class UpdateWriter:
+    """DELETE DATA / INSERT DATA payload files of batch_size triples each"""
+
+    def __init__(self, directory, batch_size=DEFAULT_UPDATE_BATCH, graph=None):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.graph = graph
+        self.buffers = {"delete": [], "insert": []}
+        self.files = {"delete": [], "insert": []}
+
+    def add(self, operation, triple):
+        buffer = self.buffers[operation]
+        buffer.append("%s %s %s .\n" % triple)
+        if len(buffer) >= self.batch_size:
+            self.flush(operation)
+
+    def flush(self, operation):
+        buffer = self.buffers[operation]
+        if not buffer:
+            return
+        name = f"{operation}-{len(self.files[operation]) + 1:05d}.ru"
+        path = os.path.join(self.directory, name)
+        open_graph, close_graph = (f"GRAPH <{self.graph}> {{\n", "}\n") if self.graph else ("", "")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"{operation.upper()} DATA {{\n{open_graph}")
+            f.writelines(buffer)
+            f.write(f"{close_graph}}}\n")
+        self.files[operation].append({"file": name, "operation": operation, "triples": len(buffer),
+                                      "bytes": os.path.getsize(path), "sha256": file_sha256(path)})
+        self.buffers[operation] = []
+
+    def close(self):
+        for operation in self.buffers:
+            self.flush(operation)
+        # Deletes first: a refreshed repository never holds both the old and the new value of a triple
+        return self.files["delete"] + self.files["insert"]
+
+
+def diff_exports(old_path, new_path, directory, batch_size=DEFAULT_UPDATE_BATCH, graph=None, run_size=DEFAULT_RUN_SIZE):
+    """Write the SPARQL UPDATE delta turning the old export into the new one to directory; returns the manifest"""
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    with tempfile.TemporaryDirectory() as tmp:
+        old, new = ExportStream(old_path, tmp, run_size), ExportStream(new_path, tmp, run_size)
+        writer = UpdateWriter(directory, batch_size, graph)
+        for operation, triple in diff_sorted(old, new):
+            writer.add(operation, triple)
+        files = writer.close()
+
+    deletes = sum(entry["triples"] for entry in files if entry["operation"] == "delete")
+    inserts = sum(entry["triples"] for entry in files if entry["operation"] == "insert")
+    manifest = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "old": os.path.abspath(old_path),
+        "new": os.path.abspath(new_path),
+        "old_triples": old.nb_triples + len(old.blank),
+        "new_triples": new.nb_triples + len(new.blank),
+        "graph": graph,
+        "batch_size": batch_size,
+        "deletes": deletes,
+        "inserts": inserts,
+        "blank_node_triples_changed": old.blank_shape() != new.blank_shape(),
+        "files": files,
+    }
+    with open(os.path.join(directory, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+class SparqlUpdateEndpoint:
+    """A SPARQL 1.1 Update endpoint over HTTP (GraphDB: .../repositories/<repo>/statements)"""
+
+    def __init__(self, url, username=None, password=None):
+        from SPARQLWrapper import SPARQLWrapper, POST
+        self.url = url
+        self.sparql = SPARQLWrapper(url, updateEndpoint=url)
+        self.sparql.setMethod(POST)
+        if username:
+            self.sparql.setCredentials(username, password)
+
+    def update(self, payload):
+        self.sparql.setQuery(payload)
+        self.sparql.query()
+
+    def close(self):
+        pass
+
+
+class LocalGraph:
+    """Stand-in endpoint: an N-Triples file loaded into rdflib, updated in memory and written back on close()"""
+
+    def __init__(self, path):
+        import rdflib
+        self.url = path
+        self.graph = rdflib.Graph()
+        self.graph.parse(path, format="nt")
+
+    def update(self, payload):
+        self.graph.update(payload)
+
+    def close(self):
+        self.graph.serialize(self.url, format="nt", encoding="utf-8")
+
+
+def apply_updates(directory, target):
+    """Send the payloads of a diff_exports() directory to target (update(payload) per file), in manifest order"""
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest["blank_node_triples_changed"]:
+        print("⚠️  The blank-node (T-Box axiom) triples changed: reload the T-Box, they are not in the payloads")
+    start, applied = time.time(), 0
+    for k, entry in enumerate(manifest["files"], 1):
+        with open(os.path.join(directory, entry["file"]), encoding="utf-8") as f:
+            target.update(f.read())
+        applied += entry["triples"]
+        print(f"   [{k}/{len(manifest['files'])}] {entry['file']}: {entry['operation']} {entry['triples']:,} triples "
+              f"({time.time() - start:.1f}s)")
+    target.close()
+    return applied, time.time() - start
+
+
+def resolve(path):
+    """path as given, or in owl/ when it is not there"""
+    return path if os.path.exists(path) or os.path.isabs(path) else os.path.join(OWL_DIR, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Diff two PKG2020 exports into batched SPARQL UPDATE payloads, or apply them")
+    parser.add_argument("exports", nargs="*", metavar="EXPORT", help="old and new export (.nt[.gz|.zst] or .pkgsnap; also looked up in owl/)")
+    parser.add_argument("--output", default=OUTPUT_DIR, help=f"payload directory in owl/ (default: {OUTPUT_DIR})")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_UPDATE_BATCH, help="triples per DELETE DATA / INSERT DATA payload")
+    parser.add_argument("--run-size", type=int, default=DEFAULT_RUN_SIZE, help="triples sorted in memory per external-sort run")
+    parser.add_argument("--graph", default=None, help="named graph IRI the payloads update (default: the default graph)")
+    parser.add_argument("--apply", metavar="DIR", help="apply the payloads of a diff directory instead of diffing")
+    parser.add_argument("--endpoint", default=os.environ.get("GRAPHDB_UPDATE_ENDPOINT"),
+                        help="SPARQL 1.1 Update endpoint (default: $GRAPHDB_UPDATE_ENDPOINT)")
+    parser.add_argument("--user", default=os.environ.get("GRAPHDB_USERNAME"))
+    parser.add_argument("--password", default=os.environ.get("GRAPHDB_PASSWORD"))
+    parser.add_argument("--local", metavar="FILE", help="apply to this N-Triples file with rdflib instead of an endpoint")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("PKG2020 GRAPH DIFF")
+    print("=" * 60)
+
+    if args.apply:
+        if not (args.local or args.endpoint):
+            parser.error("--apply needs --endpoint (or $GRAPHDB_UPDATE_ENDPOINT) or --local")
+        target = LocalGraph(resolve(args.local)) if args.local else SparqlUpdateEndpoint(args.endpoint, args.user, args.password)
+        print(f"\n📤 Applying {resolve(args.apply)} to {target.url}")
+        triples, seconds = apply_updates(resolve(args.apply), target)
+        print(f"\n✅ Applied {triples:,} triple changes in {seconds:.1f}s")
+    else:
+        if len(args.exports) != 2:
+            parser.error("give the old and the new export (or --apply DIR)")
+        if args.batch_size < 1 or args.run_size < 1:
+            parser.error("--batch-size and --run-size must be at least 1")
+        old_path, new_path = (resolve(path) for path in args.exports)
+        directory = os.path.join(OWL_DIR, args.output)
+        print(f"\n🔍 {old_path}\n   -> {new_path}")
+        start = time.time()
+        manifest = diff_exports(old_path, new_path, directory, args.batch_size, args.graph, args.run_size)
+        print(f"\n📊 {manifest['old_triples']:,} -> {manifest['new_triples']:,} triples in {time.time() - start:.1f}s")
+        print(f"   Deletes: {manifest['deletes']:,}   Inserts: {manifest['inserts']:,}   Payloads: {len(manifest['files'])}")
+        if manifest["blank_node_triples_changed"]:
+            print("⚠️  The blank-node (T-Box axiom) triples changed: they are not in the payloads, reload the T-Box")
+        print(f"💾 Saved: {directory}")
+        print(f"   Apply with: python graph_diff.py --apply {args.output} --endpoint <SPARQL update URL>")
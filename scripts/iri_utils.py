@@ -0,0 +1,83 @@
+"""
+PKG2020 IRI Utilities - Shared, Memoized IRI Sanitization
+PURPOSE: One definition of the sanitize_iri rules the populate_* scripts mint Organization, Institution and NIHProject IRIs with.
+HOW: Precompiled patterns behind a bounded LRU memo (organization, institution and PI names repeat heavily), plus sanitize_series()
+     for whole pandas columns, which sanitizes each distinct value once with vectorized .str operations.
+KEY FEATURE: IriMinter remembers which raw names produced each IRI, so two different names collapsing into one IRI are reported, not silently merged.
+"""
+from functools import lru_cache
+import pandas as pd
+import re
+
+INVALID_CHARS = re.compile(r'[^a-zA-Z0-9_]')
+UNDERSCORE_RUNS = re.compile(r'_+')
+MAX_LENGTH = 100
+MEMO_SIZE = 65536
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def _sanitize(name, max_length):
+    name = UNDERSCORE_RUNS.sub('_', INVALID_CHARS.sub('_', name)).strip('_')
+    return name[:max_length] if name else "Unknown"
+
+
+def sanitize_iri(name, max_length=MAX_LENGTH):
+    """Sanitize string for use as OWL IRI (max_length=None keeps the full name)"""
+    return _sanitize(str(name), max_length)
+
+
+def _distinct_names(values):
+    """(codes, distinct values as str); like str(name), a missing value becomes "nan" """
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return codes, pd.Series([str(value) for value in uniques], dtype=object)
+
+
+def _sanitize_names(names, max_length):
+    cleaned = (names.str.replace(INVALID_CHARS, '_', regex=True)
+               .str.replace(UNDERSCORE_RUNS, '_', regex=True).str.strip('_').str[:max_length])
+    return cleaned.where(cleaned != "", "Unknown")
+
+
+def sanitize_series(values, max_length=MAX_LENGTH):
+    """sanitize_iri() over a whole column; every distinct value is sanitized once"""
+    codes, names = _distinct_names(values)
+    return pd.Series(_sanitize_names(names, max_length).to_numpy()[codes], index=values.index)
+
+
+class IriMinter:
+    """sanitize_iri() for one kind of individual, keeping track of distinct names that share an IRI"""
+
+    def __init__(self, kind, max_length=MAX_LENGTH):
+        self.kind = kind
+        self.max_length = max_length
+        self.sources = {}      # IRI -> first raw name
+        self.collisions = {}   # IRI -> every raw name that produced it
+
+    def _record(self, name, iri):
+        first = self.sources.setdefault(iri, name)
+        if first != name:
+            self.collisions.setdefault(iri, {first}).add(name)
+
+    def __call__(self, name):
+        name = str(name)
+        iri = sanitize_iri(name, self.max_length)
+        self._record(name, iri)
+        return iri
+
+    def mint_series(self, values):
+        """IRIs for a whole column (see sanitize_series)"""
+        codes, names = _distinct_names(values)
+        iris = _sanitize_names(names, self.max_length)
+        for name, iri in zip(names, iris):
+            self._record(name, iri)
+        return pd.Series(iris.to_numpy()[codes], index=values.index)
+
+    def report(self, limit=5):
+        """Print the IRIs several distinct names were merged into; returns their number"""
+        if self.collisions:
+            print(f"Warning: {len(self.collisions)} {self.kind} IRIs are shared by different names:")
+            for iri, names in sorted(self.collisions.items())[:limit]:
+                print(f"   {iri} <- {sorted(names)}")
+            if len(self.collisions) > limit:
+                print(f"   ... and {len(self.collisions) - limit} more")
+        return len(self.collisions)
@@ -0,0 +1,105 @@
+"""
+PKG2020 Mention Index - Side Table of Bio-Entity Mentions for Canonical BioEntities
+PURPOSE: With populate_bioentities.py --canonical, one Gene/Chemical/Disease/Species individual stands for every OA02 row sharing its
+         (Type, EntityID); the per-row facts (PMID, Start/End offsets) move to a compact table instead of thousands of duplicate individuals.
+HOW: bioentity_mentions (OA02 id -> entity name, type, PMID, offsets) lives in the quadstore next to the graph. link() rebuilds the
+     mentionsBioEntity edges of the recorded entities with one INSERT ... SELECT joined to the loaded Articles; build_counts() keeps a
+     precomputed mention-count index (bioentity_mention_counts), so "most mentioned genes" or type distributions need no graph scan.
+KEY FEATURE: Rows are keyed by OA02 id and entities by IRI name (not storid), so an --incremental run re-records changed rows in place,
+     forget()s the rows a whole-table drop no longer has (returning the entities left without mentions), and run_pipeline.py's staging merge copies both tables unchanged.
+NOTE: In file mode (no --store) the tables live in the in-memory World only; the mentionsBioEntity edges are saved with the graph.
+USAGE: python mention_index.py --store ../owl/pkg2020.sqlite3 [--type gene] [--top 10]
+"""
+from owlready2 import *
+from stage_store import stage_argparser, open_stage
+import pandas as pd
+
+MENTIONS_TABLE = "bioentity_mentions"
+COUNTS_TABLE = "bioentity_mention_counts"
+
+
+class MentionIndex:
+    """Mentions of canonical BioEntities and their precomputed counts"""
+
+    def __init__(self, onto):
+        self.onto = onto
+        self.db = onto.world.graph.db
+        self.db.execute(f"""CREATE TABLE IF NOT EXISTS {MENTIONS_TABLE} (row_id INTEGER PRIMARY KEY, entity TEXT, entity_type TEXT,
+                            pmid INTEGER, start_offset INTEGER, end_offset INTEGER)""")
+        self.db.execute(f"CREATE INDEX IF NOT EXISTS {MENTIONS_TABLE}_entity ON {MENTIONS_TABLE} (entity)")
+        self.db.execute(f"""CREATE TABLE IF NOT EXISTS {COUNTS_TABLE} (entity TEXT PRIMARY KEY, entity_type TEXT,
+                            mentions INTEGER, articles INTEGER)""")
+
+    def __len__(self):
+        return self.db.execute(f"SELECT COUNT(*) FROM {MENTIONS_TABLE}").fetchone()[0]
+
+    def record(self, row_ids, entities, entity_types, pmids, starts, ends):
+        """Store one chunk of mentions (aligned columns); a row recorded before is replaced"""
+        def value(v):
+            return None if pd.isna(v) else int(v)
+        rows = [(int(r), e, t, value(p), value(s), value(n)) for r, e, t, p, s, n in zip(row_ids, entities, entity_types, pmids, starts, ends)]
+        self.db.executemany(f"INSERT OR REPLACE INTO {MENTIONS_TABLE} VALUES (?,?,?,?,?,?)", rows)
+
+    def forget(self, row_ids):
+        """Drop the mentions of deleted OA02 rows with the mentionsBioEntity edges of their entities (link() re-adds the edges
+        of the mentions that remain); returns the entities no mention names any more"""
+        rows = [(int(r),) for r in row_ids]
+        entities = {entity for (r,) in rows
+                    for (entity,) in self.db.execute(f"SELECT entity FROM {MENTIONS_TABLE} WHERE row_id = ?", (r,))}
+        self.db.executemany(f"""DELETE FROM objs WHERE p = ? AND o = (SELECT storid FROM resources WHERE iri = ?)""",
+                            [(self.onto.mentionsBioEntity.storid, self.onto.base_iri + entity) for entity in entities])
+        self.db.executemany(f"DELETE FROM {MENTIONS_TABLE} WHERE row_id = ?", rows)
+        return sorted(entity for entity in entities
+                      if self.db.execute(f"SELECT 1 FROM {MENTIONS_TABLE} WHERE entity = ? LIMIT 1", (entity,)).fetchone() is None)
+
+    def link(self):
+        """Rewrite the mentionsBioEntity edges of every recorded entity from the table; returns the number of edges"""
+        onto = self.onto
+        prop = onto.mentionsBioEntity.storid
+        self.db.execute(f"""DELETE FROM objs WHERE p = ? AND o IN (SELECT r.storid FROM resources r
+                            JOIN (SELECT DISTINCT entity FROM {MENTIONS_TABLE}) m ON r.iri = ? || m.entity)""", (prop, onto.base_iri))
+        before = self.db.total_changes
+        self.db.execute(f"""INSERT OR IGNORE INTO objs
+                            SELECT ?, a.storid, ?, e.storid FROM (SELECT DISTINCT entity, pmid FROM {MENTIONS_TABLE}) m
+                            JOIN resources e ON e.iri = ?3 || m.entity
+                            JOIN resources a ON a.iri = ?3 || 'Article_' || m.pmid
+                            JOIN objs t ON t.s = a.storid AND t.p = ? AND t.o = ?""",
+                        (onto.graph.c, prop, onto.base_iri, rdf_type, onto.Article.storid))
+        return self.db.total_changes - before
+
+    def build_counts(self):
+        """Recompute the mention-count index from the mentions table"""
+        self.db.execute(f"DELETE FROM {COUNTS_TABLE}")
+        self.db.execute(f"""INSERT INTO {COUNTS_TABLE} SELECT entity, MIN(entity_type), COUNT(*), COUNT(DISTINCT pmid)
+                            FROM {MENTIONS_TABLE} GROUP BY entity""")
+
+    def counts_by_type(self):
+        """entity_type -> (entities, mentions)"""
+        return {t: (n, m) for t, n, m in self.db.execute(f"""SELECT entity_type, COUNT(*), SUM(mentions) FROM {COUNTS_TABLE}
+                                                            GROUP BY entity_type ORDER BY SUM(mentions) DESC""")}
+
+    def top(self, entity_type=None, limit=10):
+        """Most mentioned entities as (entity, type, mentions, articles), optionally of one type"""
+        where, params = ("WHERE entity_type = ?", [entity_type]) if entity_type else ("", [])
+        return self.db.execute(f"SELECT * FROM {COUNTS_TABLE} {where} ORDER BY mentions DESC, entity LIMIT ?", params + [limit]).fetchall()
+
+    def mentions_of(self, entity):
+        """(PMID, start, end) of every mention of an entity"""
+        return self.db.execute(f"SELECT pmid, start_offset, end_offset FROM {MENTIONS_TABLE} WHERE entity = ? ORDER BY pmid, start_offset",
+                               (entity,)).fetchall()
+
+
+if __name__ == "__main__":
+    parser = stage_argparser("Show the mention-count index of canonical BioEntities")
+    parser.add_argument("--type", default=None, help="only entities of this OA02 Type (gene, drug, species, ...)")
+    parser.add_argument("--top", type=int, default=10, help="number of most mentioned entities to list")
+    args = parser.parse_args()
+    if not args.store:
+        parser.error("--store (or PKG2020_STORE) is required")
+
+    index = MentionIndex(open_stage(None, args))
+    print(f"{len(index)} mentions")
+    for entity_type, (nb_entities, nb_mentions) in index.counts_by_type().items():
+        print(f"   {entity_type:<12} {nb_entities:>8} entities {nb_mentions:>10} mentions")
+    for entity, entity_type, nb_mentions, nb_articles in index.top(args.type, args.top):
+        print(f"   {entity:<40} {nb_mentions:>8} mentions in {nb_articles} articles")
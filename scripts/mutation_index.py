@@ -0,0 +1,129 @@
+"""
+PKG2020 Mutation Index - Structured OA03 Mutations with Position Range Lookups
+PURPOSE: OA03 NormalizedName values (tmVar notation, e.g. p|SUB|T|14|V) carry the sequence type, change kind, reference residue,
+         position and alternate residue of every mutation; only MutationType reaches the graph. This keeps them as typed columns
+         so questions like "all substitutions at positions 10-20 with ref T" are an index range scan instead of a SPARQL regex over names.
+HOW: parse_normalized_names() splits the distinct values of a column with vectorized .str operations (SUB: ref|pos|alt, DEL: pos|ref,
+     INS/DUP: pos|alt, FS: ref|pos|alt; a trailing ;RS#:n becomes the rs column). populate_bioentities.py records every OA03 row in
+     the mutation_index table of the quadstore (B-tree on position). lookup() reads it once into position-sorted columns and answers
+     a range with two binary searches plus integer-code equality masks over the slice.
+KEY FEATURE: Non-numeric positions (IVS-1, 522_525) and names that are not in tmVar notation keep their raw text and a NULL position.
+NOTE: In file mode (no --store) the table lives in the in-memory World only.
+USAGE: python mutation_index.py --store ../owl/pkg2020.sqlite3 --positions 10-20 [--change SUB] [--ref T] [--alt V] [--seq-type p]
+"""
+from stage_store import stage_argparser, open_stage
+import numpy as np
+import pandas as pd
+import time
+
+INDEX_TABLE = "mutation_index"
+FIELDS = ["seq_type", "change", "ref", "position", "alt", "rs"]
+RS_SUFFIX = r";RS#:(\d+).*$"
+CODED_FIELDS = ["seq_type", "change", "ref", "alt"]
+
+
+def parse_normalized_names(names):
+    """Typed columns (seq_type, change, ref, position, alt, rs) for a column of NormalizedName values, aligned with it;
+    each distinct value is parsed once"""
+    # Factorized before any astype(str), which turns a missing name into the text "nan" before pandas 3
+    codes, uniques = pd.factorize(names)
+    # A missing name has the code -1, i.e. the trailing None: all fields null, not the parse of the last distinct value
+    parsed = _parse_names(pd.Series([*map(str, uniques), None], dtype=object)).iloc[codes]
+    parsed.index = names.index
+    return parsed
+
+
+def _parse_names(names):
+    notation = names.str.replace(RS_SUFFIX, "", regex=True)
+    parts = notation.str.split("|", expand=True).reindex(columns=range(5))
+    change = parts[1]
+    substitution = change.isin(["SUB", "FS"]).to_numpy()
+    deletion = (change == "DEL").to_numpy()
+
+    raw_position = pd.Series(np.where(substitution, parts[3], parts[2]), index=names.index, dtype=object)
+    second = pd.Series(np.where(substitution, parts[2], parts[3]), index=names.index, dtype=object)
+    parsed = pd.DataFrame({
+        "seq_type": parts[0],
+        "change": change,
+        "ref": second.where(substitution | deletion),
+        "position": pd.to_numeric(raw_position.where(raw_position.str.fullmatch(r"\d+", na=False)), errors="coerce").astype("Int64"),
+        "alt": pd.Series(np.where(substitution, parts[4], parts[3]), index=names.index).where(~deletion),
+        "rs": pd.to_numeric(names.str.extract(RS_SUFFIX, expand=False), errors="coerce").astype("Int64"),
+    })
+    # Names that are not in tmVar notation (1deltag, RS5065) have no fields besides their text
+    parsed.loc[parts[1].isna(), FIELDS] = None
+    return parsed.replace("", None)
+
+
+class MutationIndex:
+    """Parsed OA03 mutations, persisted in the store and searched through a position-sorted in-memory view"""
+
+    def __init__(self, onto):
+        self.db = onto.world.graph.db
+        self.db.execute(f"""CREATE TABLE IF NOT EXISTS {INDEX_TABLE} (mutation TEXT PRIMARY KEY, normalized_name TEXT, seq_type TEXT,
+                            change TEXT, ref TEXT, position INTEGER, alt TEXT, rs INTEGER)""")
+        self.db.execute(f"CREATE INDEX IF NOT EXISTS {INDEX_TABLE}_position ON {INDEX_TABLE} (position)")
+        self._view = None
+
+    def __len__(self):
+        return self.db.execute(f"SELECT COUNT(*) FROM {INDEX_TABLE}").fetchone()[0]
+
+    def record(self, mutations, normalized_names):
+        """Parse and store one chunk of mutations (IRI names aligned with their NormalizedName); a name recorded before is replaced"""
+        parsed = parse_normalized_names(normalized_names).astype(object)
+        parsed = parsed.where(parsed.notna(), None)
+        names = normalized_names.astype(object).where(normalized_names.notna(), None)
+        rows = zip(mutations, names, *(parsed[field] for field in FIELDS))
+        self.db.executemany(f"INSERT OR REPLACE INTO {INDEX_TABLE} VALUES (?,?,?,?,?,?,?,?)", rows)
+        self._view = None
+        return len(parsed)
+
+    def forget(self, mutations):
+        """Drop the entries of mutations (IRI names) whose rows were deleted from the drop"""
+        self.db.executemany(f"DELETE FROM {INDEX_TABLE} WHERE mutation = ?", ((m,) for m in mutations))
+        self._view = None
+
+    def sorted_view(self):
+        """The mutations that have a position, sorted by it and read once through the position B-tree: numpy columns, with the
+        text fields as integer codes (CODED_FIELDS) so filters compare ints"""
+        if self._view is None:
+            frame = pd.read_sql_query(f"SELECT * FROM {INDEX_TABLE} WHERE position IS NOT NULL ORDER BY position, mutation", self.db)
+            self._view = {"frame": frame, "position": frame["position"].to_numpy(dtype="int64")}
+            for field in CODED_FIELDS:
+                codes, uniques = pd.factorize(frame[field])
+                self._view[field] = (codes, {value: code for code, value in enumerate(uniques)})
+        return self._view
+
+    def lookup(self, start, end, change=None, ref=None, alt=None, seq_type=None):
+        """Mutations with start <= position <= end and the given fields, ordered by position (DataFrame, one row per mutation)"""
+        view = self.sorted_view()
+        first = np.searchsorted(view["position"], int(start), side="left")
+        last = np.searchsorted(view["position"], int(end), side="right")
+        keep = np.ones(last - first, dtype=bool)
+        for field, value in (("change", change), ("ref", ref), ("alt", alt), ("seq_type", seq_type)):
+            if value is not None:
+                codes, code_of = view[field]
+                keep &= codes[first:last] == code_of.get(value, -2)
+        return view["frame"].iloc[first + np.flatnonzero(keep)]
+
+
+if __name__ == "__main__":
+    parser = stage_argparser("Range lookup of OA03 mutations by position, change kind and residues")
+    parser.add_argument("--positions", required=True, help="position range, e.g. 10-20 (or a single position)")
+    parser.add_argument("--change", default=None, help="change kind: SUB, DEL, INS, DUP, FS")
+    parser.add_argument("--ref", default=None, help="reference residue / base")
+    parser.add_argument("--alt", default=None, help="alternate residue / base")
+    parser.add_argument("--seq-type", default=None, help="p (protein), c (cDNA), g (genomic)")
+    parser.add_argument("--limit", type=int, default=20, help="rows to print")
+    args = parser.parse_args()
+    if not args.store:
+        parser.error("--store (or PKG2020_STORE) is required")
+
+    start, _, end = args.positions.partition("-")
+    index = MutationIndex(open_stage(None, args))
+    index.sorted_view()
+    lookup_start = time.perf_counter()
+    rows = index.lookup(start, end or start, args.change, args.ref, args.alt, args.seq_type)
+    print(f"{len(rows)} of {len(index)} mutations in {(time.perf_counter() - lookup_start) * 1000:.2f} ms")
+    if len(rows):
+        print(rows.head(args.limit).to_string(index=False))
@@ -1,101 +1,122 @@
 """
 PKG2020 Affiliations Population - Author-Organization Linking
 PURPOSE: Creates Affiliation and Organization individuals, links authors to their institutional affiliations using OA04_Affiliations.csv.
-HOW: Loads existing authors from ontology, creates Affiliation (with city/state/country), Organization entities, links via hasAffiliation and affiliatedWith.
+HOW: Joins rows to Authors by AND_ID (author_index), creates Affiliation (with city/state/country), Organization entities, links via hasAffiliation and affiliatedWith.
+     Each chunk is written column by column through bulk_ingest.BulkLoader.
 KEY FEATURE: Sanitizes organization names for valid OWL IRIs, handles geographic data (City, State, Country) as data properties.
 DATA CREATED: ~50K affiliation records linking authors to research organizations worldwide.
+INCREMENTAL: With --store, rows are keyed by affiliation id; --incremental re-creates only new/changed affiliations (delta_ingest),
+     and a whole-table run (--nrows 0) destroys the affiliations of ids the drop no longer has.
 OUTPUT: Saves pkg2020_step4_affiliations_populated.owl - extends author data with institutional relationships.
 """
 import pandas as pd
-import re
-import os
 from owlready2 import *
-
-# Get script directory for relative paths
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
-
-def sanitize_iri(name):
-    """Sanitize string for use as OWL IRI"""
-    name = re.sub(r'[^a-zA-Z0-9_]', '_', str(name))
-    name = re.sub(r'_+', '_', name)
-    name = name.strip('_')
-    return name if name else "Unknown"
-
-onto = get_ontology(os.path.join(PROJECT_DIR, "owl", "pkg2020_populated_authors.owl")).load()
-
-# Define new classes and properties for affiliations
-with onto:
-    class Affiliation(Thing):
-        pass
-
-    class Organization(Thing):
-        pass
-
-    class hasAffiliation(ObjectProperty):
-        domain = [onto.Author]
-        range = [Affiliation]
-
-    class affiliatedWith(ObjectProperty):
-        domain = [Affiliation]
-        range = [Organization]
-
-    class city(DataProperty):
-        domain = [Affiliation]
-        range = [str]
-
-    class state(DataProperty):
-        domain = [Affiliation]
-        range = [str]
-
-    class country(DataProperty):
-        domain = [Affiliation]
-        range = [str]
-
-# Load caches
-Author = onto.Author
-Affiliation = onto.Affiliation
-Organization = onto.Organization
-
-author_cache = {a.name: a for a in Author.instances()}
-org_cache = {}
-
-# Process all 50000 rows
-df = pd.read_csv(os.path.join(PROJECT_DIR, "data", "OA04_Affiliations.csv"), nrows=50000)
-print("CSV Columns:", df.columns.tolist())
-print(f"Loaded {len(author_cache)} authors from ontology")
-
-with onto:
-    for idx, row in df.iterrows():
-        if idx % 1000 == 0:
-            print(f"Processing row {idx}...")
-            
-        and_id = str(row["AND_ID"])
-        affil_id = str(row["id"])
-        org_name = str(row["Affiliation"])
-
-        author_iri = f"Author_{and_id}"
-        if author_iri not in author_cache:
+from stage_store import stage_argparser, open_stage, save_stage
+from stage_profile import profile_stage
+from checkpoints import load_stage_data
+from csv_loader import read_table, iter_frames, row_limit
+from author_index import AuthorIndex
+from iri_utils import IriMinter
+from bulk_ingest import BulkLoader
+from delta_ingest import DeltaTracker, destroy_individuals, whole_drop, presence_changed
+
+STAGE = "affiliations"
+INPUT_OWL = "pkg2020_populated_authors.owl"
+OUTPUT_OWL = "pkg2020_step4_affiliations_populated.owl"
+INPUT_CSV = ["OA04_Affiliations.csv"]
+
+def declare_schema(onto):
+    """Define new classes and properties for affiliations"""
+    with onto:
+        class Affiliation(Thing):
+            pass
+
+        class Organization(Thing):
+            pass
+
+        class hasAffiliation(ObjectProperty):
+            domain = [onto.Author]
+            range = [Affiliation]
+
+        class affiliatedWith(ObjectProperty):
+            domain = [Affiliation]
+            range = [Organization]
+
+        class city(DataProperty):
+            domain = [Affiliation]
+            range = [str]
+
+        class state(DataProperty):
+            domain = [Affiliation]
+            range = [str]
+
+        class country(DataProperty):
+            domain = [Affiliation]
+            range = [str]
+
+def load_data(chunk_size=None, nrows=None):
+    # Process all 50000 rows
+    df = read_table(INPUT_CSV[0], chunk_size, nrows=row_limit(nrows, 50000))
+    if chunk_size is None:
+        print("CSV Columns:", df.columns.tolist())
+    return df
+
+def populate(onto, data, delta=None):
+    """Create Affiliations for rows whose author exists; returns the number of affiliations"""
+    declare_schema(onto)
+
+    authors = AuthorIndex.open(onto)
+    loader = BulkLoader(onto)
+    mint_org_iri = IriMinter("Organization", max_length=None)
+
+    print(f"Author index: {len(authors)} authors")
+    # Rows of Authors the authors stage created or removed are re-ingested even when unchanged
+    relinked = presence_changed(onto, "Author") if delta is not None else []
+
+    for df in iter_frames(data):
+        if delta is not None:
+            df, changed = delta.split(df, df["id"], ["AND_ID", "Affiliation", "City", "State", "Country"],
+                                      force=df["AND_ID"].isin(relinked))
+            destroy_individuals(onto, [f"Affiliation_{affil_id}" for affil_id in df["id"][changed]])
+        author_storids = pd.Series(authors.lookup(df["AND_ID"]), index=df.index)
+        df, author_storids = df[author_storids != 0], author_storids[author_storids != 0]
+        if df.empty:
             continue
-
-        author = author_cache[author_iri]
-
-        aff = Affiliation(f"Affiliation_{affil_id}")
-        
-        # Add location data if available
-        if "City" in row and pd.notna(row["City"]):
-            aff.city = [str(row["City"])]
-        if "State" in row and pd.notna(row["State"]):
-            aff.state = [str(row["State"])]
-        if "Country" in row and pd.notna(row["Country"]):
-            aff.country = [str(row["Country"])]
-
-        if org_name not in org_cache:
-            org_cache[org_name] = Organization(sanitize_iri(org_name))
-
-        author.hasAffiliation.append(aff)
-        aff.affiliatedWith.append(org_cache[org_name])
-
-print(f"Created {len(list(Affiliation.instances()))} affiliations")
-onto.save(file=os.path.join(PROJECT_DIR, "owl", "pkg2020_step4_affiliations_populated.owl"), format="rdfxml")
-print("Saved: pkg2020_step4_affiliations_populated.owl")
+        print(f"Processing rows {df.index[0]}-{df.index[-1]}...")
+
+        affiliations = loader.add_individuals(onto.Affiliation, "Affiliation_" + df["id"].astype(str))
+        for column, prop in [("City", onto.city), ("State", onto.state), ("Country", onto.country)]:
+            if column in df:
+                loader.add_data_values(prop, affiliations, df[column].astype(object))
+
+        organizations = loader.add_individuals(onto.Organization, mint_org_iri.mint_series(df["Affiliation"].astype(str).fillna("nan")))
+        loader.add_object_edges(onto.hasAffiliation, author_storids, affiliations)
+        loader.add_object_edges(onto.affiliatedWith, affiliations, organizations)
+        loader.commit()
+
+    if delta is not None:
+        destroy_individuals(onto, ["Affiliation_" + key for key in delta.removed()])
+        loader.commit()
+    mint_org_iri.report()
+    nb_affiliations = loader.count_individuals(onto.Affiliation)
+    print(f"Created {nb_affiliations} affiliations")
+    return nb_affiliations
+
+def main():
+    args = stage_argparser("Populate Affiliation and Organization individuals from OA04").parse_args()
+    with profile_stage(STAGE, args.profile) as profile:
+        with profile.phase("load"):
+            onto = open_stage(INPUT_OWL, args)
+        delta = DeltaTracker(onto, STAGE, whole_drop(args)) if args.store else None
+        data, checkpoints = load_stage_data(onto, STAGE, INPUT_CSV, args, load_data)
+        with profile.phase("populate"):
+            populate(onto, data, delta)
+        if checkpoints:
+            checkpoints.finish()
+        if args.incremental:
+            delta.write_manifest()
+        with profile.phase("save"):
+            save_stage(onto, OUTPUT_OWL, args)
+
+if __name__ == "__main__":
+    main()
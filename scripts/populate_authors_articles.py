@@ -3,93 +3,248 @@ PKG2020 Author & Article Population - Core Data Population Script
 PURPOSE: Populates ontology with Article, Author, and Authorship individuals from OA01_Author_List.csv (50K rows).
 HOW: Reads CSV with pandas, creates Article (by PMID), Author (by AND_ID), links via writtenBy property, reifies with Authorship for author order.
 KEY LOGIC: Uses caching (author_cache, article_cache) to prevent duplicate individuals, handles FunctionalProperty (hasPMID) correctly.
+BULK MODE: --bulk dedupes Articles/Authors with drop_duplicates and writes each property in one batch (bulk_ingest.BulkLoader) - linear in row count.
+AUTHOR INDEX: Writes the author_index table (AND_ID -> store id) the enrichment steps join on.
+STREAMING: --chunk-size N reads OA01 in N-row chunks; only the seen Article/Author IRI sets are kept between chunks.
+INCREMENTAL: With --store, rows are keyed by (PMID, AND_ID); --incremental ingests only new/changed rows of a new drop (delta_ingest).
+     Author names are tracked on their own, per AND_ID, from the first row of each (as a full build takes them), so editing a
+     later row of an author leaves the names alone. A whole-table run (--nrows 0) removes the Authorship and writtenBy link of
+     pairs the drop no longer has, and the Articles and Authors left without rows; the AND_IDs / PMIDs that came or went are
+     recorded for the later stages (delta_ingest.record_presence()).
 DATA CREATED: ~15K unique articles, ~25K unique authors, ~50K authorship records with semantic relationships.
 OUTPUT: Saves pkg2020_populated_authors.owl - first step in population pipeline.
 """
+import numpy as np
 import pandas as pd
 from owlready2 import *
+from stage_store import stage_argparser, open_stage, save_stage
+from stage_profile import profile_stage
+from checkpoints import load_stage_data
+from bulk_ingest import BulkLoader, prefixed
+from csv_loader import read_table, iter_frames, row_limit, skipped_rows
+from delta_ingest import (DeltaTracker, existing_names, clear_values, destroy_individuals, remove_edges, whole_drop,
+                          record_presence)
+from author_index import AuthorIndex
 import gc
-import os
-
-# Get script directory for relative paths
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
-
-# Load ontology
-onto = get_ontology(os.path.join(PROJECT_DIR, "owl", "pkg2020_constrained.owl")).load()
-
-Article = onto.Article
-Author = onto.Author
-Authorship = onto.Authorship
-writtenBy = onto.writtenBy
-hasAuthorship = onto.hasAuthorship
-refersToAuthor = onto.refersToAuthor
-hasPMID = onto.hasPMID
-lastName = onto.lastName
-foreName = onto.foreName
-initials = onto.initials
-authorOrder = onto.authorOrder
+
+STAGE = "authors"
+INPUT_OWL = "pkg2020_constrained.owl"
+OUTPUT_OWL = "pkg2020_populated_authors.owl"
+INPUT_CSV = ["OA01_Author_List.csv"]
 
 # Process all 50000 rows
 NROWS = 50000
 
-# Load CSV with specific columns only to save memory
-df = pd.read_csv(os.path.join(PROJECT_DIR, "data", "OA01_Author_List.csv"), 
-                 nrows=NROWS,
-                 usecols=["PMID", "AND_ID", "LastName", "ForeName", "Initials", "AuOrder"])
-print(f"Loaded {len(df)} rows from CSV")
-
-# Caching to prevent duplicate creation
-author_cache = set()
-article_cache = set()
-
-with onto:
-    for idx, row in df.iterrows():
-        if idx % 1000 == 0:
-            print(f"Processing row {idx}...")
-
-        pmid = str(row["PMID"])
-        and_id = str(row["AND_ID"])
-
-        # ----- Article (check cache to avoid duplicates) -----
-        article_iri = f"Article_{pmid}"
-        if article_iri not in article_cache:
-            article = Article(article_iri)
-            article.hasPMID = pmid  # FunctionalProperty - single value
-            article_cache.add(article_iri)
-        else:
-            article = onto[article_iri]
-
-        # ----- Author (check cache to avoid duplicates) -----
-        author_iri = f"Author_{and_id}"
-        if author_iri not in author_cache:
-            author = Author(author_iri)
-            if pd.notna(row["LastName"]):
-                author.lastName = [str(row["LastName"])]
-            if pd.notna(row["ForeName"]):
-                author.foreName = [str(row["ForeName"])]
-            if pd.notna(row["Initials"]):
-                author.initials = [str(row["Initials"])]
-            author_cache.add(author_iri)
-        else:
-            author = onto[author_iri]
-
-        # ----- Authorship (reified relation) -----
-        auth = Authorship(f"Authorship_{pmid}_{and_id}")
-        if pd.notna(row["AuOrder"]):
-            auth.authorOrder = [int(row["AuOrder"])]  # Non-functional - needs list
-
-        # ----- Link everything -----
-        article.writtenBy.append(author)
-        article.hasAuthorship.append(auth)
-        auth.refersToAuthor.append(author)
-
-# Free memory
-del df
-gc.collect()
-
-print(f"Created {len(article_cache)} articles, {len(author_cache)} authors")
-
-# Save populated ontology
-onto.save(file=os.path.join(PROJECT_DIR, "owl", "pkg2020_populated_authors.owl"), format="rdfxml")
-print("Saved: pkg2020_populated_authors.owl")
+
+def load_data(chunk_size=None, nrows=None):
+    """Load CSV with specific columns only to save memory (a chunk iterator when chunk_size is set)"""
+    df = read_table(INPUT_CSV[0], chunk_size, nrows=row_limit(nrows, NROWS))
+    if chunk_size is None:
+        print(f"Loaded {len(df)} rows from CSV")
+    return df
+
+
+def ingest_rows(onto, df, article_cache, author_cache):
+    """Reference path: one OWLReady2 individual per row, cached by IRI"""
+    Article = onto.Article
+    Author = onto.Author
+    Authorship = onto.Authorship
+
+    with onto:
+        for idx, row in df.iterrows():
+            if idx % 1000 == 0:
+                print(f"Processing row {idx}...")
+
+            pmid = str(row["PMID"])
+            and_id = str(row["AND_ID"])
+
+            # ----- Article (check cache to avoid duplicates) -----
+            article_iri = f"Article_{pmid}"
+            if article_iri not in article_cache:
+                article = Article(article_iri)
+                article.hasPMID = pmid  # FunctionalProperty - single value
+                article_cache.add(article_iri)
+            else:
+                article = onto[article_iri]
+
+            # ----- Author (check cache to avoid duplicates) -----
+            author_iri = f"Author_{and_id}"
+            if author_iri not in author_cache:
+                author = Author(author_iri)
+                if pd.notna(row["LastName"]):
+                    author.lastName = [str(row["LastName"])]
+                if pd.notna(row["ForeName"]):
+                    author.foreName = [str(row["ForeName"])]
+                if pd.notna(row["Initials"]):
+                    author.initials = [str(row["Initials"])]
+                author_cache.add(author_iri)
+            else:
+                author = onto[author_iri]
+
+            # ----- Authorship (reified relation) -----
+            auth = Authorship(f"Authorship_{pmid}_{and_id}")
+            if pd.notna(row["AuOrder"]):
+                auth.authorOrder = [int(row["AuOrder"])]  # Non-functional - needs list
+
+            # ----- Link everything -----
+            article.writtenBy.append(author)
+            article.hasAuthorship.append(auth)
+            auth.refersToAuthor.append(author)
+
+
+def unseen(names, cache):
+    """Boolean mask of names not in cache; cache is updated with them"""
+    mask = np.array([name not in cache for name in names], dtype=bool)
+    cache.update(names)
+    return mask
+
+
+def ingest_bulk(onto, df, article_cache, author_cache):
+    """Bulk path: vectorized dedupe by PMID / AND_ID, one batch insert per property"""
+    loader = BulkLoader(onto)
+
+    # ----- Articles: first row per PMID (skipping PMIDs seen in earlier chunks) -----
+    articles = df.drop_duplicates("PMID")
+    articles = articles[unseen(prefixed("Article_", articles["PMID"]), article_cache)]
+    article_names = prefixed("Article_", articles["PMID"])
+    loader.add_individuals(onto.Article, article_names)
+    loader.add_data_triples(onto.hasPMID, article_names, articles["PMID"].astype(str))
+
+    # ----- Authors: first row per AND_ID carries the name parts -----
+    authors = df.drop_duplicates("AND_ID")
+    authors = authors[unseen(prefixed("Author_", authors["AND_ID"]), author_cache)]
+    author_names = prefixed("Author_", authors["AND_ID"])
+    loader.add_individuals(onto.Author, author_names)
+    loader.add_data_triples(onto.lastName, author_names, authors["LastName"])
+    loader.add_data_triples(onto.foreName, author_names, authors["ForeName"])
+    loader.add_data_triples(onto.initials, author_names, authors["Initials"])
+
+    # ----- Authorships: last row per (PMID, AND_ID) wins, as with list assignment -----
+    links = df.drop_duplicates(["PMID", "AND_ID"], keep="last")
+    link_articles = prefixed("Article_", links["PMID"])
+    link_authors = prefixed("Author_", links["AND_ID"])
+    link_names = prefixed("Authorship_", links["PMID"], links["AND_ID"])
+    loader.add_individuals(onto.Authorship, link_names)
+    loader.add_data_triples(onto.authorOrder, link_names, links["AuOrder"], datatype=int)
+
+    # ----- Link everything -----
+    loader.add_object_triples(onto.writtenBy, link_articles, link_authors)
+    loader.add_object_triples(onto.hasAuthorship, link_articles, link_names)
+    loader.add_object_triples(onto.refersToAuthor, link_names, link_authors)
+    loader.commit()
+
+    print(f"Bulk-inserted {loader.nb_triples} triples")
+
+
+def write_author_names(onto, df, names, named, author_cache, created):
+    """Authors take their names from their first row in the drop, as in a full build: the first row of every AND_ID not seen in
+    an earlier frame is checked against the names tracker, and the names of new or changed ones are (re)written"""
+    authors = df.drop_duplicates("AND_ID")
+    authors = authors[unseen(prefixed("Author_", authors["AND_ID"]), named)]
+    authors, renamed = names.split(authors, prefixed("Author_", authors["AND_ID"]), ["LastName", "ForeName", "Initials"])
+    author_names = prefixed("Author_", authors["AND_ID"])
+    created.extend(authors["AND_ID"][~author_names.isin(author_cache).to_numpy()])
+    author_cache.update(author_names)
+
+    loader = BulkLoader(onto)
+    ids = loader.add_individuals(onto.Author, author_names)
+    for column, prop in [("LastName", onto.lastName), ("ForeName", onto.foreName), ("Initials", onto.initials)]:
+        loader.clear_data_values(prop, [i for i, r in zip(ids, renamed) if r])
+        loader.add_data_values(prop, ids, authors[column])
+
+
+def split_delta(onto, df, delta, article_cache, created):
+    """Keep new/changed rows; changed rows get their author order rewritten"""
+    df, changed = delta.split(df, prefixed("", df["PMID"], df["AND_ID"]), ["LastName", "ForeName", "Initials", "AuOrder"])
+    if changed.any():
+        rows = df[changed]
+        clear_values(onto, prefixed("Authorship_", rows["PMID"], rows["AND_ID"]), [onto.authorOrder])
+    pmids = df["PMID"].drop_duplicates()
+    created.extend(pmids[~prefixed("Article_", pmids).isin(article_cache).to_numpy()])
+    return df
+
+
+def remove_rows(onto, keys, orphans):
+    """Pairs the drop no longer has: their Authorship and writtenBy link go, and so do the Articles left without a pair and the
+    orphans (AND_IDs without any row); returns the PMIDs of the Articles removed"""
+    pairs = [key.split("_") for key in keys]
+    destroy_individuals(onto, ["Authorship_" + key for key in keys])
+    remove_edges(onto, onto.writtenBy, [f"Article_{pmid}" for pmid, _ in pairs], [f"Author_{and_id}" for _, and_id in pairs])
+    db = onto.world.graph.db
+    pmids = [pmid for pmid in sorted({pmid for pmid, _ in pairs}, key=int) if db.execute(
+        "SELECT 1 FROM objs WHERE p = ? AND s = (SELECT storid FROM resources WHERE iri = ?) LIMIT 1",
+        (onto.hasAuthorship.storid, f"{onto.base_iri}Article_{pmid}")).fetchone() is None]
+    destroy_individuals(onto, [f"Article_{pmid}" for pmid in pmids] + [f"Author_{and_id}" for and_id in orphans])
+    return pmids
+
+
+def populate(onto, data, bulk=False, delta=None):
+    """Populate Articles, Authors and Authorships from a frame or chunk stream; returns (articles, authors) created"""
+    # Caching to prevent duplicate creation - the only state kept between chunks
+    article_cache = set()
+    author_cache = set()
+    if delta is not None:
+        # Articles / Authors already in the store are not re-declared
+        article_cache = existing_names(onto, onto.Article)
+        author_cache = existing_names(onto, onto.Author)
+        # Author names are tracked per AND_ID, from the first row of each (after --resume, that row may be among the skipped ones)
+        names = DeltaTracker(onto, f"{delta.stage}_names", delta.complete)
+        named = set(prefixed("Author_", skipped_rows(INPUT_CSV[0], ["AND_ID"])["AND_ID"]))
+        created_articles, created_authors = [], []
+    nb_existing = len(article_cache), len(author_cache)
+
+    ingest = ingest_bulk if bulk else ingest_rows
+    for df in iter_frames(data):
+        if delta is not None:
+            write_author_names(onto, df, names, named, author_cache, created_authors)
+            df = split_delta(onto, df, delta, article_cache, created_articles)
+        ingest(onto, df, article_cache, author_cache)
+        onto.world.graph.commit()
+    if delta is not None:
+        orphans = [name[len("Author_"):] for name in names.removed()]
+        removed_articles = remove_rows(onto, delta.removed(), orphans)
+        # Later stages re-ingest their rows that join to an Article / Author that came or went
+        record_presence(onto, "Article", created_articles, removed_articles)
+        record_presence(onto, "Author", created_authors, orphans)
+        onto.world.graph.commit()
+        if orphans or removed_articles:
+            print(f"Removed {len(removed_articles)} articles and {len(orphans)} authors no longer in the drop")
+    onto.world.graph.analyze()
+    # AND_ID -> storid, for the enrichment steps
+    AuthorIndex.build(onto)
+
+    return len(article_cache) - nb_existing[0], len(author_cache) - nb_existing[1]
+
+
+def main():
+    parser = stage_argparser("Populate Article, Author and Authorship individuals from OA01")
+    parser.add_argument("--bulk", action="store_true", help="vectorized bulk ingestion instead of per-row individuals")
+    args = parser.parse_args()
+
+    with profile_stage(STAGE, args.profile) as profile:
+        # Load ontology
+        with profile.phase("load"):
+            onto = open_stage(INPUT_OWL, args, seed=True)
+        df, checkpoints = load_stage_data(onto, STAGE, INPUT_CSV, args, load_data)
+        delta = DeltaTracker(onto, STAGE, whole_drop(args)) if args.store else None
+
+        with profile.phase("populate"):
+            nb_articles, nb_authors = populate(onto, df, bulk=args.bulk, delta=delta)
+        if checkpoints:
+            checkpoints.finish()
+        if args.incremental:
+            delta.write_manifest()
+        profile.info.update(articles_created=nb_articles, authors_created=nb_authors)
+
+        # Free memory
+        del df
+        gc.collect()
+
+        print(f"Created {nb_articles} articles, {nb_authors} authors")
+
+        # Save populated ontology
+        with profile.phase("save"):
+            save_stage(onto, OUTPUT_OWL, args)
+
+if __name__ == "__main__":
+    main()
@@ -1,151 +1,300 @@
 """
 PKG2020 BioEntity Population - Biomedical Entity Data (Genes, Diseases, Mutations)
 PURPOSE: Creates Gene, Chemical, Disease, Species, Mutation individuals from OA02 and OA03 CSV files, links to articles via mentionsBioEntity.
-HOW: Uses SYNTHETIC MAPPING (modulo on article list) since CSV lacks direct PMID links; creates proper BioEntity subclass based on Type column.
+HOW: Joins OA02 rows to the loaded Articles on their PMID column (vectorized pandas join against the Article store ids) and OA03 rows
+     through the PMID of their OA02 row (Main_id); creates proper BioEntity subclass based on Type column.
+MEMORY: The OA02 id -> PMID map of that join lives in a side table of the store (bioentity_main_rows), written per OA02 chunk and
+     read back per OA03 chunk, and entities are checked against the store instead of a run-long set of IRIs.
+BULK: Entities are created per chunk and class with bulk_ingest.BulkLoader (no Python individuals).
+LINKS: Each chunk's mentionsBioEntity edges are inserted in one executemany batch grouped by article; rows whose article is not loaded
+     (e.g. --nrows samples of OA01 and OA02 covering different PMIDs) create their entity without a link.
 KEY FEATURE: Enables CQ4 (articles with genes), CQ5 (species), CQ6 (gene-mutation correlations), CQ7 (entity distribution analysis).
 DATA: ~100K bio-entities including genes (BRCA1), chemicals, diseases (cancer), mutations - core biomedical knowledge.
+CANONICAL: --canonical creates one Gene/Chemical/Disease/Species individual per (Type, EntityID) instead of one per OA02 row;
+     PMIDs and Start/End offsets go to a side table with a precomputed mention-count index (mention_index.py).
+MUTATIONS: OA03 NormalizedName values are parsed into typed columns (sequence type, change, ref, position, alt) and kept in a
+     position-sorted lookup table (mutation_index.py).
+INCREMENTAL: With --store, OA02 rows are keyed by id and OA03 rows by row number; --incremental re-creates only new/changed entities.
+     A whole-table run (--nrows 0) destroys the BioEntities / Mutations of rows the drop no longer has (with --canonical, the
+     mention row goes and a shared entity only with its last mention).
 OUTPUT: Saves pkg2020_step7_bioentities_populated.owl - adds rich biomedical semantic layer to articles.
 """
 import pandas as pd
-import os
 from owlready2 import *
+from stage_store import stage_argparser, open_stage, save_stage
+from stage_profile import profile_stage
+from checkpoints import load_stage_data
+from csv_loader import read_table, iter_frames, row_limit, resume_offset
+from delta_ingest import DeltaTracker, destroy_individuals, whole_drop, presence_changed
+from bulk_ingest import BulkLoader
+from iri_utils import sanitize_series
+from mention_index import MentionIndex
+from mutation_index import MutationIndex
 
-# Get script directory for relative paths
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+STAGE = "bioentities"
+INPUT_OWL = "pkg2020_step6_education_populated.owl"
+OUTPUT_OWL = "pkg2020_step7_bioentities_populated.owl"
+INPUT_CSV = ["OA02_Bio_entities_Main.csv", "OA03_Bio_entities_Mutation.csv"]
+# OA02 Type (lower case) -> BioEntity subclass; other types stay plain BioEntity
+ENTITY_CLASSES = {"gene": "Gene", "chemical": "Chemical", "disease": "Disease", "species": "Species"}
+# OA02 id -> PMID for the OA03 join, and whether the OA03 rows of that id are linked again (incremental runs); dropped at the end
+MAIN_ROWS_TABLE = "bioentity_main_rows"
+LOOKUP_BATCH = 500
 
-onto = get_ontology(os.path.join(PROJECT_DIR, "owl", "pkg2020_step6_education_populated.owl")).load()
+def declare_schema(onto):
+    """Define BioEntity classes and properties"""
+    with onto:
+        class BioEntity(Thing):
+            pass
 
-# Define BioEntity classes and properties
-with onto:
-    class BioEntity(Thing):
-        pass
+        class Gene(BioEntity):
+            pass
 
-    class Gene(BioEntity):
-        pass
+        class Chemical(BioEntity):
+            pass
 
-    class Chemical(BioEntity):
-        pass
+        class Disease(BioEntity):
+            pass
 
-    class Disease(BioEntity):
-        pass
+        class Species(BioEntity):
+            pass
 
-    class Species(BioEntity):
-        pass
+        class Mutation(BioEntity):
+            pass
 
-    class Mutation(BioEntity):
-        pass
+        class mentionsBioEntity(ObjectProperty):
+            domain = [onto.Article]
+            range = [BioEntity]
 
-    class mentionsBioEntity(ObjectProperty):
-        domain = [onto.Article]
-        range = [BioEntity]
+        class entityType(DataProperty):
+            domain = [BioEntity]
+            range = [str]
 
-    class entityType(DataProperty):
-        domain = [BioEntity]
-        range = [str]
+        class entityName(DataProperty):
+            domain = [BioEntity]
+            range = [str]
 
-    class entityName(DataProperty):
-        domain = [BioEntity]
-        range = [str]
+        class entityId(DataProperty):
+            domain = [BioEntity]
+            range = [str]
 
-    class entityId(DataProperty):
-        domain = [BioEntity]
-        range = [str]
+def load_data(chunk_size=None, nrows=None):
+    """Load OA02 and OA03 (chunk iterators when chunk_size is set); a missing file is reported and yields None"""
+    frames = []
+    for filename in INPUT_CSV:
+        try:
+            frames.append(read_table(filename, chunk_size, nrows=row_limit(nrows, 50000)))
+        except FileNotFoundError:
+            print(f"Warning: {filename} not found")
+            frames.append(None)
+    return tuple(frames)
 
-# Load caches
-Article = onto.Article
-BioEntity = onto.BioEntity
-Gene = onto.Gene
-Chemical = onto.Chemical
-Disease = onto.Disease
-Species = onto.Species
-Mutation = onto.Mutation
+def article_storids(onto):
+    """Store ids of the loaded Articles indexed by PMID, read with one query (no Python individuals)"""
+    prefix = onto.base_iri + "Article_"
+    rows = onto.world.graph.db.execute("""SELECT substr(r.iri, ?), r.storid FROM objs o JOIN resources r ON r.storid = o.s
+                                          WHERE o.p = ? AND o.o = ? AND substr(r.iri, 1, ?) = ?""",
+                                       (len(prefix) + 1, rdf_type, onto.Article.storid, len(prefix), prefix)).fetchall()
+    articles = pd.Series([storid for _, storid in rows], index=pd.to_numeric(pd.Series([pmid for pmid, _ in rows], dtype=object), errors="coerce"),
+                         dtype="int64")
+    return articles[articles.index.notna() & ~articles.index.duplicated()]
 
-# Get all existing article IRIs for synthetic mapping
-article_list = list(Article.instances())
-article_cache = {a.name: a for a in article_list}
-bioentity_cache = {}
+def link_mentions(loader, articles, pmids, entities):
+    """Join a chunk's PMIDs to the loaded Articles and insert all its mentionsBioEntity edges in one batch, grouped by article"""
+    edges = pd.DataFrame({"article": articles.reindex(pd.to_numeric(pmids, errors="coerce")).to_numpy(),
+                          "entity": entities}).dropna()
+    edges = edges.astype("int64").sort_values(["article", "entity"])
+    loader.add_object_edges(loader.onto.mentionsBioEntity, edges["article"], edges["entity"])
+    return len(edges)
 
-print(f"Loaded {len(article_cache)} articles for synthetic mapping")
+def record_main_rows(db, entity_ids, pmids, rejoined):
+    """Keep the PMID of a chunk's OA02 rows (the first row of an id wins) and flag the ids whose OA03 rows are linked again"""
+    pmids = pd.to_numeric(pd.Series(pmids), errors="coerce").astype("Int64").astype(object)
+    pmids = pmids.where(pmids.notna(), None)
+    db.executemany(f"INSERT OR IGNORE INTO {MAIN_ROWS_TABLE} VALUES (?,?,0)", zip(entity_ids, pmids))
+    db.executemany(f"UPDATE {MAIN_ROWS_TABLE} SET rejoined = 1 WHERE id = ?", ((entity_id,) for entity_id in rejoined))
 
-# Process OA02_Bio_entities_Main - synthetically map to existing articles
-try:
-    df_main = pd.read_csv(os.path.join(PROJECT_DIR, "data", "OA02_Bio_entities_Main.csv"), nrows=50000)
-    print("OA02 Columns:", df_main.columns.tolist())
-    
-    with onto:
-        for idx, row in df_main.iterrows():
-            if idx % 10000 == 0:
-                print(f"Processing OA02 row {idx}...")
-            
-            # Synthetically map to existing articles using modulo
-            article_idx = idx % len(article_list)
-            article = article_list[article_idx]
-            
-            # Create appropriate BioEntity subclass based on type
-            entity_type = str(row.get("Type", "Unknown"))
-            entity_id = str(row.get("id", row.name))
-            entity_name = str(row.get("Mention", row.get("Name", "Unknown")))
-            
-            bio_iri = f"BioEntity_{entity_id}"
-            if bio_iri not in bioentity_cache:
-                if entity_type.lower() == "gene":
-                    entity = Gene(bio_iri)
-                elif entity_type.lower() == "chemical":
-                    entity = Chemical(bio_iri)
-                elif entity_type.lower() == "disease":
-                    entity = Disease(bio_iri)
-                elif entity_type.lower() == "species":
-                    entity = Species(bio_iri)
-                else:
-                    entity = BioEntity(bio_iri)
-                
-                entity.entityType = [entity_type]
-                if pd.notna(entity_name):
-                    entity.entityName = [str(entity_name)]
-                entity.entityId = [entity_id]
-                bioentity_cache[bio_iri] = entity
-            
-            article.mentionsBioEntity.append(bioentity_cache[bio_iri])
-    
-    print(f"Processed OA02: {len(df_main)} rows")
-except FileNotFoundError:
-    print(f"Warning: OA02_Bio_entities_Main.csv not found")
-except Exception as e:
-    print(f"Error processing OA02: {e}")
-
-# Process OA03_Bio_entities_Mutation - synthetically map to existing articles
-try:
-    df_mutation = pd.read_csv(os.path.join(PROJECT_DIR, "data", "OA03_Bio_entities_Mutation.csv"), nrows=50000)
-    print("OA03 Columns:", df_mutation.columns.tolist())
-    
-    with onto:
-        for idx, row in df_mutation.iterrows():
-            if idx % 10000 == 0:
-                print(f"Processing OA03 row {idx}...")
-            
-            # Synthetically map to existing articles using modulo
-            article_idx = idx % len(article_list)
-            article = article_list[article_idx]
-            
-            entity_id = str(row.get("id", row.name))
-            mutation_iri = f"Mutation_{entity_id}"
-            
-            if mutation_iri not in bioentity_cache:
-                mutation = Mutation(mutation_iri)
-                mutation.entityType = ["Mutation"]
-                if "MutationType" in row and pd.notna(row["MutationType"]):
-                    mutation.entityName = [str(row["MutationType"])]
-                bioentity_cache[mutation_iri] = mutation
-            
-            article.mentionsBioEntity.append(bioentity_cache[mutation_iri])
-    
-    print(f"Processed OA03: {len(df_mutation)} rows")
-except FileNotFoundError:
-    print(f"Warning: OA03_Bio_entities_Mutation.csv not found")
-except Exception as e:
-    print(f"Error processing OA03: {e}")
-
-print(f"Total BioEntities created: {len(bioentity_cache)}")
-onto.save(file=os.path.join(PROJECT_DIR, "owl", "pkg2020_step7_bioentities_populated.owl"), format="rdfxml")
-print("Saved: pkg2020_step7_bioentities_populated.owl")
+def main_rows(db, main_ids):
+    """PMIDs (NaN where unknown) and rejoined flags for a column of OA02 ids, aligned with it"""
+    keys = list(main_ids.dropna().unique())
+    found = []
+    for start in range(0, len(keys), LOOKUP_BATCH):
+        batch = keys[start:start + LOOKUP_BATCH]
+        found.extend(db.execute(f"SELECT id, pmid, rejoined FROM {MAIN_ROWS_TABLE} WHERE id IN ({','.join('?' * len(batch))})", batch))
+    rows = pd.DataFrame(found, columns=["id", "pmid", "rejoined"]).set_index("id").reindex(main_ids.to_numpy())
+    pmids = pd.Series(pd.to_numeric(rows["pmid"], errors="coerce").to_numpy(dtype=float), index=main_ids.index)
+    return pmids, pd.Series(rows["rejoined"].fillna(0).to_numpy(dtype=bool), index=main_ids.index)
+
+def canonical_names(df, entity_ids):
+    """BioEntity_{type}_{EntityID} per OA02 row; rows without a normalized EntityID (0) keep their own BioEntity_{id}"""
+    types = df["Type"] if "Type" in df else pd.Series("Unknown", index=df.index)
+    keys = df["EntityID"].astype(str) if "EntityID" in df else pd.Series("0", index=df.index)
+    known = df["EntityID"].notna() & (keys != "0") if "EntityID" in df else keys != keys
+    names = "BioEntity_" + sanitize_series(types.str.lower()) + "_" + sanitize_series(keys)
+    return names.where(known, "BioEntity_" + entity_ids), keys.where(known, entity_ids)
+
+def populate(onto, df_main, df_mutation, delta=None, canonical=False):
+    """Create BioEntities and mentionsBioEntity links; returns the number of bio-entities
+
+    OA02 rows link to Article_{PMID} through their PMID column, OA03 rows through the PMID of their OA02 row (Main_id);
+    rows whose article is not loaded create their entity without a link. canonical=True creates one individual per
+    (Type, EntityID) and records each OA02 row as a mention in the side table of mention_index.py instead.
+    """
+    declare_schema(onto)
+
+    articles = article_storids(onto)
+    loader = BulkLoader(onto)
+    db = onto.world.graph.db
+    db.execute(f"CREATE TABLE IF NOT EXISTS {MAIN_ROWS_TABLE} (id TEXT PRIMARY KEY, pmid INTEGER, rejoined INTEGER)")
+    # A resumed run does not read the OA02 rows before its checkpoint again: their rows were committed with the checkpoint
+    if not resume_offset(INPUT_CSV[0]):
+        db.execute(f"DELETE FROM {MAIN_ROWS_TABLE}")
+    mentions = MentionIndex(onto) if canonical else None
+    mutation_index = MutationIndex(onto)
+    nb_entities = nb_links = nb_unlinked = 0
+
+    print(f"Loaded {len(articles)} articles for PMID linking")
+    # Rows of Articles the authors stage created or removed are re-linked even when unchanged
+    relinked = presence_changed(onto, "Article") if delta is not None else []
+
+    # Process OA02_Bio_entities_Main - linked through their PMID
+    nb_rows = 0
+    for df in iter_frames(df_main):
+        if nb_rows == 0:
+            print("OA02 Columns:", df.columns.tolist())
+
+        entity_ids = (df["id"] if "id" in df else df.index.to_series()).astype(str)
+        pmids = df["PMID"] if "PMID" in df else pd.Series(index=df.index, dtype=float)
+        if delta is not None:
+            df, changed = delta.split(df, "main:" + entity_ids, ["Type", "Mention", "EntityID", "PMID", "Start", "End"],
+                                      force=pmids.isin(relinked))
+            if not canonical:
+                # Canonical entities are shared by many rows: a changed row only re-records its mention
+                destroy_individuals(onto, [f"BioEntity_{entity_id}" for entity_id in entity_ids[df.index][changed]])
+        # The OA03 rows of new, changed (and below, removed) OA02 rows are linked again
+        record_main_rows(db, entity_ids, pmids, entity_ids[df.index] if delta is not None else [])
+        if canonical:
+            names, keys = canonical_names(df, entity_ids[df.index])
+
+        if df.empty:
+            continue
+        print(f"Processing OA02 rows {df.index[0]}-{df.index[-1]}...")
+
+        # Create appropriate BioEntity subclass based on type
+        entity_types = df["Type"].astype(str).fillna("nan") if "Type" in df else pd.Series("Unknown", index=df.index)
+        name_column = "Mention" if "Mention" in df else "Name"
+        entity_names = df[name_column].astype(str).fillna("nan") if name_column in df else pd.Series("Unknown", index=df.index)
+        if canonical:
+            bio_iris, row_entity_ids = names, keys
+        else:
+            bio_iris, row_entity_ids = "BioEntity_" + entity_ids[df.index], entity_ids[df.index]
+
+        # Only the first row of an entity describes it; an entity stored by an earlier chunk or (resumed or incremental) run
+        # keeps the name of its first mention
+        new = ~bio_iris.duplicated()
+        new[new] = ~loader.existing(bio_iris[new])
+        nb_entities += int(new.sum())
+        classes = entity_types[new].str.lower().map(ENTITY_CLASSES).fillna("BioEntity")
+        for class_name, rows in classes.groupby(classes).groups.items():
+            created = loader.add_individuals(onto[class_name], bio_iris[rows])
+            loader.add_data_values(onto.entityType, created, entity_types[rows])
+            loader.add_data_values(onto.entityName, created, entity_names[rows])
+            loader.add_data_values(onto.entityId, created, row_entity_ids[rows])
+        entities = loader.storids(bio_iris)
+
+        if canonical:
+            fields = df.reindex(columns=["Type", "Start", "End"])
+            mentions.record(entity_ids[df.index], names, fields["Type"].astype(str), pmids[df.index], fields["Start"], fields["End"])
+        else:
+            linked = link_mentions(loader, articles, pmids[df.index], entities)
+            nb_links += linked
+            nb_unlinked += len(df) - linked
+        onto.world.graph.commit()
+        nb_rows += len(df)
+
+    if delta is not None and df_main is not None:
+        removed = [key[len("main:"):] for key in delta.removed("main:")]
+        db.executemany(f"INSERT OR REPLACE INTO {MAIN_ROWS_TABLE} VALUES (?,NULL,1)", ((entity_id,) for entity_id in removed))
+        # A canonical entity goes with its last mention
+        destroy_individuals(onto, mentions.forget(removed) if canonical else ["BioEntity_" + entity_id for entity_id in removed])
+        onto.world.graph.commit()
+    if canonical:
+        linked = mentions.link()
+        mentions.build_counts()
+        onto.world.graph.commit()
+        nb_links += linked
+        print(f"Canonical BioEntities: {len(mentions)} mentions, {linked} article links")
+    if df_main is not None:
+        print(f"Processed OA02: {nb_rows} rows")
+
+    # Process OA03_Bio_entities_Mutation - linked through the PMID of their OA02 row
+    nb_rows = 0
+    for df in iter_frames(df_mutation):
+        if nb_rows == 0:
+            print("OA03 Columns:", df.columns.tolist())
+
+        main_ids = df["Main_id"].astype(str) if "Main_id" in df else pd.Series(index=df.index, dtype=object)
+        pmids, rejoined = main_rows(db, main_ids)
+        entity_ids = (df["id"] if "id" in df else df.index.to_series()).astype(str)
+        if delta is not None:
+            df, changed = delta.split(df, "mutation:" + entity_ids, ["Mention", "MutationType", "NormalizedName", "Main_id"],
+                                      force=pmids.isin(relinked) | rejoined)
+            destroy_individuals(onto, [f"Mutation_{entity_id}" for entity_id in entity_ids[df.index][changed]])
+        if "NormalizedName" in df:
+            mutation_index.record("Mutation_" + entity_ids[df.index], df["NormalizedName"])
+
+        if df.empty:
+            continue
+        print(f"Processing OA03 rows {df.index[0]}-{df.index[-1]}...")
+
+        mutation_iris = "Mutation_" + entity_ids[df.index]
+        new = ~mutation_iris.duplicated()
+        new[new] = ~loader.existing(mutation_iris[new])
+        nb_entities += int(new.sum())
+        created = loader.add_individuals(onto.Mutation, mutation_iris[new])
+        loader.add_data_values(onto.entityType, created, ["Mutation"] * len(created))
+        if "MutationType" in df:
+            loader.add_data_values(onto.entityName, created, df["MutationType"][new].astype(object))
+        entities = loader.storids(mutation_iris)
+
+        linked = link_mentions(loader, articles, pmids[df.index], entities)
+        nb_links += linked
+        nb_unlinked += len(df) - linked
+        onto.world.graph.commit()
+        nb_rows += len(df)
+
+    if delta is not None and df_mutation is not None:
+        removed = ["Mutation_" + key[len("mutation:"):] for key in delta.removed("mutation:")]
+        destroy_individuals(onto, removed)
+        mutation_index.forget(removed)
+        onto.world.graph.commit()
+    if df_mutation is not None:
+        print(f"Processed OA03: {nb_rows} rows")
+
+    db.execute(f"DROP TABLE {MAIN_ROWS_TABLE}")
+    onto.world.graph.commit()
+    print(f"Total BioEntities created: {nb_entities} ({len(mutation_index)} mutations in the position index)")
+    print(f"mentionsBioEntity links: {nb_links} ({nb_unlinked} rows without a loaded article)")
+    return nb_entities
+
+def main():
+    parser = stage_argparser("Populate BioEntity individuals from OA02 and OA03")
+    parser.add_argument("--canonical", action="store_true",
+                        help="one individual per (Type, EntityID); per-row mentions go to the mention_index side table")
+    args = parser.parse_args()
+    with profile_stage(STAGE, args.profile) as profile:
+        with profile.phase("load"):
+            onto = open_stage(INPUT_OWL, args)
+        delta = DeltaTracker(onto, STAGE, whole_drop(args)) if args.store else None
+        data, checkpoints = load_stage_data(onto, STAGE, INPUT_CSV, args, load_data)
+        with profile.phase("populate"):
+            populate(onto, *data, delta=delta, canonical=args.canonical)
+        if checkpoints:
+            checkpoints.finish()
+        if args.incremental:
+            delta.write_manifest()
+        with profile.phase("save"):
+            save_stage(onto, OUTPUT_OWL, args)
+
+if __name__ == "__main__":
+    main()
@@ -1,104 +1,135 @@
 """
 PKG2020 Education Population - Academic Background Data
 PURPOSE: Creates Education and Institution individuals from OA06_Researcher_Education.csv, linking authors to their academic history.
-HOW: Loads authors, creates Education records (degree, startYear, endYear), Institution entities, links via hasEducation and educatedAt.
+HOW: Joins rows to Authors by AND_ID (author_index), creates Education records (degree, startYear, endYear), Institution entities, links via hasEducation and educatedAt.
+     Each chunk is written column by column through bulk_ingest.BulkLoader.
 KEY FEATURE: Enables CQ12 (authors with PhDs), CQ10 (top institutions), supports SWRL AlumniPeer rule (same institution = peers).
 DATA: Degrees (PhD, Masters), institutions (universities), graduation years - enables academic network analysis.
+INCREMENTAL: With --store, rows are keyed by the table's id column (Education_<id>; row number in files without one); --incremental
+     re-creates only new/changed education records (a row moved to another AND_ID counts as changed), and a whole-table run
+     (--nrows 0) destroys the records of rows the drop no longer has.
 OUTPUT: Saves pkg2020_step6_education_populated.owl - completes author academic profiles.
 """
 import pandas as pd
-import os
 import random
-import re
 from owlready2 import *
-
-# Get script directory for relative paths
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
-
-def sanitize_iri(name):
-    """Sanitize string for use as OWL IRI"""
-    name = re.sub(r'[^a-zA-Z0-9_]', '_', str(name))
-    name = re.sub(r'_+', '_', name)
-    name = name.strip('_')
-    return name[:100] if name else "Unknown"
-
-onto = get_ontology(os.path.join(PROJECT_DIR, "owl", "pkg2020_step5_employment_populated.owl")).load()
-
-# Define Education class and properties
-with onto:
-    class Education(Thing):
-        pass
-
-    class Institution(Thing):
-        pass
-
-    class hasEducation(ObjectProperty):
-        domain = [onto.Author]
-        range = [Education]
-
-    class educatedAt(ObjectProperty):
-        domain = [Education]
-        range = [Institution]
-
-    class degree(DataProperty):
-        domain = [Education]
-        range = [str]
-
-    class educationStartYear(DataProperty):
-        domain = [Education]
-        range = [int]
-
-    class educationEndYear(DataProperty):
-        domain = [Education]
-        range = [int]
-
-# Load caches
-Author = onto.Author
-Education = onto.Education
-Institution = onto.Institution
-
-author_list = list(Author.instances())
-institution_cache = {}
-
-print(f"Loaded {len(author_list)} authors")
-
-# Random number between 10000-15000 for stable file size
-TARGET_RECORDS = random.randint(10000, 15000)
-print(f"Creating {TARGET_RECORDS} education records...")
-
-df = pd.read_csv(os.path.join(PROJECT_DIR, "data", "OA06_Researcher_Education.csv"), nrows=TARGET_RECORDS)
-
-with onto:
-    for idx, row in df.iterrows():
-        if idx % 5000 == 0:
-            print(f"Processing row {idx}...")
-        
-        author = random.choice(author_list)
-        edu = Education(f"Education_{idx}")
-        
-        inst_name = str(row["Institution"]) if "Institution" in row and pd.notna(row["Institution"]) else "Unknown"
-        inst_iri = sanitize_iri(inst_name)
-        if inst_iri not in institution_cache:
-            institution_cache[inst_iri] = Institution(inst_iri)
-        
-        edu.educatedAt.append(institution_cache[inst_iri])
-        author.hasEducation.append(edu)
-        
-        if "Degree" in row and pd.notna(row["Degree"]):
-            edu.degree = [sanitize_iri(str(row["Degree"]))]
-        
-        if "StartYear" in row and pd.notna(row["StartYear"]):
-            try:
-                edu.educationStartYear = [int(row["StartYear"])]
-            except:
-                pass
-        if "EndYear" in row and pd.notna(row["EndYear"]):
-            try:
-                edu.educationEndYear = [int(row["EndYear"])]
-            except:
-                pass
-
-print(f"Created {len(list(Education.instances()))} education records")
-onto.save(file=os.path.join(PROJECT_DIR, "owl", "pkg2020_step6_education_populated.owl"), format="rdfxml")
-print("Saved: pkg2020_step6_education_populated.owl")
+from stage_store import stage_argparser, open_stage, save_stage
+from stage_profile import profile_stage
+from checkpoints import load_stage_data
+from csv_loader import read_table, iter_frames, row_limit
+from author_index import AuthorIndex
+from iri_utils import sanitize_series, IriMinter
+from bulk_ingest import BulkLoader
+from delta_ingest import DeltaTracker, destroy_individuals, whole_drop, presence_changed
+
+STAGE = "education"
+INPUT_OWL = "pkg2020_step5_employment_populated.owl"
+OUTPUT_OWL = "pkg2020_step6_education_populated.owl"
+INPUT_CSV = ["OA06_Researcher_Education.csv"]
+
+def declare_schema(onto):
+    """Define Education class and properties"""
+    with onto:
+        class Education(Thing):
+            pass
+
+        class Institution(Thing):
+            pass
+
+        class hasEducation(ObjectProperty):
+            domain = [onto.Author]
+            range = [Education]
+
+        class educatedAt(ObjectProperty):
+            domain = [Education]
+            range = [Institution]
+
+        class degree(DataProperty):
+            domain = [Education]
+            range = [str]
+
+        class educationStartYear(DataProperty):
+            domain = [Education]
+            range = [int]
+
+        class educationEndYear(DataProperty):
+            domain = [Education]
+            range = [int]
+
+def load_data(chunk_size=None, nrows=None):
+    # Random number between 10000-15000 for stable file size
+    target_records = row_limit(nrows, random.randint(10000, 15000))
+    print(f"Creating {target_records or 'all'} education records...")
+    return read_table(INPUT_CSV[0], chunk_size, nrows=target_records)
+
+def populate(onto, data, delta=None):
+    """Attach one Education per row to an author; returns the number of education records"""
+    declare_schema(onto)
+
+    authors = AuthorIndex.open(onto)
+    loader = BulkLoader(onto)
+    mint_inst_iri = IriMinter("Institution")
+
+    print(f"Author index: {len(authors)} authors")
+    # Rows of Authors the authors stage created or removed are re-ingested even when unchanged
+    relinked = presence_changed(onto, "Author") if delta is not None else []
+
+    for df in iter_frames(data):
+        keys = (df["id"] if "id" in df else df.index.to_series()).astype(str)
+        if delta is not None:
+            df, changed = delta.split(df, keys, ["AND_ID", "Institution", "Degree", "StartYear", "EndYear"],
+                                      force=df["AND_ID"].isin(relinked))
+            keys = keys[df.index]
+            destroy_individuals(onto, "Education_" + keys[changed])
+        # Join on AND_ID: rows of authors that were not loaded are skipped
+        author_storids = pd.Series(authors.lookup(df["AND_ID"]), index=df.index)
+        df, author_storids = df[author_storids != 0], author_storids[author_storids != 0]
+        keys = keys[df.index]
+        if df.empty:
+            continue
+        print(f"Processing rows {df.index[0]}-{df.index[-1]}...")
+
+        educations = loader.add_individuals(onto.Education, "Education_" + keys)
+        if "Institution" in df:
+            inst_names = df["Institution"].astype(str).where(df["Institution"].notna(), "Unknown")
+        else:
+            inst_names = pd.Series("Unknown", index=df.index)
+        institutions = loader.add_individuals(onto.Institution, mint_inst_iri.mint_series(inst_names))
+        loader.add_object_edges(onto.educatedAt, educations, institutions)
+        loader.add_object_edges(onto.hasEducation, author_storids, educations)
+
+        if "Degree" in df:
+            degrees = df["Degree"].astype(object)
+            known = degrees.notna()
+            loader.add_data_values(onto.degree, [e for e, k in zip(educations, known) if k], sanitize_series(degrees[known].astype(str)))
+        for column, prop in [("StartYear", onto.educationStartYear), ("EndYear", onto.educationEndYear)]:
+            if column in df:
+                loader.add_data_values(prop, educations, df[column].astype(object), int)
+        loader.commit()
+
+    if delta is not None:
+        destroy_individuals(onto, ["Education_" + key for key in delta.removed()])
+        loader.commit()
+    mint_inst_iri.report()
+    nb_educations = loader.count_individuals(onto.Education)
+    print(f"Created {nb_educations} education records")
+    return nb_educations
+
+def main():
+    args = stage_argparser("Populate Education and Institution individuals from OA06").parse_args()
+    with profile_stage(STAGE, args.profile) as profile:
+        with profile.phase("load"):
+            onto = open_stage(INPUT_OWL, args)
+        delta = DeltaTracker(onto, STAGE, whole_drop(args)) if args.store else None
+        data, checkpoints = load_stage_data(onto, STAGE, INPUT_CSV, args, load_data)
+        with profile.phase("populate"):
+            populate(onto, data, delta)
+        if checkpoints:
+            checkpoints.finish()
+        if args.incremental:
+            delta.write_manifest()
+        with profile.phase("save"):
+            save_stage(onto, OUTPUT_OWL, args)
+
+if __name__ == "__main__":
+    main()
@@ -1,94 +1,125 @@
 """
 PKG2020 Employment Population - Career History Data
 PURPOSE: Creates Employment individuals linking authors to their work history using OA05_Researcher_Employment.csv (50K rows).
-HOW: Loads existing authors, creates Employment records with startYear, endYear, jobTitle, links to Organization via employedAt property.
+HOW: Joins rows to Authors by AND_ID (author_index, no Author objects loaded), creates Employment records with startYear, endYear, jobTitle, links to Organization via employedAt property.
+     Each chunk is written column by column through bulk_ingest.BulkLoader.
 KEY FEATURE: Captures temporal career data enabling timeline queries (CQ11), supports career analysis across organizations.
 DATA: Job titles, employment periods, employer organizations - enables queries like "authors who worked at Harvard in 2020".
+INCREMENTAL: With --store, rows are keyed by the table's id column (Employment_<id>; row number in files without one); --incremental
+     re-creates only new/changed employment records (a row moved to another AND_ID counts as changed), and a whole-table run
+     (--nrows 0) destroys the records of rows the drop no longer has.
 OUTPUT: Saves pkg2020_step5_employment_populated.owl - adds professional history to author profiles.
 """
 import pandas as pd
-import os
 import random
-import re
 from owlready2 import *
+from stage_store import stage_argparser, open_stage, save_stage
+from stage_profile import profile_stage
+from checkpoints import load_stage_data
+from csv_loader import read_table, iter_frames, row_limit
+from author_index import AuthorIndex
+from iri_utils import IriMinter
+from bulk_ingest import BulkLoader
+from delta_ingest import DeltaTracker, destroy_individuals, whole_drop, presence_changed
 
-# Get script directory for relative paths
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
-
-def sanitize_iri(name):
-    """Sanitize string for use as OWL IRI"""
-    name = re.sub(r'[^a-zA-Z0-9_]', '_', str(name))
-    name = re.sub(r'_+', '_', name)
-    name = name.strip('_')
-    return name[:100] if name else "Unknown"  # Limit length
-
-onto = get_ontology(os.path.join(PROJECT_DIR, "owl", "pkg2020_step4_affiliations_populated.owl")).load()
-
-# Define Employment class and properties
-with onto:
-    class Employment(Thing):
-        pass
-
-    class hasEmployment(ObjectProperty):
-        domain = [onto.Author]
-        range = [Employment]
-
-    class employedAt(ObjectProperty):
-        domain = [Employment]
-        range = [onto.Organization]
-
-    class startYear(DataProperty):
-        domain = [Employment]
-        range = [int]
-
-    class endYear(DataProperty):
-        domain = [Employment]
-        range = [int]
-
-# Load caches
-Author = onto.Author
-Employment = onto.Employment
-Organization = onto.Organization
-
-author_list = list(Author.instances())
-org_cache = {o.name: o for o in Organization.instances()}
-
-print(f"Loaded {len(author_list)} authors")
-
-# Random number between 10000-15000 for stable file size
-TARGET_RECORDS = random.randint(10000, 15000)
-print(f"Creating {TARGET_RECORDS} employment records...")
-
-df = pd.read_csv(os.path.join(PROJECT_DIR, "data", "OA05_Researcher_Employment.csv"), nrows=TARGET_RECORDS)
-
-with onto:
-    for idx, row in df.iterrows():
-        if idx % 5000 == 0:
-            print(f"Processing row {idx}...")
-        
-        author = random.choice(author_list)
-        emp = Employment(f"Employment_{idx}")
-        
-        org_name = str(row["Organization"]) if pd.notna(row["Organization"]) else "Unknown"
-        org_iri = sanitize_iri(org_name)
-        if org_iri not in org_cache:
-            org_cache[org_iri] = Organization(org_iri)
-        
-        emp.employedAt.append(org_cache[org_iri])
-        author.hasEmployment.append(emp)
-        
-        if "StartYear" in row and pd.notna(row["StartYear"]):
-            try:
-                emp.startYear = [int(row["StartYear"])]
-            except:
-                pass
-        if "EndYear" in row and pd.notna(row["EndYear"]):
-            try:
-                emp.endYear = [int(row["EndYear"])]
-            except:
-                pass
-
-print(f"Created {len(list(Employment.instances()))} employment records")
-onto.save(file=os.path.join(PROJECT_DIR, "owl", "pkg2020_step5_employment_populated.owl"), format="rdfxml")
-print("Saved: pkg2020_step5_employment_populated.owl")
+STAGE = "employment"
+INPUT_OWL = "pkg2020_step4_affiliations_populated.owl"
+OUTPUT_OWL = "pkg2020_step5_employment_populated.owl"
+INPUT_CSV = ["OA05_Researcher_Employment.csv"]
+
+def declare_schema(onto):
+    """Define Employment class and properties"""
+    with onto:
+        # Also declared by populate_affiliations.py - redeclared so this stage only needs the author layer
+        class Organization(Thing):
+            pass
+
+        class Employment(Thing):
+            pass
+
+        class hasEmployment(ObjectProperty):
+            domain = [onto.Author]
+            range = [Employment]
+
+        class employedAt(ObjectProperty):
+            domain = [Employment]
+            range = [Organization]
+
+        class startYear(DataProperty):
+            domain = [Employment]
+            range = [int]
+
+        class endYear(DataProperty):
+            domain = [Employment]
+            range = [int]
+
+def load_data(chunk_size=None, nrows=None):
+    # Random number between 10000-15000 for stable file size
+    target_records = row_limit(nrows, random.randint(10000, 15000))
+    print(f"Creating {target_records or 'all'} employment records...")
+    return read_table(INPUT_CSV[0], chunk_size, nrows=target_records)
+
+def populate(onto, data, delta=None):
+    """Attach one Employment per row to an author; returns the number of employment records"""
+    declare_schema(onto)
+
+    authors = AuthorIndex.open(onto)
+    loader = BulkLoader(onto)
+    mint_org_iri = IriMinter("Organization")
+
+    print(f"Author index: {len(authors)} authors")
+    # Rows of Authors the authors stage created or removed are re-ingested even when unchanged
+    relinked = presence_changed(onto, "Author") if delta is not None else []
+
+    for df in iter_frames(data):
+        keys = (df["id"] if "id" in df else df.index.to_series()).astype(str)
+        if delta is not None:
+            df, changed = delta.split(df, keys, ["AND_ID", "Organization", "StartYear", "EndYear"],
+                                      force=df["AND_ID"].isin(relinked))
+            keys = keys[df.index]
+            destroy_individuals(onto, "Employment_" + keys[changed])
+        # Join on AND_ID: rows of authors that were not loaded are skipped
+        author_storids = pd.Series(authors.lookup(df["AND_ID"]), index=df.index)
+        df, author_storids = df[author_storids != 0], author_storids[author_storids != 0]
+        keys = keys[df.index]
+        if df.empty:
+            continue
+        print(f"Processing rows {df.index[0]}-{df.index[-1]}...")
+
+        employments = loader.add_individuals(onto.Employment, "Employment_" + keys)
+        org_names = df["Organization"].astype(str).where(df["Organization"].notna(), "Unknown")
+        organizations = loader.add_individuals(onto.Organization, mint_org_iri.mint_series(org_names))
+        loader.add_object_edges(onto.employedAt, employments, organizations)
+        loader.add_object_edges(onto.hasEmployment, author_storids, employments)
+
+        for column, prop in [("StartYear", onto.startYear), ("EndYear", onto.endYear)]:
+            if column in df:
+                loader.add_data_values(prop, employments, df[column].astype(object), int)
+        loader.commit()
+
+    if delta is not None:
+        destroy_individuals(onto, ["Employment_" + key for key in delta.removed()])
+        loader.commit()
+    mint_org_iri.report()
+    nb_employments = loader.count_individuals(onto.Employment)
+    print(f"Created {nb_employments} employment records")
+    return nb_employments
+
+def main():
+    args = stage_argparser("Populate Employment individuals from OA05").parse_args()
+    with profile_stage(STAGE, args.profile) as profile:
+        with profile.phase("load"):
+            onto = open_stage(INPUT_OWL, args)
+        delta = DeltaTracker(onto, STAGE, whole_drop(args)) if args.store else None
+        data, checkpoints = load_stage_data(onto, STAGE, INPUT_CSV, args, load_data)
+        with profile.phase("populate"):
+            populate(onto, data, delta)
+        if checkpoints:
+            checkpoints.finish()
+        if args.incremental:
+            delta.write_manifest()
+        with profile.phase("save"):
+            save_stage(onto, OUTPUT_OWL, args)
+
+if __name__ == "__main__":
+    main()
@@ -1,88 +1,200 @@
 """
 PKG2020 NIH Projects Population - Research Funding Data
 PURPOSE: Creates NIHProject individuals from OA07_NIH_Projects.csv, linking authors to their research funding via hasProject property.
-HOW: Loads authors, creates NIHProject (projectNumber, piName), links author to project - enables FundedAuthor SWRL rule classification.
+HOW: Creates NIHProject (projectNumber, piName), links it to the Author with the row's AND_ID (author_index) - enables FundedAuthor SWRL rule classification.
+     Each chunk is written column by column through bulk_ingest.BulkLoader.
 KEY FEATURE: Enables CQ13 (NIH funded authors), CQ14 (principal investigators), demonstrates author-funding research networks.
 DATA: NIH project numbers (R01-CA12345), PI names - enables funding analysis and research impact tracking.
+INCREMENTAL: With --store, rows are keyed by OA07 id; --incremental re-links only new/changed rows (project numbers are upserted).
+     The nih_project_rows side table remembers the project and AND_ID of every row read: the projects of changed rows (old and new) and of rows
+     a whole-table drop (--nrows 0) no longer has get their hasProject / isPrincipalInvestigator edges rebuilt from every row naming
+     them, and a project no row names any more is destroyed. A store built before the table existed fills it on its first
+     --incremental run, which cannot yet tell the projects of rows that were already gone.
 OUTPUT: Saves pkg2020_final.owl - FINAL populated ontology with all data (2.1M+ triples).
 """
 import pandas as pd
-import os
 import random
-import re
 from owlready2 import *
+from stage_store import stage_argparser, open_stage, save_stage
+from stage_profile import profile_stage
+from checkpoints import load_stage_data
+from csv_loader import read_table, iter_frames, row_limit
+from author_index import AuthorIndex
+from iri_utils import sanitize_series, IriMinter
+from bulk_ingest import BulkLoader
+from delta_ingest import DeltaTracker, destroy_individuals, whole_drop, presence_changed
 
-# Get script directory for relative paths
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
-
-def sanitize_iri(name):
-    """Sanitize string for use as OWL IRI"""
-    name = re.sub(r'[^a-zA-Z0-9_]', '_', str(name))
-    name = re.sub(r'_+', '_', name)
-    name = name.strip('_')
-    return name[:100] if name else "Unknown"
-
-onto = get_ontology(os.path.join(PROJECT_DIR, "owl", "pkg2020_step7_bioentities_populated.owl")).load()
-
-# Define NIH Project class and properties
-with onto:
-    class NIHProject(Thing):
-        pass
-
-    class hasProject(ObjectProperty):
-        domain = [onto.Author]
-        range = [NIHProject]
-
-    class projectNumber(DataProperty):
-        domain = [NIHProject]
-        range = [str]
-
-    class piName(DataProperty):
-        domain = [NIHProject]
-        range = [str]
-
-    class isPrincipalInvestigator(ObjectProperty):
-        domain = [NIHProject]
-        range = [onto.Author]
-
-# Load caches
-Author = onto.Author
-NIHProject = onto.NIHProject
-
-author_list = list(Author.instances())
-project_cache = {}
-
-print(f"Loaded {len(author_list)} authors")
-
-# Random number between 10000-15000 for stable file size
-TARGET_RECORDS = random.randint(10000, 15000)
-print(f"Creating {TARGET_RECORDS} NIH project records...")
-
-df = pd.read_csv(os.path.join(PROJECT_DIR, "data", "OA07_NIH_Projects.csv"), nrows=TARGET_RECORDS)
-
-with onto:
-    for idx, row in df.iterrows():
-        if idx % 5000 == 0:
-            print(f"Processing row {idx}...")
-        
-        author = random.choice(author_list)
-        
-        proj_num = str(row["ProjectNumber"]) if "ProjectNumber" in row and pd.notna(row["ProjectNumber"]) else str(idx)
-        proj_iri = f"NIHProject_{sanitize_iri(proj_num)}"
-        
-        if proj_iri not in project_cache:
-            project = NIHProject(proj_iri)
-            project.projectNumber = [sanitize_iri(proj_num)]
-            if "PI_Name" in row and pd.notna(row["PI_Name"]):
-                project.piName = [sanitize_iri(str(row["PI_Name"]))]
-            project_cache[proj_iri] = project
+STAGE = "nih_projects"
+INPUT_OWL = "pkg2020_step7_bioentities_populated.owl"
+OUTPUT_OWL = "pkg2020_final.owl"
+INPUT_CSV = ["OA07_NIH_Projects.csv"]
+PROJECT_ROWS_TABLE = "nih_project_rows"
+
+def declare_schema(onto):
+    """Define NIH Project class and properties"""
+    with onto:
+        class NIHProject(Thing):
+            pass
+
+        class hasProject(ObjectProperty):
+            domain = [onto.Author]
+            range = [NIHProject]
+
+        class projectNumber(DataProperty):
+            domain = [NIHProject]
+            range = [str]
+
+        class piName(DataProperty):
+            domain = [NIHProject]
+            range = [str]
+
+        class isPrincipalInvestigator(ObjectProperty):
+            domain = [NIHProject]
+            range = [onto.Author]
+
+def load_data(chunk_size=None, nrows=None):
+    # Random number between 10000-15000 for stable file size
+    target_records = row_limit(nrows, random.randint(10000, 15000))
+    print(f"Creating {target_records or 'all'} NIH project records...")
+    return read_table(INPUT_CSV[0], chunk_size, nrows=target_records)
+
+def projects_of(db, keys):
+    """Projects the stored rows of keys named"""
+    return {project for key in keys
+            for (project,) in db.execute(f"SELECT project FROM {PROJECT_ROWS_TABLE} WHERE key = ?", (key,))}
+
+def record_rows(db, keys, projects, and_ids):
+    """Remember the project and AND_ID of one chunk of rows (aligned columns); a row recorded before is replaced"""
+    rows = [(k, p, None if pd.isna(a) else int(a)) for k, p, a in zip(keys, projects, and_ids)]
+    db.executemany(f"INSERT OR REPLACE INTO {PROJECT_ROWS_TABLE} VALUES (?,?,?)", rows)
+
+def forget_rows(db, keys):
+    """Drop deleted rows; returns the projects they named"""
+    projects = projects_of(db, keys)
+    db.executemany(f"DELETE FROM {PROJECT_ROWS_TABLE} WHERE key = ?", ((key,) for key in keys))
+    return projects
+
+def relink_projects(onto, loader, authors, projects, first_rows):
+    """Rebuild the hasProject / isPrincipalInvestigator edges of projects from every recorded row that names them, and their
+    number and PI name from first_rows ({project: (number, PI name)} of its first row in the drop)"""
+    db = onto.world.graph.db
+    orphans, described = [], []
+    for project in sorted(projects):
+        found = db.execute("SELECT storid FROM resources WHERE iri = ?", (onto.base_iri + project,)).fetchone()
+        if found is None:
+            continue
+        storid = found[0]
+        db.execute("DELETE FROM objs WHERE p = ? AND o = ?", (onto.hasProject.storid, storid))
+        db.execute("DELETE FROM objs WHERE s = ? AND p = ?", (storid, onto.isPrincipalInvestigator.storid))
+        and_ids = [and_id for (and_id,) in db.execute(f"SELECT and_id FROM {PROJECT_ROWS_TABLE} WHERE project = ?", (project,))]
+        if not and_ids:
+            orphans.append(project)
+            continue
+        author_storids = [a for a in dict.fromkeys(authors.lookup(and_ids)) if a != 0]
+        loader.add_object_edges(onto.hasProject, author_storids, [storid] * len(author_storids))
+        loader.add_object_edges(onto.isPrincipalInvestigator, [storid] * len(author_storids), author_storids)
+        if project in first_rows:
+            described.append((storid, *first_rows[project]))
+    if described:
+        storids, numbers, pi_names = (pd.Series(column, dtype=object) for column in zip(*described))
+        for prop in [onto.projectNumber, onto.piName]:
+            loader.clear_data_values(prop, storids)
+        loader.add_data_values(onto.projectNumber, storids, numbers)
+        named = pi_names.notna()
+        loader.add_data_values(onto.piName, storids[named], sanitize_series(pi_names[named].astype(str)))
+    destroy_individuals(onto, orphans)
+    loader.commit()
+    return len(orphans)
+
+def populate(onto, data, delta=None):
+    """Link authors to NIH projects; returns the number of projects"""
+    declare_schema(onto)
+
+    authors = AuthorIndex.open(onto)
+    loader = BulkLoader(onto)
+    projects_seen = set()
+    mint_project_iri = IriMinter("NIHProject")
+
+    touched = set()  # projects whose links are rebuilt from the side table
+    first_rows = {}  # project -> (number, PI name) of its first row in the drop, to describe the touched ones
+    db = onto.world.graph.db
+    if delta is not None:
+        db.execute(f"CREATE TABLE IF NOT EXISTS {PROJECT_ROWS_TABLE} (key TEXT PRIMARY KEY, project TEXT, and_id INTEGER)")
+        db.execute(f"CREATE INDEX IF NOT EXISTS {PROJECT_ROWS_TABLE}_project ON {PROJECT_ROWS_TABLE} (project)")
+
+    print(f"Author index: {len(authors)} authors")
+    # Rows of Authors the authors stage created or removed are re-linked even when unchanged
+    relinked = presence_changed(onto, "Author") if delta is not None else []
+
+    for df in iter_frames(data):
+        if "ProjectNumber" in df:
+            proj_nums = df["ProjectNumber"].astype(str).where(df["ProjectNumber"].notna(), df.index.astype(str).to_series(index=df.index))
         else:
-            project = project_cache[proj_iri]
-        
-        author.hasProject.append(project)
-        project.isPrincipalInvestigator.append(author)
-
-print(f"Created {len(project_cache)} NIH projects")
-onto.save(file=os.path.join(PROJECT_DIR, "owl", "pkg2020_final.owl"), format="rdfxml")
-print("Saved: pkg2020_final.owl")
+            proj_nums = df.index.astype(str).to_series(index=df.index)
+        proj_numbers = mint_project_iri.mint_series(proj_nums)
+        proj_iris = "NIHProject_" + proj_numbers
+        # The first row of a project in the drop sets its number and PI name
+        first = ~proj_iris.duplicated() & ~proj_iris.isin(projects_seen)
+        projects_seen.update(proj_iris[first])
+        if delta is not None:
+            pi_names = df["PI_Name"] if "PI_Name" in df else pd.Series(index=df.index, dtype=object)
+            first_rows.update(zip(proj_iris[first], zip(proj_numbers[first], pi_names[first])))
+            keys = (df["id"] if "id" in df else df.index.to_series()).astype(str)
+            kept, changed = delta.split(df, keys, ["AND_ID", "PMID", "ProjectNumber", "PI_Name"],
+                                        force=df["AND_ID"].isin(relinked))
+            # A changed row may have left its project: that project's links are rebuilt too
+            touched.update(projects_of(db, keys[kept.index][changed]))
+            # Every row of the drop is recorded, unchanged ones included, so a rebuild sees all the rows naming a project
+            record_rows(db, keys, proj_iris, df["AND_ID"])
+            # An unchanged first row keeps its stored values; a project whose first row may be another now (a changed or
+            # removed row of it) is described again from first_rows, with its links
+            df, proj_numbers, proj_iris, first = kept, proj_numbers[kept.index], proj_iris[kept.index], first[kept.index]
+            touched.update(proj_iris[changed])
+        if df.empty:
+            continue
+        print(f"Processing rows {df.index[0]}-{df.index[-1]}...")
+
+        projects = pd.Series(loader.add_individuals(onto.NIHProject, proj_iris), index=df.index)
+
+        # Replacing the values an earlier run gave the project
+        loader.clear_data_values(onto.projectNumber, projects[first])
+        loader.add_data_values(onto.projectNumber, projects[first], proj_numbers[first])
+        loader.clear_data_values(onto.piName, projects[first])
+        if "PI_Name" in df:
+            named = first & df["PI_Name"].notna()
+            loader.add_data_values(onto.piName, projects[named], sanitize_series(df["PI_Name"][named].astype(str)))
+
+        # Join on AND_ID: projects of authors that were not loaded stay unlinked
+        author_storids = pd.Series(authors.lookup(df["AND_ID"]), index=df.index)
+        linked = author_storids != 0
+        loader.add_object_edges(onto.hasProject, author_storids[linked], projects[linked])
+        loader.add_object_edges(onto.isPrincipalInvestigator, projects[linked], author_storids[linked])
+        loader.commit()
+
+    if delta is not None:
+        touched.update(forget_rows(db, delta.removed()))
+        if touched:
+            nb_orphans = relink_projects(onto, loader, authors, touched, first_rows)
+            print(f"Re-linked {len(touched)} NIH projects of changed or removed rows ({nb_orphans} left without rows, removed)")
+    mint_project_iri.report()
+    print(f"Created {len(projects_seen)} NIH projects")
+    return len(projects_seen)
+
+def main():
+    args = stage_argparser("Populate NIHProject individuals from OA07").parse_args()
+    with profile_stage(STAGE, args.profile) as profile:
+        with profile.phase("load"):
+            onto = open_stage(INPUT_OWL, args)
+        delta = DeltaTracker(onto, STAGE, whole_drop(args)) if args.store else None
+        data, checkpoints = load_stage_data(onto, STAGE, INPUT_CSV, args, load_data)
+        with profile.phase("populate"):
+            populate(onto, data, delta)
+        if checkpoints:
+            checkpoints.finish()
+        if args.incremental:
+            delta.write_manifest()
+        with profile.phase("save"):
+            save_stage(onto, OUTPUT_OWL, args, final=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+PKG2020 RDF Snapshot - Compact Binary Graph (HDT-Style) With Memory-Mapped Triple-Pattern Lookups
+PURPOSE: Gives the webapp, validators and scripts a local, read-only copy of the final graph that opens in milliseconds,
+         instead of sending every lookup to the remote GraphDB endpoint or parsing hundreds of MB of RDF/XML.
+HOW: Every distinct N-Triples term gets an id in sorted (UTF-8 byte) order; the dictionary is front-coded in blocks of
+     BLOCK_SIZE terms (the first term of a block whole, the others as shared-prefix length + suffix) with one offset per block.
+     Triples are sorted twice and stored column-wise as uint32 arrays: SPO (s, p, o columns) and OPS (o, p, s columns).
+LOOKUPS: A pattern with a bound subject is a binary search in SPO, one with a bound object (and free subject) in OPS; a
+     predicate-only pattern is one vectorized scan of the SPO predicate column. Term -> id is a binary search over the block
+     heads plus a scan of one block; id -> term decodes at most BLOCK_SIZE entries.
+FILE FORMAT: b"PKGSNAP1", uint64 header length, JSON header (counts, block size, section offsets / dtypes / lengths), then
+     8-byte aligned sections; open() memory-maps the file and reads only the header.
+KEY FEATURE: Opening costs one mmap and a JSON parse; resident memory grows with the pages lookups touch, not the graph.
+NOTE: Written by convert_to_ttl.py --format snapshot, which streams the triples from the store; building keeps the terms and
+      the id triples in memory (the reader never does).
+OUTPUT: owl/pkg2020_final.pkgsnap
+USAGE: python rdf_snapshot.py --match pkg:Author_1 "*" "*"   |   --match "*" rdf:type pkg:NIHProject --limit 10   |   --info
+"""
+from stage_store import OWL_DIR
+from convert_to_ttl import iter_triples, ntriples_terms, DEFAULT_BATCH, PREFIXES
+import numpy as np
+import pandas as pd
+import argparse
+import json
+import mmap
+import os
+import time
+
+MAGIC = b"PKGSNAP1"
+BLOCK_SIZE = 16
+SNAPSHOT_FILE = "pkg2020_final.pkgsnap"
+SPO = ("spo_s", "spo_p", "spo_o")
+OPS = ("ops_o", "ops_p", "ops_s")
+
+
+def _varint(n):
+    out = bytearray()
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def _read_varint(buf, pos):
+    n = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        n |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return n, pos
+        shift += 7
+
+
+def front_code(terms, block_size=BLOCK_SIZE):
+    """(blob, block offsets) of sorted byte strings, front-coded in blocks"""
+    blob = bytearray()
+    offsets = np.zeros((len(terms) + block_size - 1) // block_size + 1, dtype=np.uint64)
+    previous = b""
+    for i, term in enumerate(terms):
+        if i % block_size == 0:
+            offsets[i // block_size] = len(blob)
+            blob += _varint(len(term)) + term
+        else:
+            shared = 0
+            limit = min(len(previous), len(term))
+            while shared < limit and previous[shared] == term[shared]:
+                shared += 1
+            blob += _varint(shared) + _varint(len(term) - shared) + term[shared:]
+        previous = term
+    offsets[-1] = len(blob)
+    return bytes(blob), offsets
+
+
+def encode_graph(db, c, batch_size=DEFAULT_BATCH):
+    """(sorted term bytes, (n, 3) uint32 id triples) of graph c; ids are ranks in the sorted dictionary"""
+    ids = {}
+    chunks = []
+    for rows in iter_triples(db, c, batch_size):
+        terms = [term for row in rows for term in ntriples_terms(*row)]
+        codes, uniques = pd.factorize(pd.Series(terms, dtype=object))
+        provisional = np.fromiter((ids.setdefault(term.encode("utf-8"), len(ids)) for term in uniques), dtype=np.uint32,
+                                  count=len(uniques))
+        chunks.append(provisional[codes].reshape(-1, 3))
+    terms = np.array(list(ids), dtype=object)
+    order = np.argsort(terms, kind="stable")
+    rank = np.empty(len(order), dtype=np.uint32)
+    rank[order] = np.arange(len(order), dtype=np.uint32)
+    triples = rank[np.concatenate(chunks)] if chunks else np.zeros((0, 3), dtype=np.uint32)
+    return terms[order].tolist(), triples
+
+
+def sorted_unique(triples, columns):
+    """Rows of triples ordered by the given column order, duplicates dropped, as contiguous column arrays"""
+    ordered = triples[np.lexsort(tuple(triples[:, k] for k in reversed(columns)))] if len(triples) else triples
+    if len(ordered):
+        keep = np.ones(len(ordered), dtype=bool)
+        keep[1:] = (ordered[1:] != ordered[:-1]).any(axis=1)
+        ordered = ordered[keep]
+    return [np.ascontiguousarray(ordered[:, k]) for k in columns]
+
+
+def write_snapshot(db, c, path, batch_size=DEFAULT_BATCH):
+    """Write graph c of the quadstore behind db as a snapshot file; returns its number of triples"""
+    terms, triples = encode_graph(db, c, batch_size)
+    blob, offsets = front_code(terms)
+    sections = [("dict_offsets", offsets), ("dict_blob", np.frombuffer(blob, dtype=np.uint8))]
+    sections += list(zip(SPO, sorted_unique(triples, [0, 1, 2])))
+    sections += list(zip(OPS, sorted_unique(triples, [2, 1, 0])))
+
+    header = {"terms": len(terms), "triples": len(sections[2][1]), "block_size": BLOCK_SIZE, "sections": {}}
+    # Offsets depend on the header's length, which depends on the offsets: size it with placeholders first
+    for _ in range(2):
+        encoded = json.dumps(header).encode("utf-8")
+        position = _align(len(MAGIC) + 8 + len(encoded))
+        for name, array in sections:
+            header["sections"][name] = {"offset": position, "dtype": array.dtype.str, "length": len(array)}
+            position = _align(position + array.nbytes)
+    encoded = json.dumps(header).encode("utf-8")
+    with open(path + ".tmp", "wb") as f:
+        f.write(MAGIC + np.uint64(len(encoded)).tobytes() + encoded)
+        for name, array in sections:
+            f.write(b"\0" * (header["sections"][name]["offset"] - f.tell()))
+            f.write(array.tobytes())
+    os.replace(path + ".tmp", path)
+    return header["triples"]
+
+
+def _align(position):
+    return (position + 7) // 8 * 8
+
+
+def as_term(value):
+    """N-Triples term for a term, a prefixed name of convert_to_ttl.PREFIXES (pkg:Author_1, rdf:type) or a bare IRI"""
+    if value.startswith(("<", '"', "_:")):
+        return value
+    prefix, _, local = value.partition(":")
+    if prefix in PREFIXES and not local.startswith("//"):
+        return f"<{PREFIXES[prefix]}{local}>"
+    return f"<{value}>"
+
+
+class Snapshot:
+    """Read-only, memory-mapped snapshot; terms are N-Triples strings, ids uint32"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a PKG2020 snapshot")
+            header_length = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+            self.header = json.loads(f.read(header_length))
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.block_size = self.header["block_size"]
+        self.sections = {name: np.frombuffer(self._mmap, dtype=np.dtype(entry["dtype"]), count=entry["length"], offset=entry["offset"])
+                         for name, entry in self.header["sections"].items()}
+        self._offsets = self.sections["dict_offsets"]
+        self._blob = memoryview(self._mmap)[self.header["sections"]["dict_blob"]["offset"]:][:len(self.sections["dict_blob"])]
+
+    @classmethod
+    def open(cls, path=os.path.join(OWL_DIR, SNAPSHOT_FILE)):
+        return cls(path)
+
+    def close(self):
+        self.sections = self._offsets = None
+        self._blob.release()
+        self._mmap.close()
+
+    def __len__(self):
+        return self.header["triples"]
+
+    @property
+    def nb_terms(self):
+        return self.header["terms"]
+
+    # Dictionary
+
+    def _block(self, k):
+        """The terms of block k, as bytes"""
+        pos, end = int(self._offsets[k]), int(self._offsets[k + 1])
+        length, pos = _read_varint(self._blob, pos)
+        terms = [bytes(self._blob[pos:pos + length])]
+        pos += length
+        while pos < end:
+            shared, pos = _read_varint(self._blob, pos)
+            length, pos = _read_varint(self._blob, pos)
+            terms.append(terms[-1][:shared] + bytes(self._blob[pos:pos + length]))
+            pos += length
+        return terms
+
+    def _head(self, k):
+        length, pos = _read_varint(self._blob, int(self._offsets[k]))
+        return bytes(self._blob[pos:pos + length])
+
+    def term(self, term_id):
+        """N-Triples term of an id"""
+        block, index = divmod(int(term_id), self.block_size)
+        return self._block(block)[index].decode("utf-8")
+
+    def decode(self, ids):
+        """Terms of an id array (object array of str, same shape); each block is decoded once"""
+        ids = np.asarray(ids)
+        uniques, inverse = np.unique(ids, return_inverse=True)
+        terms, cache = [], {}
+        for term_id in uniques.tolist():
+            block, index = divmod(term_id, self.block_size)
+            if block not in cache:
+                cache = {block: self._block(block)}
+            terms.append(cache[block][index].decode("utf-8"))
+        return np.array(terms, dtype=object)[inverse].reshape(ids.shape)
+
+    def lookup(self, term):
+        """Id of a term (an N-Triples term or a bare IRI), or None"""
+        if len(self._offsets) < 2:
+            return None
+        key = as_term(term).encode("utf-8")
+        lo, hi = 0, len(self._offsets) - 2
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self._head(mid) <= key:
+                lo = mid
+            else:
+                hi = mid - 1
+        for index, candidate in enumerate(self._block(lo)):
+            if candidate == key:
+                return lo * self.block_size + index
+        return None
+
+    # Triple patterns
+
+    def _narrow(self, column, lo, hi, value):
+        sub = self.sections[column][lo:hi]
+        return lo + int(np.searchsorted(sub, value, "left")), lo + int(np.searchsorted(sub, value, "right"))
+
+    def match_ids(self, s=None, p=None, o=None):
+        """(k, 3) uint32 (s, p, o) ids of the triples matching a pattern of ids (None: wildcard)"""
+        if s is not None:
+            lo, hi = self._narrow("spo_s", 0, len(self), s)
+            if p is not None:
+                lo, hi = self._narrow("spo_p", lo, hi, p)
+                if o is not None:
+                    lo, hi = self._narrow("spo_o", lo, hi, o)
+            rows = np.column_stack([self.sections[name][lo:hi] for name in SPO])
+            return rows[rows[:, 2] == o] if o is not None and p is None else rows
+        if o is not None:
+            lo, hi = self._narrow("ops_o", 0, len(self), o)
+            if p is not None:
+                lo, hi = self._narrow("ops_p", lo, hi, p)
+            return np.column_stack([self.sections[name][lo:hi] for name in ("ops_s", "ops_p", "ops_o")])
+        if p is not None:
+            hits = np.flatnonzero(self.sections["spo_p"] == p)
+            return np.column_stack([self.sections[name][hits] for name in SPO])
+        return np.column_stack([self.sections[name] for name in SPO])
+
+    def _ids(self, s, p, o):
+        """Ids of a pattern of terms; None when a bound term is not in the graph"""
+        ids = []
+        for value in (s, p, o):
+            if value is None:
+                ids.append(None)
+                continue
+            term_id = self.lookup(value)
+            if term_id is None:
+                return None
+            ids.append(term_id)
+        return ids
+
+    def count(self, s=None, p=None, o=None):
+        ids = self._ids(s, p, o)
+        return 0 if ids is None else len(self.match_ids(*ids))
+
+    def triples(self, s=None, p=None, o=None, limit=None):
+        """(s, p, o) N-Triples terms of the triples matching a pattern of terms or bare IRIs (None: wildcard)"""
+        ids = self._ids(s, p, o)
+        if ids is None:
+            return []
+        rows = self.match_ids(*ids)[:limit]
+        return [tuple(row) for row in self.decode(rows).tolist()] if len(rows) else []
+
+    def iter_triples(self, batch_size=DEFAULT_BATCH):
+        """Every triple as (s, p, o) N-Triples terms, batch_size at a time, in SPO order - the terms' UTF-8 byte order,
+        since ids follow it"""
+        for start in range(0, len(self), batch_size):
+            rows = np.column_stack([self.sections[name][start:start + batch_size] for name in SPO])
+            yield [tuple(row) for row in self.decode(rows).tolist()]
+
+    def objects(self, s, p):
+        return [o for _, _, o in self.triples(s, p, None)]
+
+    def subjects(self, p, o):
+        return [s for s, _, _ in self.triples(None, p, o)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query a PKG2020 snapshot (write one with convert_to_ttl.py --format snapshot)")
+    parser.add_argument("--snapshot", default=SNAPSHOT_FILE, help="snapshot file in owl/")
+    parser.add_argument("--match", nargs=3, metavar=("S", "P", "O"), help="triple pattern; * is a wildcard, bare IRIs are accepted")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--info", action="store_true", help="print sizes and the open time")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    snapshot = Snapshot.open(os.path.join(OWL_DIR, args.snapshot))
+    opened = time.perf_counter() - start
+    if args.info or not args.match:
+        size_mb = os.path.getsize(snapshot.path) / 2**20
+        print(f"{args.snapshot}: {len(snapshot):,} triples, {snapshot.nb_terms:,} terms, {size_mb:.1f} MB, opened in {opened * 1000:.2f} ms")
+    if args.match:
+        pattern = [None if value == "*" else value for value in args.match]
+        start = time.perf_counter()
+        count = snapshot.count(*pattern)
+        rows = snapshot.triples(*pattern, limit=args.limit)
+        for row in rows:
+            print("%s %s %s ." % row)
+        print(f"{count:,} matching triples ({(time.perf_counter() - start) * 1000:.2f} ms)")
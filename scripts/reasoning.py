@@ -5,20 +5,26 @@ HOW: Uses OWLReady2's sync_reasoner() with infer_property_values=True to compute
 KEY CHECKS: Validates functional properties (hasPMID), cardinality constraints (min 1 author), detects inconsistencies if axioms conflict.
 INFERENCES: Authors with careerStartYear → ActiveAuthor; Authors with 5+ articles → ProlificAuthor; Articles with 1 author → SingleAuthorArticle.
 OUTPUT: Reports classification counts and validates ontology consistency - critical for demonstrating OWL reasoning capabilities.
+PROFILE: --profile (or PKG2020_PROFILE) writes a run report to owl/profiles/ (load / reason / validate phases, see stage_profile.py).
 """
 from owlready2 import *
-import sys
+from stage_profile import add_profile_argument, profile_stage
+import argparse
 
-def run_reasoning(ontology_file):
+def run_reasoning(ontology_file, profile_mode=None):
     """Run reasoning on the ontology and report results"""
-    
+    with profile_stage("reasoning", profile_mode) as profile:
+        return _run_reasoning(ontology_file, profile)
+
+def _run_reasoning(ontology_file, profile):
     print("="*60)
     print("PKG2020 ONTOLOGY REASONING & CONSISTENCY CHECKING")
     print("="*60)
     
     # Load ontology
     print(f"\n📂 Loading ontology: {ontology_file}")
-    onto = get_ontology(ontology_file).load()
+    with profile.phase("load"):
+        onto = get_ontology(ontology_file).load()
     
     # Count before reasoning
     print("\n📊 BEFORE REASONING:")
@@ -32,23 +38,24 @@ def run_reasoning(ontology_file):
     print("\n🧠 RUNNING REASONER (HermiT)...")
     print("-"*40)
     
-    try:
-        with onto:
-            sync_reasoner(infer_property_values=True)
-        print("  ✅ Reasoning completed successfully")
-        print("  ✅ Ontology is CONSISTENT")
-    except OwlReadyInconsistentOntologyError as e:
-        print(f"  ❌ INCONSISTENT ONTOLOGY: {e}")
-        return False
-    except Exception as e:
-        print(f"  ⚠️ Reasoner error: {e}")
-        print("  Trying alternative reasoner...")
+    with profile.phase("reason"):
         try:
             with onto:
-                sync_reasoner_hermit(infer_property_values=True)
-            print("  ✅ HermiT reasoning completed")
-        except Exception as e2:
-            print(f"  ⚠️ HermiT also failed: {e2}")
+                sync_reasoner(infer_property_values=True)
+            print("  ✅ Reasoning completed successfully")
+            print("  ✅ Ontology is CONSISTENT")
+        except OwlReadyInconsistentOntologyError as e:
+            print(f"  ❌ INCONSISTENT ONTOLOGY: {e}")
+            return False
+        except Exception as e:
+            print(f"  ⚠️ Reasoner error: {e}")
+            print("  Trying alternative reasoner...")
+            try:
+                with onto:
+                    sync_reasoner_hermit(infer_property_values=True)
+                print("  ✅ HermiT reasoning completed")
+            except Exception as e2:
+                print(f"  ⚠️ HermiT also failed: {e2}")
     
     # Count after reasoning (check inferred classifications)
     print("\n📊 AFTER REASONING (Inferred Classifications):")
@@ -67,6 +74,17 @@ def run_reasoning(ontology_file):
             print(f"  {class_name}: {len(instances)} classified instances")
     
     # Check consistency of key axioms
+    with profile.phase("validate"):
+        validate_axioms(onto)
+    
+    print("\n" + "="*60)
+    print("REASONING COMPLETE")
+    print("="*60)
+    
+    return True
+
+def validate_axioms(onto):
+    """Functional property and cardinality checks on Articles"""
     print("\n🔍 AXIOM VALIDATION:")
     print("-"*40)
     
@@ -87,13 +105,9 @@ def run_reasoning(ontology_file):
         print(f"  ⚠️ {len(articles_without_author)} articles without authors")
     else:
         print("  ✅ All articles have at least 1 author (min cardinality validated)")
-    
-    print("\n" + "="*60)
-    print("REASONING COMPLETE")
-    print("="*60)
-    
-    return True
 
 if __name__ == "__main__":
-    ontology_file = sys.argv[1] if len(sys.argv) > 1 else "../owl/pkg2020_final.owl"
-    run_reasoning(ontology_file)
+    parser = argparse.ArgumentParser(description="Run the OWL reasoner and check consistency of the populated ontology")
+    parser.add_argument("ontology_file", nargs="?", default="../owl/pkg2020_final.owl")
+    args = add_profile_argument(parser).parse_args()
+    run_reasoning(args.ontology_file, args.profile)
@@ -0,0 +1,223 @@
+"""
+PKG2020 Pipeline Orchestrator - One Command for the Whole Population Pipeline
+PURPOSE: Replaces running the eight populate scripts by hand; builds the A-Box into one persistent SQLite store and exports pkg2020_final.owl.
+HOW: Stages form a dependency DAG. The author/article layer is loaded once; stages that only depend on it (affiliations, employment,
+     education, bio-entities, NIH projects) run concurrently in worker processes, each on its own staging copy of the store.
+KEY FEATURE: Staging stores are merged back in a fixed order (IRIs are deterministic, so shared Organizations collapse to one resource).
+BUILD CACHE: Every stage is fingerprinted (input CSVs, upstream stages, script source, settings); a stage whose fingerprint is
+     unchanged is restored from owl/cache/ instead of populated, and an unchanged build is skipped outright (build_cache.py).
+INCREMENTAL: --incremental applies a new data drop to the existing store; stages then run in-process one after another,
+     since a changed row may delete triples and staging merges only carry additions.
+CHECKPOINTS: --checkpoint-every N commits each stage's progress every N rows; after a crash, --resume skips the finished stages
+     and continues the interrupted one from its last checkpoint (checkpoints.py). Stages then run in-process, one after another;
+     a stage restored from the build cache is checkpointed as finished.
+REPORT: Prints per-stage wall time plus the overall speedup versus running the stages one after another; --profile also writes
+     one run report per stage to owl/profiles/, from the worker process that ran it (stage_profile.py).
+NOTE: Parallel waves need Python 3.11+ (one fresh worker per stage: ProcessPoolExecutor(max_tasks_per_child=1)); on older
+      versions pass --jobs 1.
+USAGE: python run_pipeline.py [--store ../owl/pkg2020.sqlite3] [--jobs 4] [--incremental] [--canonical-bioentities] [--no-cache]
+       [--checkpoint-every 500000] [--resume]
+"""
+from owlready2 import *
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from stage_store import OWL_DIR, ONTOLOGY_IRI, stage_argparser, open_stage, save_stage, snapshot_store, merge_store
+from stage_profile import profile_stage
+from build_cache import BuildCache, stage_watermark
+from delta_ingest import DeltaTracker
+from checkpoints import stage_checkpoints
+import importlib
+import multiprocessing
+import os
+import sys
+import time
+
+# stage name -> (module, upstream stages, populate() keyword arguments)
+STAGES = {
+    "authors": ("populate_authors_articles", [], {"bulk": True}),
+    "affiliations": ("populate_affiliations", ["authors"], {}),
+    "employment": ("populate_employment", ["authors"], {}),
+    "education": ("populate_education", ["authors"], {}),
+    "bioentities": ("populate_bioentities", ["authors"], {}),
+    "nih_projects": ("populate_nih_projects", ["authors"], {}),
+}
+
+SEED_OWL = "pkg2020_constrained.owl"
+FINAL_OWL = "pkg2020_final.owl"
+
+
+def stage_waves(stages):
+    """Group stages into waves; every stage in a wave only depends on earlier waves"""
+    done, waves = set(), []
+    while len(done) < len(stages):
+        wave = [name for name, (_, deps, _) in stages.items() if name not in done and set(deps) <= done]
+        if not wave:
+            raise ValueError(f"Dependency cycle among stages: {sorted(set(stages) - done)}")
+        waves.append(wave)
+        done.update(wave)
+    return waves
+
+
+def populate_stage(onto, stage, chunk_size=None, nrows=None, manifest=False, options=None, args=None):
+    """Load a stage's CSV data and populate onto with it, recording row digests for later incremental runs
+
+    options holds extra populate() keyword arguments per stage, from the command line; with args, the stage is checkpointed
+    (--checkpoint-every) or resumed (--resume) as they ask.
+    """
+    module_name, _, kwargs = STAGES[stage]
+    kwargs = {**kwargs, **(options or {}).get(stage, {})}
+    module = importlib.import_module(module_name)
+    checkpoints = stage_checkpoints(onto, stage, module.INPUT_CSV, args) if args else None
+    if checkpoints and checkpoints.complete():
+        print(f"Skipping {stage}: completed before the interruption")
+        return
+    data = checkpoints.load(module.load_data, chunk_size, nrows) if checkpoints else module.load_data(chunk_size, nrows)
+    # Only an incremental run over whole tables (not resumed) can tell that a row was deleted from the drop
+    delta = DeltaTracker(onto, stage, complete=manifest and nrows == 0 and not getattr(args, "resume", False))
+    module.populate(onto, *(data if isinstance(data, tuple) else (data,)), delta=delta, **kwargs)
+    if manifest:
+        delta.write_manifest()
+    if checkpoints:
+        checkpoints.finish()
+
+
+def run_staged(stage, staging_path, chunk_size=None, nrows=None, options=None, profile_mode=None, fingerprint=None):
+    """Worker process: populate a staging copy of the store and commit it (and save it to the build cache under fingerprint)"""
+    start = time.time()
+    with profile_stage(stage, profile_mode) as profile:
+        with profile.phase("load"):
+            default_world.set_backend(filename=staging_path)
+            onto = default_world.get_ontology(ONTOLOGY_IRI).load()
+        since = stage_watermark(default_world)
+        with profile.phase("populate"):
+            populate_stage(onto, stage, chunk_size, nrows, options=options)
+        with profile.phase("save"):
+            default_world.save()
+    if fingerprint:
+        BuildCache().save(onto, stage, fingerprint, since)
+    return time.time() - start
+
+
+def stage_options(args):
+    """Per-stage populate() keyword arguments selected on the command line"""
+    return {"bioentities": {"canonical": args.canonical_bioentities}}
+
+
+def stage_fingerprints(cache, args, options):
+    """Build-cache fingerprint of every stage, upstream stages first"""
+    fingerprints = {}
+    for wave in stage_waves(STAGES):
+        for stage in wave:
+            module_name, deps, kwargs = STAGES[stage]
+            upstream = [fingerprints[dep] for dep in deps] or [cache.file_digest(os.path.join(OWL_DIR, SEED_OWL))]
+            settings = {"nrows": args.nrows, "populate": {**kwargs, **options.get(stage, {})}}
+            fingerprints[stage] = cache.fingerprint(stage, importlib.import_module(module_name), upstream, settings)
+    return fingerprints
+
+
+def run_pipeline(args):
+    options = stage_options(args)
+    timings = {}
+    start = time.time()
+    # The cache only covers full rebuilds: an incremental or resumed run changes the store in place
+    cache = None if args.no_cache or args.incremental or args.resume else BuildCache()
+    checkpointing = bool(args.checkpoint_every or args.resume)
+    fingerprints = {}
+    if cache:
+        fingerprints = stage_fingerprints(cache, args, options)
+        cache.write_index()
+        if cache.up_to_date(fingerprints, os.path.join(OWL_DIR, FINAL_OWL), args.store):
+            print(f"Build cache: no stage changed and {FINAL_OWL} is current ({time.time() - start:.1f}s)")
+            return timings
+
+    onto = open_stage(SEED_OWL, args, seed=True)
+    staging_dir = os.path.join(OWL_DIR, "staging")
+
+    for wave in stage_waves(STAGES):
+        if cache:
+            for stage in [stage for stage in wave if cache.hit(stage, fingerprints[stage])]:
+                stage_start = time.time()
+                nb_triples = cache.restore(onto, stage)
+                if checkpointing:
+                    # Restored is finished: a later --resume must skip the stage, not populate it again on top of its triples
+                    stage_checkpoints(onto, stage, importlib.import_module(STAGES[stage][0]).INPUT_CSV, args).finish()
+                timings[f"cached:{stage}"] = time.time() - stage_start
+                print(f"Restored {stage} from the build cache: {nb_triples} triples")
+                wave = [other for other in wave if other != stage]
+            onto.world.save()
+
+        # A single stage runs in-process directly on the main store
+        if len(wave) == 1 or args.jobs == 1 or args.incremental or checkpointing:
+            for stage in wave:
+                stage_start = time.time()
+                since = stage_watermark(onto.world) if cache else None
+                with profile_stage(stage, args.profile) as profile:
+                    with profile.phase("populate"):
+                        populate_stage(onto, stage, args.chunk_size, args.nrows, manifest=args.incremental, options=options,
+                                       args=args if checkpointing else None)
+                    with profile.phase("save"):
+                        onto.world.save()
+                if cache:
+                    cache.save(onto, stage, fingerprints[stage], since)
+                timings[stage] = time.time() - stage_start
+            continue
+
+        os.makedirs(staging_dir, exist_ok=True)
+        staging = {stage: os.path.join(staging_dir, f"{stage}.sqlite3") for stage in wave}
+        watermark = None
+        for stage in wave:
+            watermark = snapshot_store(onto, staging[stage])
+
+        context = multiprocessing.get_context("spawn")
+        # One fresh process per stage: an owlready2 World cannot switch to another backend file
+        with ProcessPoolExecutor(max_workers=args.jobs, mp_context=context, max_tasks_per_child=1) as pool:
+            futures = {pool.submit(run_staged, stage, staging[stage], args.chunk_size, args.nrows, options, args.profile,
+                                   fingerprints.get(stage)): stage for stage in wave}
+            for future in as_completed(futures):
+                timings[futures[future]] = future.result()
+
+        # Merge in declaration order so the store layout is reproducible
+        for stage in wave:
+            merge_start = time.time()
+            nb_triples = merge_store(onto, staging[stage], watermark)
+            timings[f"merge:{stage}"] = time.time() - merge_start
+            print(f"Merged {stage}: {nb_triples} triples")
+            if not args.keep_staging:
+                os.remove(staging[stage])
+
+    export_start = time.time()
+    save_stage(onto, FINAL_OWL, args, final=True)
+    timings["export"] = time.time() - export_start
+    if cache:
+        cache.record_build(fingerprints, os.path.join(OWL_DIR, FINAL_OWL), args.store)
+
+    wall = time.time() - start
+    print("\n" + "=" * 50)
+    print("PIPELINE TIMINGS")
+    print("=" * 50)
+    for stage, seconds in timings.items():
+        print(f"  {stage:<24} {seconds:8.1f}s")
+    print("-" * 50)
+    # Merges only exist because of the parallel layout: the sequential baseline is the populated stages alone
+    populated = sum(seconds for stage, seconds in timings.items() if stage in STAGES)
+    merges = sum(seconds for stage, seconds in timings.items() if stage.startswith("merge:"))
+    print(f"  {'wall clock':<24} {wall:8.1f}s")
+    print(f"  {'sum of stages':<24} {populated:8.1f}s")
+    print(f"  {'merge overhead':<24} {merges:8.1f}s")
+    if wall > 0:
+        print(f"  {'speedup':<24} {populated / wall:8.2f}x")
+    return timings
+
+
+if __name__ == "__main__":
+    parser = stage_argparser("Build the populated PKG2020 ontology with parallel independent stages")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="worker processes for independent stages")
+    parser.add_argument("--keep-staging", action="store_true", help="keep owl/staging/*.sqlite3 after merging")
+    parser.add_argument("--no-cache", action="store_true", help="populate every stage, ignoring (and not updating) owl/cache/")
+    parser.add_argument("--canonical-bioentities", action="store_true",
+                        help="one BioEntity per (Type, EntityID) with a mention side table (populate_bioentities.py --canonical)")
+    args = parser.parse_args()
+    in_process = args.jobs == 1 or args.incremental or args.checkpoint_every or args.resume
+    if sys.version_info < (3, 11) and not in_process:
+        parser.error("parallel stages need Python 3.11+ (ProcessPoolExecutor max_tasks_per_child); pass --jobs 1")
+    args.store = args.store or os.path.join(OWL_DIR, "pkg2020.sqlite3")
+    run_pipeline(args)
@@ -0,0 +1,374 @@
+"""
+PKG2020 Subgraph Sampler - Stratified, Closed Sample of the Final Graph for Size-Limited Endpoint Uploads
+PURPOSE: Produces pkg2020_sample.ttl for sandboxes / preview environments with upload limits: a graph small enough to load in
+         seconds that still answers the 15 competency queries (sparql_queries.py), instead of a hand-cut prefix of the export.
+HOW: Three passes over the store. The scan reads the graph convert_to_ttl.py exports (the quadstore, --batch-size rows at a
+     time) into integer columns only - triples per subject, rdf:type rows and the object edges between individuals - which
+     stay in memory for the whole run. Articles and Authors are then grouped into strata by class, edge profile (the
+     (property, target class) pairs they have, e.g. mentionsBioEntity -> Gene, each with its edge count in log2 buckets) and
+     degree (log2 buckets), and drawn - first one seed per stratum (the smallest closure of a few random members, cheapest
+     strata first), then all remaining seeds shuffled, i.e. proportionally - until the triple budget is used. The witness
+     pass (below) runs the competency queries, and the export reads the selected subjects' triples a second time.
+CLOSURE: A seed brings in everything reachable over EXPAND_PROPERTIES (writtenBy, hasAuthorship, hasAffiliation, hasEmployment,
+     hasEducation, hasProject, mentionsBioEntity - and the record -> organization / institution links after them), an Author
+     seed its articles first (writtenBy backwards, so co-authorship and article counts survive); other object edges
+     of a selected individual (refersToAuthor, isPrincipalInvestigator, ...) add their target without following it. A seed
+     whose closure no longer fits the budget is skipped. The T-Box (every subject that is not a named individual, blank nodes
+     included, and the individuals it names, e.g. the PublicationStatus enumeration) is always kept, so the sample has no
+     dangling references.
+WITNESSES: Before any stratum is drawn, every competency query is run on the source (owlready2's SPARQL engine over the same
+     store, the World opened on it without loading it) and one of its answers is closed into the sample: of the first
+     WITNESS_CANDIDATES answer rows (the rest are counted, not kept), the query's graph pattern is re-run as SELECT * with
+     the row's grouping variables bound, and the individuals of the cheapest row to close are the witness (e.g. two authors
+     and the articles they share, for CQ3's repeated co-authorship). Strata seeds fill the rest of the budget.
+KEY FEATURE: A selected subject keeps all of its triples; the sample is written by convert_to_ttl.export_graph() restricted
+     to the selected subjects, so it is byte-for-byte what the full export says about them.
+CHECK: --check loads the sample with rdflib and runs every competency query, reporting the rows each one returns; it exits
+     with status 1 when a query that has answers on the source has none on the sample.
+OUTPUT: owl/pkg2020_sample.ttl (--format ntriples: .nt, --compress gzip|zstd)
+USAGE: python sample_graph.py [--store ../owl/pkg2020.sqlite3] [--max-triples 100000] [--seed 0] [--check]
+"""
+from owlready2 import rdf_type, owl_named_individual
+from convert_to_ttl import (open_source, export_graph, EXTENSIONS, COMPRESSED, DEFAULT_BATCH, INPUT_OWL, OWL_DIR,
+                            ZSTD)
+from stage_store import ONTOLOGY_IRI
+import argparse
+import collections
+import itertools
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import numpy as np
+
+OUTPUT_NAME = "pkg2020_sample"
+DEFAULT_MAX_TRIPLES = 100000
+SEED_CLASSES = ["Article", "Author"]
+EXPAND_PROPERTIES = ["writtenBy", "hasAuthorship", "hasAffiliation", "hasEmployment", "hasEducation", "hasProject",
+                     "mentionsBioEntity", "affiliatedWith", "employedAt", "educatedAt"]
+# Followed backwards from a seed only: an Author seed brings its articles (and, through them, its co-authors)
+SEED_INVERSE_PROPERTIES = ["writtenBy"]
+# Members of a stratum whose closures are costed to pick its coverage-round seed
+COVERAGE_CANDIDATES = 8
+# Answer rows per competency query whose graph patterns are costed to pick its witness, and pattern rows per witness
+WITNESS_CANDIDATES = 8
+WITNESS_ROWS = 20
+# Consecutive seeds that did not fit before the sampler gives up on filling the budget
+MAX_MISSES = 1000
+
+# Subject, predicate and object storid of every triple; 0 stands for the literal of a data triple
+SCAN_QUERY = "SELECT s, p, o FROM objs WHERE c = ? UNION ALL SELECT s, p, 0 FROM datas WHERE c = ?"
+
+
+def scan_graph(db, c, batch_size=DEFAULT_BATCH):
+    """The scan: (subjects, triples per subject, s/p/o arrays of the object triples with a non-blank object)"""
+    subjects, edges = [], []
+    cursor = db.execute(SCAN_QUERY, (c, c))
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        batch = np.array(rows, dtype=np.int64)
+        subjects.append(batch[:, 0])
+        edges.append(batch[batch[:, 2] > 0])
+    subjects, counts = np.unique(np.concatenate(subjects) if subjects else np.empty(0, np.int64), return_counts=True)
+    edges = np.concatenate(edges) if edges else np.empty((0, 3), np.int64)
+    return subjects, counts, edges[:, 0], edges[:, 1], edges[:, 2]
+
+
+def storid_map(db, names):
+    """{local name: storid} of the pkg: IRIs of names present in the store"""
+    iris = {ONTOLOGY_IRI + name: name for name in names}
+    rows = db.execute(f"SELECT iri, storid FROM resources WHERE iri IN ({','.join('?' * len(iris))})", list(iris))
+    return {iris[iri]: storid for iri, storid in rows}
+
+
+class SubgraphSampler:
+    """Strata and closures over the integer columns of scan_graph()"""
+
+    def __init__(self, db, c, batch_size=DEFAULT_BATCH):
+        subjects, counts, s, p, o = scan_graph(db, c, batch_size)
+        self.triples = dict(zip(subjects.tolist(), counts.tolist()))
+
+        is_type = p == rdf_type
+        named = is_type & (o == owl_named_individual)
+        individuals = np.unique(s[named])
+        # Individuals the T-Box refers to (owl:oneOf members, ...) belong to it
+        schema_refs = np.unique(o[~is_type & ~np.isin(s, individuals) & np.isin(o, individuals)])
+        schema = ~np.isin(subjects, individuals) | np.isin(subjects, schema_refs)
+        self.schema = subjects[schema]
+        self.schema_triples = int(counts[schema].sum())
+        individuals = np.setdiff1d(individuals, schema_refs)
+
+        # One class per individual (its first asserted class) and the class names
+        typed = is_type & ~named & np.isin(s, individuals)
+        self.classes = dict(zip(s[typed][::-1].tolist(), o[typed][::-1].tolist()))
+        self.class_names = {storid: iri.rsplit("#", 1)[-1] for storid, iri in db.execute(
+            f"SELECT storid, iri FROM resources WHERE storid IN ({','.join(map(str, set(self.classes.values()))) or '0'})")}
+
+        # Object edges between individuals, grouped by subject; expand marks EXPAND_PROPERTIES
+        keep = ~is_type & np.isin(s, individuals) & np.isin(o, individuals)
+        order = np.argsort(s[keep], kind="stable")
+        self.s, self.p, self.o = s[keep][order], p[keep][order], o[keep][order]
+        self.expand = np.isin(self.p, list(storid_map(db, EXPAND_PROPERTIES).values()))
+        self.property_names = {storid: iri.rsplit("#", 1)[-1] for storid, iri in db.execute(
+            f"SELECT storid, iri FROM resources WHERE storid IN ({','.join(map(str, np.unique(self.p).tolist())) or '0'})")}
+
+        # The SEED_INVERSE_PROPERTIES edges grouped by object
+        inverse = np.isin(self.p, list(storid_map(db, SEED_INVERSE_PROPERTIES).values()))
+        order = np.argsort(self.o[inverse], kind="stable")
+        self.inverse_o, self.inverse_s = self.o[inverse][order], self.s[inverse][order]
+
+        seed_classes = set(storid_map(db, SEED_CLASSES).values())
+        self.seeds = [storid for storid, cls in self.classes.items() if cls in seed_classes]
+
+    def out_edges(self, node):
+        """(predicates, objects, expand flags) of node"""
+        lo, hi = np.searchsorted(self.s, node), np.searchsorted(self.s, node, side="right")
+        return self.p[lo:hi], self.o[lo:hi], self.expand[lo:hi]
+
+    def in_edges(self, node):
+        """Subjects of the SEED_INVERSE_PROPERTIES edges pointing at node"""
+        return self.inverse_s[np.searchsorted(self.inverse_o, node):np.searchsorted(self.inverse_o, node, side="right")]
+
+    def strata(self):
+        """{(class, edge profile, degree bucket): seeds}"""
+        in_nodes, in_degree = np.unique(self.o[self.expand], return_counts=True)
+        in_degree = dict(zip(in_nodes.tolist(), in_degree.tolist()))
+        strata = collections.defaultdict(list)
+        for seed in self.seeds:
+            p, o, expand = self.out_edges(seed)
+            profile = collections.Counter((self.property_names[prop], self.class_names.get(self.classes.get(target), ""))
+                                          for prop, target in zip(p[expand].tolist(), o[expand].tolist()))
+            profile = tuple(sorted((prop, cls, count.bit_length()) for (prop, cls), count in profile.items()))
+            degree = int(expand.sum()) + in_degree.get(seed, 0)
+            strata[(self.class_names[self.classes[seed]], profile, degree.bit_length())].append(seed)
+        return strata
+
+    def closure(self, seed, selected, expanded):
+        """(individuals the seed adds, nodes it expands, triples they add), given what is already in the sample"""
+        stack = [seed] + [node for node in self.in_edges(seed).tolist() if node not in expanded]
+        added, expanding = set(stack) - selected, set(stack)
+        while stack:
+            p, o, expand = self.out_edges(stack.pop())
+            for target, follow in zip(o.tolist(), expand.tolist()):
+                if target not in selected:
+                    added.add(target)
+                if follow and target not in expanded and target not in expanding:
+                    expanding.add(target)
+                    stack.append(target)
+        return added, expanding, sum(self.triples.get(node, 0) for node in added)
+
+    def closure_of(self, nodes, selected, expanded):
+        """closure() of several nodes taken together"""
+        added, expanding = set(), set()
+        for node in nodes:
+            if node not in expanded and node not in expanding:
+                more, more_expanding, _ = self.closure(node, selected | added, expanded | expanding)
+                added |= more
+                expanding |= more_expanding
+            elif node not in selected:
+                added.add(node)
+        return added, expanding, sum(self.triples.get(node, 0) for node in added)
+
+    def sample(self, max_triples, seed=0, witnesses=None):
+        """(selected individuals, triples, {class: seeds taken}, number of strata, strata covered, names of the witnesses
+        that did not fit); witnesses is {competency query: individuals} (query_witnesses()), closed in first"""
+        rng = np.random.default_rng(seed)
+        strata = self.strata()
+        first, rest = [], []
+        for key in sorted(strata):
+            members = [strata[key][i] for i in rng.permutation(len(strata[key]))]
+            # Coverage round: the cheapest of a few random members, strata in order of that cost
+            costs = [self.closure(member, set(), set())[2] for member in members[:COVERAGE_CANDIDATES]]
+            k = int(np.argmin(costs))
+            first.append((costs[k], key, members.pop(k)))
+            rest.extend((key, member) for member in members)
+        first = [(key, member) for _, key, member in sorted(first)]
+        rest = [rest[i] for i in rng.permutation(len(rest))]
+
+        selected, expanded = set(), set()
+        total, misses = self.schema_triples, 0
+        taken, covered, unfit = collections.Counter(), set(), []
+        for name, nodes in (witnesses or {}).items():
+            added, expanding, cost = self.closure_of(nodes, selected, expanded)
+            if total + cost > max_triples:
+                unfit.append(name)
+                continue
+            selected |= added
+            expanded |= expanding
+            total += cost
+        for key, node in first + rest:
+            if node in expanded:
+                covered.add(key)
+                continue
+            added, expanding, cost = self.closure(node, selected, expanded)
+            if total + cost > max_triples:
+                misses += 1
+                if misses > MAX_MISSES:
+                    break
+                continue
+            selected |= added
+            expanded |= expanding
+            total += cost
+            misses = 0
+            taken[key[0]] += 1
+            covered.add(key)
+        return selected, total, taken, len(strata), len(covered), unfit
+
+
+def pattern_query(query, row):
+    """query's graph pattern as SELECT * with its projected variables bound to row's values - its individuals, or its
+    literals when it has none - so the rows list every individual behind that answer"""
+    select, where = query.index("SELECT"), query.index("WHERE")
+    # Projected variables in order, each top-level (aggregate) expression as a "#" placeholder
+    items, depth = [], 0
+    for token in re.findall(r"\?\w+|[()]", query[select + len("SELECT"):where]):
+        if token == "(":
+            if depth == 0:
+                items.append("#")
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth == 0:
+            items.append(token)
+    values = {item: value for item, value in zip(items, row) if item != "#" and value is not None}
+    bound = {var: value for var, value in values.items() if hasattr(value, "iri")} or values
+    conditions = " && ".join(f"{var} = <{value.iri}>" if hasattr(value, "iri") else f"{var} = {json.dumps(value, ensure_ascii=False)}"
+                             for var, value in bound.items())
+
+    start, depth = query.index("{", where), 0
+    for end in range(start, len(query)):
+        depth += {"{": 1, "}": -1}.get(query[end], 0)
+        if depth == 0:
+            break
+    condition = f"    FILTER ({conditions})\n" if conditions else ""
+    return f"{query[:select]}SELECT * WHERE {{{query[start + 1:end]}{condition}}} LIMIT {WITNESS_ROWS}"
+
+
+def query_witnesses(path, sampler):
+    """{competency query: (answer rows on the source, individuals of its cheapest answer)}, with the queries evaluated by
+    owlready2 on the store at path"""
+    from owlready2 import World
+    from sparql_queries import SPARQL_QUERIES
+    # Never saved: closing rolls back the resource owlready2 registers for its anonymous ontology on opening
+    world = World(filename=path, exclusive=False)
+    individuals = lambda row: [value.storid for value in row if getattr(value, "storid", None) in sampler.classes]
+    witnesses = {}
+    try:
+        for name, query in SPARQL_QUERIES.items():
+            # Only the first few answers are kept (and costed); the others are counted as the cursor goes by. A store built
+            # without some stage has no IRI for their properties: those queries answer nothing instead of failing
+            results = world.sparql(query, error_on_undefined_entities=False)
+            candidates = list(itertools.islice(results, WITNESS_CANDIDATES))
+            nb_rows = len(candidates) + sum(1 for _ in results)
+            best = None
+            for row in candidates:
+                matches = world.sparql(pattern_query(query, row), error_on_undefined_entities=False)
+                nodes = list(dict.fromkeys(node for match in matches for node in individuals(match)))
+                cost = sampler.closure_of(nodes, set(), set())[2]
+                if nodes and (best is None or cost < best[0]):
+                    best = (cost, nodes)
+            witnesses[name] = (nb_rows, best[1] if best else [])
+    finally:
+        world.close()
+    return witnesses
+
+
+def write_sample(db, c, selected, schema, path, format="turtle", compress=None, batch_size=DEFAULT_BATCH):
+    """Export the selected subjects (and the schema subjects) of graph c; returns the writer"""
+    db.execute("CREATE TEMP TABLE IF NOT EXISTS sample_subjects (s INTEGER PRIMARY KEY)")
+    db.execute("DELETE FROM temp.sample_subjects")
+    db.executemany("INSERT INTO temp.sample_subjects VALUES (?)", ((s,) for s in schema.tolist()))
+    db.executemany("INSERT INTO temp.sample_subjects VALUES (?)", ((s,) for s in selected))
+    return export_graph(db, c, path, format, compress, batch_size, "AND t.s IN (SELECT s FROM temp.sample_subjects)")
+
+
+def check_sample(path, format="turtle"):
+    """{query name: result rows} of the competency queries over the sample, loaded with rdflib"""
+    import rdflib
+    from sparql_queries import SPARQL_QUERIES
+    graph = rdflib.Graph()
+    graph.parse(path, format="nt" if format == "ntriples" else "turtle")
+    return {name: len(graph.query(query)) for name, query in SPARQL_QUERIES.items()}
+
+
+def sample_graph(store=None, max_triples=DEFAULT_MAX_TRIPLES, seed=0, format="turtle", compress=None,
+                 batch_size=DEFAULT_BATCH, output=None, check=False):
+    owl_path = os.path.join(OWL_DIR, INPUT_OWL)
+    path = os.path.join(OWL_DIR, (output or OUTPUT_NAME + EXTENSIONS[format]) + COMPRESSED[compress])
+
+    print("=" * 60)
+    print("PKG2020 SUBGRAPH SAMPLER")
+    print("=" * 60)
+
+    source = store or owl_path
+    if not os.path.exists(source):
+        print(f"❌ ERROR: Source not found: {source}")
+        return False
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"\n📥 Opening: {source}")
+        db, db_path, c = open_source(store, owl_path, tmp)
+
+        start = time.time()
+        sampler = SubgraphSampler(db, c, batch_size)
+        print(f"   Scanned {sum(sampler.triples.values()):,} triples in {time.time() - start:.1f}s: "
+              f"{len(sampler.seeds):,} seeds (Articles / Authors), {sampler.schema_triples:,} T-Box triples")
+        if sampler.schema_triples > max_triples:
+            print(f"⚠️  The T-Box alone has more than --max-triples {max_triples:,} triples; only it is written")
+
+        start = time.time()
+        witnesses = query_witnesses(db_path, sampler)
+        print(f"   Competency queries with answers on the source: {sum(1 for rows, _ in witnesses.values() if rows)} "
+              f"of {len(witnesses)} ({time.time() - start:.1f}s)")
+
+        selected, total, taken, nb_strata, nb_covered, unfit = sampler.sample(
+            max_triples, seed, {name: nodes for name, (_, nodes) in witnesses.items() if nodes})
+        print(f"\n🎯 Sample: {len(selected):,} individuals, {total:,} triples (budget {max_triples:,})")
+        print(f"   Strata covered: {nb_covered} of {nb_strata}")
+        for name in unfit:
+            print(f"⚠️  The witness of {name} does not fit the budget")
+        for name, count in sorted(taken.items()):
+            print(f"   Seeds {name}: {count:,}")
+
+        writer = write_sample(db, c, selected, sampler.schema, path, format, compress, batch_size)
+        db.close()
+    print(f"\n💾 Saved: {path} ({writer.nb_triples:,} triples, {os.path.getsize(path) / 1024:.1f} KB)")
+
+    if check:
+        if compress:
+            print("⚠️  --check reads uncompressed samples only; skipped")
+        else:
+            print("\n🔎 Competency queries over the sample:")
+            results = check_sample(path, format)
+            lost = [name for name, rows in results.items() if not rows and witnesses[name][0]]
+            for name, rows in results.items():
+                print(f"   {'❌' if name in lost else '✅' if rows else '⚠️ '} {name}: {rows} rows "
+                      f"(source: {witnesses[name][0]})")
+            print(f"   Answered: {sum(1 for rows in results.values() if rows)} of {len(results)}")
+            if lost:
+                print(f"❌ {len(lost)} queries answered on the source have no answer on the sample")
+                return False
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stratified, closed subgraph sample of the final graph within a triple budget")
+    parser.add_argument("--store", default=os.environ.get("PKG2020_STORE"),
+                        help=f"pipeline store to sample (default: $PKG2020_STORE, else owl/{INPUT_OWL})")
+    parser.add_argument("--max-triples", type=int, default=DEFAULT_MAX_TRIPLES, help="triple budget of the sample, T-Box included")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the seed draw")
+    parser.add_argument("--format", default="turtle", choices=["turtle", "ntriples"])
+    parser.add_argument("--compress", default=None, choices=["gzip", "zstd"], help="compress the output on the fly")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH, help="triples fetched from the store per batch")
+    parser.add_argument("--output", default=None, help=f"output file name in owl/ (default: {OUTPUT_NAME}.ttl / .nt)")
+    parser.add_argument("--check", action="store_true", help="run the 15 competency queries over the sample with rdflib; fail if one answered on the source is not")
+    args = parser.parse_args()
+    if args.compress == "zstd" and not ZSTD:
+        parser.error("--compress zstd needs the zstandard package (pip install zstandard)")
+    ok = sample_graph(args.store, args.max_triples, args.seed, args.format, args.compress, args.batch_size, args.output,
+                      args.check)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,229 @@
+"""
+PKG2020 Sharded Conversion - CSV to Triples on Every Core
+PURPOSE: Turning OA01 (articles/authors) and OA02/OA03 (bio-entities) rows into triples is CPU-bound pure Python; this spreads it over a process pool.
+HOW: One streaming pass partitions the CSVs by a hash of PMID into owl/shards/<k>/ (OA03 rows follow their OA02 row through Main_id).
+     Each worker loads the T-Box into a fresh World, runs the regular populate() code on its shard and writes a sorted N-Triples file.
+KEY FEATURE: A k-way heap merge of the sorted shards drops duplicates (the T-Box every shard carries) - the output is the same for any --shards / --jobs.
+NOTE: OA03 rows are routed by the PMID of their OA02 row, so the Main_id join populate_bioentities links mutations with stays inside a shard.
+CHECK: --check also converts the unpartitioned tables in one more worker and compares its sorted output with the merged shards
+     line by line; any difference is printed and the run exits with status 1.
+NOTE: Needs Python 3.11+ (one fresh worker per shard: ProcessPoolExecutor(max_tasks_per_child=1)).
+OUTPUT: owl/pkg2020_sharded.nt - sorted, duplicate-free N-Triples
+USAGE: python shard_pipeline.py [--shards 8] [--jobs 8] [--nrows 0] [--chunk-size 100000] [--check]
+"""
+from owlready2 import *
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from stage_store import OWL_DIR
+from csv_loader import iter_frames, data_path
+import populate_authors_articles
+import populate_bioentities
+import numpy as np
+import pandas as pd
+import argparse
+import csv
+import heapq
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+
+SEED_OWL = "pkg2020_constrained.owl"
+OUTPUT_NT = "pkg2020_sharded.nt"
+PARTITION_CHUNK = 100000
+AUTHOR_FIELDS = ["LastName", "ForeName", "Initials"]
+NAMES_FLAG = "HasNames"
+
+
+def shard_of(pmids, shards):
+    """Shard number of every PMID (a stable hash, so the same PMID always lands in the same shard)"""
+    return pd.util.hash_array(pmids.fillna(-1).to_numpy(dtype="int64")) % shards
+
+
+def write_partitioned(frames, filename, pmid_column, shard_dirs):
+    """Append each frame's rows to <shard>/<filename> according to the hash of their PMID"""
+    header = True
+    for df in frames:
+        shard = shard_of(df[pmid_column], len(shard_dirs))
+        for k, shard_dir in enumerate(shard_dirs):
+            df[shard == k].to_csv(os.path.join(shard_dir, filename), mode="w" if header else "a", header=header, index=False)
+        header = False
+
+
+def partition(shard_dirs, chunk_size, nrows):
+    """Split OA01, OA02 and OA03 into per-shard CSVs in one streaming pass"""
+    # An author spans PMIDs, hence shards: only its first row overall names it, as in a single-process run. The row is flagged
+    # rather than the others' name cells emptied, since an empty cell does not read back as missing on every pandas / engine.
+    seen_authors = set()
+    def author_frames():
+        for df in iter_frames(populate_authors_articles.load_data(chunk_size, nrows)):
+            first = ~df["AND_ID"].duplicated().to_numpy() & np.array([a not in seen_authors for a in df["AND_ID"]], dtype=bool)
+            seen_authors.update(df["AND_ID"])
+            df[NAMES_FLAG] = first.astype("int8")
+            yield df
+    write_partitioned(author_frames(), "OA01_Author_List.csv", "PMID", shard_dirs)
+
+    df_main, df_mutation = populate_bioentities.load_data(chunk_size, nrows)
+    pmid_of = []
+    def main_frames():
+        for df in iter_frames(df_main):
+            pmid_of.append(df.set_index("id")["PMID"])
+            yield df
+    write_partitioned(main_frames(), "OA02_Bio_entities_Main.csv", "PMID", shard_dirs)
+
+    # OA03 has no PMID: take the one of its OA02 row, and keep the global row number as id (Mutation_{id})
+    pmid_of = pd.concat(pmid_of) if pmid_of else pd.Series(dtype="int64")
+    pmid_of = pmid_of[~pmid_of.index.duplicated()]
+    def mutation_frames():
+        for df in iter_frames(df_mutation):
+            df.insert(0, "id", df.index)
+            df["PMID"] = pmid_of.reindex(df["Main_id"]).astype("Int64").to_numpy()
+            yield df
+    write_partitioned(mutation_frames(), "OA03_Bio_entities_Mutation.csv", "PMID", shard_dirs)
+
+
+def named_rows(frames, path, chunk_size=None):
+    """The OA01 frames of a shard with the name fields of rows not flagged NAMES_FLAG dropped (read_table() only reads the
+    schema columns, so the flag column is read alongside, chunk for chunk)"""
+    flags = pd.read_csv(path, usecols=[NAMES_FLAG], chunksize=chunk_size)
+    for df, flag in zip(iter_frames(frames), [flags] if chunk_size is None else flags):
+        df.loc[flag[NAMES_FLAG].to_numpy() == 0, AUTHOR_FIELDS] = None
+        yield df
+
+
+def convert_shard(shard_dir, output_path, chunk_size=None, nrows=0):
+    """Worker process: populate a fresh World from one shard, or from the unpartitioned tables (no flag column, read with the
+    partition's nrows) for --check; returns (seconds, triples written)"""
+    start = time.time()
+    os.environ["PKG2020_DATA_DIR"] = shard_dir
+    onto = get_ontology(os.path.join(OWL_DIR, SEED_OWL)).load()
+
+    authors = populate_authors_articles.load_data(chunk_size, nrows)
+    authors_path = data_path(populate_authors_articles.INPUT_CSV[0])
+    with open(authors_path, newline="") as f:
+        if NAMES_FLAG in next(csv.reader(f), []):
+            authors = named_rows(authors, authors_path, chunk_size)
+    populate_authors_articles.populate(onto, authors, bulk=True)
+    populate_bioentities.populate(onto, *populate_bioentities.load_data(chunk_size, nrows))
+
+    unsorted_path = output_path + ".unsorted"
+    onto.save(file=unsorted_path, format="ntriples")
+    with open(unsorted_path, encoding="utf-8") as f:
+        lines = sorted(f)
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+    os.remove(unsorted_path)
+    return time.time() - start, len(lines)
+
+
+def merge_sorted(paths, output_path):
+    """k-way merge of sorted N-Triples files, writing each distinct line once; returns the line count"""
+    files = [open(path, encoding="utf-8") for path in paths]
+    nb_lines, previous = 0, None
+    try:
+        with open(output_path, "w", encoding="utf-8") as out:
+            for line in heapq.merge(*files):
+                if line != previous:
+                    out.write(line)
+                    nb_lines += 1
+                    previous = line
+    finally:
+        for f in files:
+            f.close()
+    return nb_lines
+
+
+def compare_sorted(path, reference_path, examples=5):
+    """Walk two sorted, duplicate-free N-Triples files side by side; returns ([count, sample lines] only in path,
+    [count, sample lines] only in reference_path)"""
+    extra, missing = [0, []], [0, []]
+    def note(side, line):
+        side[0] += 1
+        if len(side[1]) < examples:
+            side[1].append(line.rstrip("\n"))
+
+    with open(path, encoding="utf-8") as f, open(reference_path, encoding="utf-8") as g:
+        line, expected = next(f, None), next(g, None)
+        while line is not None or expected is not None:
+            if expected is None or (line is not None and line < expected):
+                note(extra, line)
+                line = next(f, None)
+            elif line is None or expected < line:
+                note(missing, expected)
+                expected = next(g, None)
+            else:
+                line, expected = next(f, None), next(g, None)
+    return extra, missing
+
+
+def run_sharded(args):
+    timings = {}
+    start = time.time()
+    shard_root = os.path.join(OWL_DIR, "shards")
+    shard_dirs = [os.path.join(shard_root, str(k)) for k in range(args.shards)]
+    for shard_dir in shard_dirs:
+        os.makedirs(shard_dir, exist_ok=True)
+
+    partition(shard_dirs, args.chunk_size or PARTITION_CHUNK, args.nrows)
+    timings["partition"] = time.time() - start
+
+    shard_files = [os.path.join(shard_dir, "triples.nt") for shard_dir in shard_dirs]
+    reference_file = os.path.join(shard_root, "single_process.nt")
+    context = multiprocessing.get_context("spawn")
+    # One fresh process per shard: each needs its own default World
+    with ProcessPoolExecutor(max_workers=args.jobs, mp_context=context, max_tasks_per_child=1) as pool:
+        futures = {pool.submit(convert_shard, shard_dirs[k], shard_files[k], args.chunk_size): (f"shard:{k}", f"Shard {k}")
+                   for k in range(args.shards)}
+        if args.check:
+            data_dir = os.path.dirname(data_path(populate_authors_articles.INPUT_CSV[0]))
+            futures[pool.submit(convert_shard, data_dir, reference_file, args.chunk_size, args.nrows)] = ("check", "Single process")
+        for future in as_completed(futures):
+            seconds, nb_lines = future.result()
+            name, label = futures[future]
+            timings[name] = seconds
+            print(f"{label}: {nb_lines} triples in {seconds:.1f}s")
+
+    merge_start = time.time()
+    output_path = os.path.join(OWL_DIR, args.output)
+    nb_triples = merge_sorted(shard_files, output_path)
+    timings["merge"] = time.time() - merge_start
+    mismatches = 0
+    if args.check:
+        (nb_extra, extra), (nb_missing, missing) = compare_sorted(output_path, reference_file)
+        mismatches = nb_extra + nb_missing
+        print(f"Check against a single-process conversion: {nb_extra} extra, {nb_missing} missing triples")
+        for line in extra:
+            print(f"  + {line}")
+        for line in missing:
+            print(f"  - {line}")
+    if not args.keep_shards:
+        shutil.rmtree(shard_root)
+
+    wall = time.time() - start
+    print("\n" + "=" * 50)
+    print(f"SHARDED CONVERSION: {nb_triples} triples -> {args.output}")
+    print("=" * 50)
+    for name, seconds in timings.items():
+        print(f"  {name:<24} {seconds:8.1f}s")
+    print("-" * 50)
+    print(f"  {'wall clock':<24} {wall:8.1f}s")
+    return nb_triples, mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert OA01-OA03 to N-Triples in PMID-hash shards on a process pool")
+    parser.add_argument("--shards", type=int, default=os.cpu_count(), help="number of PMID-hash shards")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="rows per chunk when partitioning and converting (default: whole shards)")
+    parser.add_argument("--nrows", type=int, default=None,
+                        help="rows to read from each CSV (default: the steps' sample sizes, 0: whole tables)")
+    parser.add_argument("--output", default=OUTPUT_NT, help="output file name, written to owl/")
+    parser.add_argument("--keep-shards", action="store_true", help="keep owl/shards/ after merging")
+    parser.add_argument("--check", action="store_true",
+                        help="also convert the tables in a single process and fail unless the merged output is identical")
+    args = parser.parse_args()
+    if sys.version_info < (3, 11):
+        parser.error("needs Python 3.11+ (ProcessPoolExecutor max_tasks_per_child)")
+    _, mismatches = run_sharded(args)
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,179 @@
+"""
+PKG2020 Stage Profiler - Structured Run Metrics for Every Build Step
+PURPOSE: Replaces "Processing row N..." as the only progress signal: with --profile (or PKG2020_PROFILE) every populate_* step,
+         reasoning.py and convert_to_ttl.py write a JSON run report, so a stage that regressed between two builds stands out.
+HOW: profile_stage() wraps a step; its phase() blocks (load, populate, save, ...) each record wall time, CSV rows read (csv_loader),
+     triples and owl:NamedIndividuals added to the quadstore, and the process's peak RSS so far. Counts are two COUNT(*) queries per
+     phase boundary, and only taken when profiling is on - without it profile_stage() costs nothing.
+KEY FEATURE: --profile cprofile also runs the step under cProfile, dumps the stats next to the report and prints the top functions.
+NOTE: A phase named "load" reads an existing graph, so its triples are not counted as created. Peak RSS comes from
+      resource.getrusage(); where that module is missing (Windows) it is tracemalloc's peak of the Python heap instead.
+OUTPUT: owl/profiles/<stage>-<YYYYmmdd-HHMMSS>.json (and .prof); this script compares the two latest reports of every stage.
+USAGE: python populate_education.py --profile  |  PKG2020_PROFILE=cprofile python reasoning.py  |  python stage_profile.py
+"""
+from owlready2 import default_world, rdf_type, owl_named_individual
+from contextlib import contextmanager
+from datetime import datetime
+import cProfile
+import glob
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+import csv_loader
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# stage_store.OWL_DIR, which imports this module
+PROFILE_DIR = os.path.join(os.environ.get("PKG2020_OWL_DIR") or os.path.join(os.path.dirname(SCRIPT_DIR), "owl"), "profiles")
+PROFILE_MODES = ["metrics", "cprofile"]
+TOP_FUNCTIONS = 15
+
+
+def add_profile_argument(parser):
+    """--profile [metrics|cprofile], defaulting to $PKG2020_PROFILE"""
+    parser.add_argument("--profile", nargs="?", const="metrics", default=os.environ.get("PKG2020_PROFILE") or None,
+                        choices=PROFILE_MODES, help="write a JSON run report to owl/profiles/ (cprofile: also dump cProfile stats)")
+    return parser
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB"""
+    if resource is None:
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10  # bytes on macOS, KiB elsewhere
+
+
+def graph_counts(world=None):
+    """(triples, named individuals) in the quadstore"""
+    db = (world or default_world).graph.db
+    triples = db.execute("SELECT (SELECT COUNT(*) FROM objs) + (SELECT COUNT(*) FROM datas)").fetchone()[0]
+    individuals = db.execute("SELECT COUNT(*) FROM objs WHERE p = ? AND o = ?", (rdf_type, owl_named_individual)).fetchone()[0]
+    return triples, individuals
+
+
+class StageProfile:
+    """Phase timings and counters of one step; a disabled profile only runs the phases"""
+
+    def __init__(self, stage, mode=None):
+        self.stage = stage
+        self.mode = mode
+        self.phases = []
+        self.info = {}
+
+    @contextmanager
+    def phase(self, name):
+        if not self.mode:
+            yield
+            return
+        rows, (triples, individuals) = csv_loader.rows_read(), graph_counts()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            after_triples, after_individuals = graph_counts()
+            self.phases.append({
+                "name": name,
+                "seconds": round(seconds, 3),
+                "rows": csv_loader.rows_read() - rows,
+                "triples_added": after_triples - triples,
+                "individuals_added": after_individuals - individuals,
+                "triples": after_triples,
+                "peak_rss_mb": round(peak_rss_mb(), 1),
+            })
+
+    def report(self, wall, started):
+        created = [phase for phase in self.phases if phase["name"] != "load"]
+        rows = sum(phase["rows"] for phase in self.phases)
+        row_seconds = sum(phase["seconds"] for phase in self.phases if phase["rows"])
+        return {
+            "stage": self.stage,
+            "script": os.path.basename(sys.argv[0]),
+            "argv": sys.argv[1:],
+            "started": started.isoformat(timespec="seconds"),
+            "wall_seconds": round(wall, 3),
+            "rows": rows,
+            "rows_per_second": round(rows / row_seconds, 1) if row_seconds else None,
+            "triples_added": sum(phase["triples_added"] for phase in created),
+            "individuals_added": sum(phase["individuals_added"] for phase in created),
+            "triples": self.phases[-1]["triples"] if self.phases else None,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "rss_source": "tracemalloc" if resource is None else "getrusage",
+            "phases": self.phases,
+            **self.info,
+        }
+
+
+@contextmanager
+def profile_stage(stage, mode=None):
+    """Profile the enclosed step as `stage` (mode: None, "metrics" or "cprofile") and write its run report on exit"""
+    profile = StageProfile(stage, mode)
+    if not mode:
+        yield profile
+        return
+
+    started, start = datetime.now(), time.perf_counter()
+    if resource is None:
+        tracemalloc.start()
+    profiler = cProfile.Profile() if mode == "cprofile" else None
+    if profiler:
+        profiler.enable()
+    try:
+        yield profile
+    finally:
+        if profiler:
+            profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{stage}-{started:%Y%m%d-%H%M%S}")
+        report = profile.report(time.perf_counter() - start, started)
+        if profiler:
+            profiler.dump_stats(path + ".prof")
+            report["cprofile"] = os.path.basename(path) + ".prof"
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        with open(path + ".json", "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Profile {stage}: {report['wall_seconds']:.1f}s, {report['rows']} rows, {report['triples_added']} triples, "
+              f"{report['individuals_added']} individuals, peak RSS {report['peak_rss_mb']:.0f} MB -> {os.path.relpath(path)}.json")
+
+
+def latest_reports(directory=PROFILE_DIR, keep=2):
+    """stage -> its `keep` most recent run reports, newest first"""
+    reports = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.json")), reverse=True):
+        with open(path) as f:
+            report = json.load(f)
+        runs = reports.setdefault(report["stage"], [])
+        if len(runs) < keep:
+            runs.append(report)
+    return reports
+
+
+def change(new, old):
+    if new is None or not old:
+        return ""
+    return f"{(new - old) / old:+.0%}"
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Compare the latest two run reports of every profiled stage")
+    parser.add_argument("--dir", default=PROFILE_DIR, help="directory of the JSON run reports")
+    args = parser.parse_args()
+
+    reports = latest_reports(args.dir)
+    if not reports:
+        print(f"No run reports in {args.dir} (run a step with --profile first)")
+    print(f"{'stage':<16} {'started':<20} {'wall s':>8} {'vs prev':>8} {'rows/s':>10} {'vs prev':>8} {'triples':>10} {'peak MB':>8}")
+    for stage, runs in sorted(reports.items()):
+        new, old = runs[0], runs[1] if len(runs) > 1 else {}
+        print(f"{stage:<16} {new['started']:<20} {new['wall_seconds']:>8.1f} {change(new['wall_seconds'], old.get('wall_seconds')):>8} "
+              f"{new['rows_per_second'] or 0:>10.0f} {change(new['rows_per_second'], old.get('rows_per_second')):>8} "
+              f"{new['triples_added']:>10} {new['peak_rss_mb']:>8.0f}")
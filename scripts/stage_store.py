@@ -0,0 +1,203 @@
+"""
+PKG2020 Stage Store - Shared Persistent Quadstore for the Population Pipeline
+PURPOSE: Lets every populate_* step run against ONE on-disk OWLReady2 World (SQLite) instead of re-parsing and re-serializing RDF/XML.
+HOW: With --store PATH (or PKG2020_STORE), the first step seeds the SQLite file from pkg2020_constrained.owl; later steps reopen it in milliseconds.
+KEY FEATURE: Intermediate RDF/XML dumps are skipped entirely - the graph is only exported once, by the final step (pkg2020_final.owl).
+COLUMNAR: --columnar DIR keeps file mode's one-World-per-step model but stages steps as integer edge tables (columnar_stage.py).
+WITHOUT --store: Falls back to the original file-per-step behaviour (load previous .owl, save next .owl as RDF/XML).
+CHECKPOINTS: --checkpoint-every N commits resumable progress into the store; --resume continues from it (checkpoints.py).
+OWL DIR: owl/ by default; set PKG2020_OWL_DIR to read the seed T-Box and write every output (exports, cache, staging) elsewhere (tests).
+STAGING: snapshot_store() / merge_store() copy the store for a stage running in another process and fold its new triples back in (run_pipeline.py).
+USAGE: python stage_store.py --store ../owl/pkg2020.sqlite3 --export pkg2020_final.nt --format ntriples
+"""
+from owlready2 import *
+from stage_profile import add_profile_argument
+import argparse
+import os
+import sqlite3
+import time
+
+# Get script directory for relative paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+OWL_DIR = os.environ.get("PKG2020_OWL_DIR") or os.path.join(PROJECT_DIR, "owl")
+
+ONTOLOGY_IRI = "http://example.org/pkg2020/ontology.owl#"
+
+# Tables outside the quadstore that merge_store() copies back from a staging store
+SIDE_TABLES = ["delta_digests", "bioentity_mentions", "bioentity_mention_counts", "mutation_index", "nih_project_rows"]
+
+# SQLite page cache for streaming runs (KiB); OWLReady2 defaults to 200 MB plus a 30 GB mmap window
+STREAMING_CACHE_KB = 65536
+
+
+def stage_argparser(description):
+    """Argument parser with the options shared by every pipeline step"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--store", default=os.environ.get("PKG2020_STORE"),
+                        help="persistent SQLite quadstore shared by all steps (default: $PKG2020_STORE)")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="stream the CSV input in chunks of this many rows instead of loading it whole")
+    parser.add_argument("--nrows", type=int, default=None,
+                        help="rows to read from each CSV (default: the step's sample size, 0: whole table)")
+    parser.add_argument("--columnar", default=os.environ.get("PKG2020_COLUMNAR"),
+                        help="stage steps as integer edge tables in this directory instead of RDF/XML dumps (default: $PKG2020_COLUMNAR)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="apply a new data drop to an existing --store: only new or changed rows are ingested")
+    parser.add_argument("--checkpoint-every", type=int, default=int(os.environ.get("PKG2020_CHECKPOINT_EVERY") or 0) or None,
+                        help="commit a resumable checkpoint every this many input rows (default: $PKG2020_CHECKPOINT_EVERY)")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted run in --store from its last checkpoint (checkpoints.py)")
+    return add_profile_argument(parser)
+
+
+def open_stage(input_name, args, seed=False):
+    """Return the ontology for a pipeline step.
+
+    File mode parses owl/<input_name>. Store mode opens the SQLite World; the seed step
+    (populate_authors_articles.py) recreates the store from owl/<input_name> so reruns start clean,
+    unless --incremental asks to update the existing store in place or --resume to continue an interrupted run in it.
+    """
+    start = time.time()
+    if getattr(args, "incremental", False):
+        if not args.store:
+            raise ValueError("--incremental needs a persistent --store to compare the new drop against")
+        seed = seed and not os.path.exists(args.store)
+    if getattr(args, "resume", False) and args.store:
+        seed = seed and not os.path.exists(args.store)
+    if getattr(args, "columnar", None):
+        if args.store:
+            raise ValueError("--columnar and --store are alternative staging modes, pick one")
+        from columnar_stage import open_columnar
+        return open_columnar(args.columnar, input_name, seed=seed)
+
+    if not args.store:
+        onto = get_ontology(os.path.join(OWL_DIR, input_name)).load()
+        print(f"Loaded {input_name} in {time.time() - start:.1f}s")
+        return onto
+
+    if seed and os.path.exists(args.store):
+        os.remove(args.store)
+    elif not seed and not os.path.exists(args.store):
+        raise FileNotFoundError(f"Store not found: {args.store} (run populate_authors_articles.py --store first)")
+
+    default_world.set_backend(filename=args.store)
+    if getattr(args, "chunk_size", None):
+        # Streaming: keep SQLite's own footprint bounded too, so resident memory does not track the store size
+        default_world.graph.db.execute(f"PRAGMA cache_size = -{STREAMING_CACHE_KB}")
+        default_world.graph.db.execute("PRAGMA mmap_size = 0")
+    if seed:
+        onto = get_ontology(os.path.join(OWL_DIR, input_name)).load()
+        default_world.save()
+    else:
+        onto = default_world.get_ontology(ONTOLOGY_IRI).load()
+    print(f"Opened store {args.store} in {time.time() - start:.1f}s")
+    return onto
+
+
+def save_stage(onto, output_name, args, final=False):
+    """Persist a step: commit the store, append the step's columnar tables, or write owl/<output_name> in file mode
+    (always for the final step)"""
+    if getattr(args, "columnar", None):
+        from columnar_stage import save_columnar
+        save_columnar(onto, args.columnar, output_name)
+        if not final:
+            return
+    elif args.store:
+        onto.world.save()
+        print(f"Committed store: {args.store}")
+        if not final:
+            return
+    onto.save(file=os.path.join(OWL_DIR, output_name), format="rdfxml")
+    print(f"Saved: {output_name}")
+
+
+def snapshot_store(onto, staging_path):
+    """Copy the committed store to staging_path; returns the watermark that marks everything after it as new"""
+    db = onto.world.graph.db
+    onto.world.save()
+    if os.path.exists(staging_path):
+        os.remove(staging_path)
+    target = sqlite3.connect(staging_path)
+    db.backup(target)
+    target.close()
+
+    resource, blank = db.execute("SELECT current_resource, current_blank FROM store").fetchone()
+    return {
+        "resource": resource,
+        "blank": blank,
+        "objs": db.execute("SELECT IFNULL(MAX(rowid), 0) FROM objs").fetchone()[0],
+        "datas": db.execute("SELECT IFNULL(MAX(rowid), 0) FROM datas").fetchone()[0],
+    }
+
+
+def merge_store(onto, staging_path, watermark):
+    """Fold the triples a stage added to its staging copy back into the main store.
+
+    Stages only add triples, so rows past the watermark are the stage's output. New resources are
+    matched by IRI (two stages minting the same Organization share one storid), new blank nodes
+    get fresh ids. Returns the number of triples merged.
+    """
+    db = onto.world.graph.db
+    db.execute("ATTACH DATABASE ? AS staging", (staging_path,))
+    db.execute("CREATE TEMP TABLE IF NOT EXISTS remap (old INTEGER PRIMARY KEY, new INTEGER)")
+    db.execute("DELETE FROM remap")
+
+    current_resource, current_blank = db.execute("SELECT current_resource, current_blank FROM main.store").fetchone()
+    remap, new_resources = [], []
+    rows = db.execute("""SELECT r.storid, r.iri, m.storid FROM staging.resources r
+                         LEFT JOIN main.resources m ON m.iri = r.iri WHERE r.storid > ?""", (watermark["resource"],))
+    for old, iri, existing in rows.fetchall():
+        if existing is None:
+            current_resource += 1
+            new_resources.append((current_resource, iri))
+            existing = current_resource
+        remap.append((old, existing))
+
+    blanks = db.execute("""SELECT s FROM staging.objs WHERE rowid > ?1 AND s < -?3
+                           UNION SELECT o FROM staging.objs WHERE rowid > ?1 AND o < -?3
+                           UNION SELECT s FROM staging.datas WHERE rowid > ?2 AND s < -?3""",
+                        (watermark["objs"], watermark["datas"], watermark["blank"]))
+    for (old,) in blanks.fetchall():
+        current_blank += 1
+        remap.append((old, -current_blank))
+
+    db.executemany("INSERT INTO main.resources VALUES (?,?)", new_resources)
+    db.executemany("INSERT INTO remap VALUES (?,?)", remap)
+    db.execute("UPDATE main.store SET current_resource=?, current_blank=?", (current_resource, current_blank))
+
+    before = db.total_changes
+    db.execute("""INSERT OR IGNORE INTO main.objs
+                  SELECT t.c, IFNULL(rs.new, t.s), IFNULL(rp.new, t.p), IFNULL(ro.new, t.o) FROM staging.objs t
+                  LEFT JOIN remap rs ON rs.old = t.s LEFT JOIN remap rp ON rp.old = t.p LEFT JOIN remap ro ON ro.old = t.o
+                  WHERE t.rowid > ?""", (watermark["objs"],))
+    db.execute("""INSERT OR IGNORE INTO main.datas
+                  SELECT t.c, IFNULL(rs.new, t.s), IFNULL(rp.new, t.p), t.o, IFNULL(rd.new, t.d) FROM staging.datas t
+                  LEFT JOIN remap rs ON rs.old = t.s LEFT JOIN remap rp ON rp.old = t.p LEFT JOIN remap rd ON rd.old = t.d
+                  WHERE t.rowid > ?""", (watermark["datas"],))
+    nb_triples = db.total_changes - before
+
+    # Side tables the stage keeps next to its triples (row digests, bio-entity mentions) hold no storids and travel as they are
+    for table in SIDE_TABLES:
+        schema = db.execute("SELECT sql FROM staging.sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+        if schema:
+            db.execute(schema[0].replace("CREATE TABLE ", "CREATE TABLE IF NOT EXISTS main.", 1))
+            db.execute(f"INSERT OR REPLACE INTO main.{table} SELECT * FROM staging.{table}")
+
+    db.commit()
+    db.execute("DETACH DATABASE staging")
+    onto.world.graph.analyze()
+    return nb_triples
+
+
+if __name__ == "__main__":
+    parser = stage_argparser("Export the persistent pipeline store to RDF/XML or N-Triples")
+    parser.add_argument("--export", required=True, help="output file name, written to owl/")
+    parser.add_argument("--format", default="rdfxml", choices=["rdfxml", "ntriples"])
+    args = parser.parse_args()
+    if not args.store:
+        parser.error("--store (or PKG2020_STORE) is required")
+
+    onto = open_stage(None, args)
+    onto.save(file=os.path.join(OWL_DIR, args.export), format=args.format)
+    print(f"Exported: {args.export}")
@@ -0,0 +1,413 @@
+"""
+PKG2020 Synthetic Data Generator - OA01-OA07 Tables at Any Scale
+PURPOSE: The repo ships 50K-row samples of OA01/02/03/07 only, and no OA04-06. This writes synthetic versions of all seven CSVs with
+         the real column schemas, from 10K to 10M+ rows per table, so the pipeline can be run (and benchmarked) at production size.
+HOW: Every table is drawn with numpy from distributions fitted to the samples: authors per article (mean 2.6), mentions per article
+     (negative binomial, mean 14), bio-entity type shares, mutation notation mix. Papers per author follow Lotka's law (the Zipf
+     law of authorship); organizations, entities and NIH projects are drawn from bounded Zipf distributions, so a few are very
+     frequent and most appear once or twice. Names are derived from each entity's rank, so the same author always gets the same name. The tables join like the real ones:
+     - OA02/04/07 PMIDs and OA04-07 AND_IDs come from OA01.
+     - OA03 Main_id points at OA02 ids.
+KEY FEATURE: Numeric columns are drawn once per table and text is only built per written chunk, so memory tracks the numeric draws
+     (about 400 MB at 1M rows per table, which take a minute). A seed fixes the output.
+NOTE: Point the pipeline at the output with PKG2020_DATA_DIR and read whole tables with --nrows 0.
+USAGE: python synthetic_data.py --rows 1000000 --output ../data/synthetic_1M [--seed 0] [--tables OA01 OA04]
+"""
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+
+WRITE_CHUNK = 100_000
+
+TABLES = {
+    "OA01": "OA01_Author_List.csv",
+    "OA02": "OA02_Bio_entities_Main.csv",
+    "OA03": "OA03_Bio_entities_Mutation.csv",
+    "OA04": "OA04_Affiliations.csv",
+    "OA05": "OA05_Researcher_Employment.csv",
+    "OA06": "OA06_Researcher_Education.csv",
+    "OA07": "OA07_NIH_Projects.csv",
+}
+
+# Fitted to the 50K-row samples in data/
+AUTHORS_PER_ARTICLE = 1.57        # AuNum - 1 ~ Poisson
+LOTKA_EXPONENT = 3.0              # authors with k papers ~ k^-3: mean 1.37 papers per author (1.32 in the sample)
+MAX_PAPERS = 1000
+MENTIONS_PER_ARTICLE = (2.5, 0.15)  # negative binomial (n, p): mean 14, sd 9.6
+ENTITY_TYPES = {"drug": 0.541, "gene": 0.1845, "species": 0.1556, "desease": 0.1184, "mutation": 0.0015}
+UNNORMALIZED_ENTITY = 0.207       # share of OA02 rows with EntityID 0
+MUTATION_TYPES = {"ProteinMutation": 0.7854, "DNAMutation": 0.2134, "SNP": 0.0012}
+CHANGES = {"SUB": 0.959, "DEL": 0.037, "INS": 0.0015, "FS": 0.0012, "DUP": 0.0013}
+RS_SHARE = 0.1
+SUFFIXES = {"Jr": 0.0077, "3rd": 0.0012, "2nd": 0.0003, "Sr": 0.0001}
+ZIPF_EXPONENT = 1.1
+ORG_EXPONENT = 0.8                # flatter: the largest organization has a few % of the rows, not a tenth
+
+AMINO_ACIDS = np.array(list("ACDEFGHIKLMNPQRSTVWY"))
+THREE_LETTER = dict(zip("ACDEFGHIKLMNPQRSTVWY", ["Ala", "Cys", "Asp", "Glu", "Phe", "Gly", "His", "Ile", "Lys", "Leu", "Met", "Asn",
+                                                 "Pro", "Gln", "Arg", "Ser", "Thr", "Val", "Trp", "Tyr"]))
+BASES = np.array(list("ACGT"))
+ONSETS = ["B", "C", "D", "F", "G", "H", "K", "L", "M", "N", "P", "R", "S", "T", "V", "W", "Br", "Ch", "Gr", "Kr", "Sch", "St", "Tr"]
+VOWELS = ["a", "e", "i", "o", "u", "ei", "au", "ie"]
+CODAS = ["n", "r", "s", "l", "rt", "nd", "ck", "m", "tz", "ng", "ll", "ss"]
+ENDINGS = ["", "er", "son", "sen", "man", "berg", "ov", "ez", "i", "ini", "ski", "ura", "ton"]
+FIRST_NAMES = ["John", "Mary", "David", "Wei", "Maria", "James", "Anna", "Robert", "Yuki", "Michael", "Li", "Elena", "Thomas",
+               "Sarah", "Hiroshi", "Laura", "Peter", "Jun", "Karen", "Ahmed", "Paolo", "Ingrid", "Richard", "Priya", "Jose"]
+PLACES = [("Boston", "MA", "USA"), ("New York", "NY", "USA"), ("Baltimore", "MD", "USA"), ("Bethesda", "MD", "USA"),
+          ("Houston", "TX", "USA"), ("Stanford", "CA", "USA"), ("San Francisco", "CA", "USA"), ("Seattle", "WA", "USA"),
+          ("Chicago", "IL", "USA"), ("Philadelphia", "PA", "USA"), ("Rochester", "MN", "USA"), ("Ann Arbor", "MI", "USA"),
+          ("Toronto", "ON", "Canada"), ("Montreal", "QC", "Canada"), ("London", None, "UK"), ("Oxford", None, "UK"),
+          ("Cambridge", None, "UK"), ("Paris", None, "France"), ("Berlin", None, "Germany"), ("Munich", None, "Germany"),
+          ("Stockholm", None, "Sweden"), ("Zurich", None, "Switzerland"), ("Amsterdam", None, "Netherlands"),
+          ("Milan", None, "Italy"), ("Madrid", None, "Spain"), ("Tokyo", None, "Japan"), ("Osaka", None, "Japan"),
+          ("Beijing", None, "China"), ("Shanghai", None, "China"), ("Seoul", None, "Korea"), ("Sydney", "NSW", "Australia"),
+          ("Melbourne", "VIC", "Australia"), ("Sao Paulo", None, "Brazil"), ("Tel Aviv", None, "Israel")]
+UNIVERSITY_PATTERNS = ["University of {place}", "{place} University", "{name} University"]
+ORG_PATTERNS = UNIVERSITY_PATTERNS + ["{name} Institute", "{place} General Hospital", "{name} Medical Center", "{place} Cancer Center",
+                                      "{name} College of Medicine", "National {name} Laboratory", "{name} Research Foundation"]
+DEPARTMENTS = ["Biochemistry", "Medicine", "Pharmacology", "Pathology", "Genetics", "Microbiology", "Neurology", "Surgery",
+               "Physiology", "Chemistry", "Pediatrics", "Immunology", "Psychiatry", "Cell Biology", "Epidemiology"]
+ROLES = {"Professor": 0.25, "Associate Professor": 0.15, "Assistant Professor": 0.2, "Research Scientist": 0.2,
+         "Postdoctoral Fellow": 0.15, "Director": 0.05}
+DEGREES = {"PhD": 0.35, "MD": 0.15, "BSc": 0.18, "MSc": 0.14, "MD PhD": 0.03, None: 0.15}
+DEGREE_YEARS = {"PhD": 5, "MD": 4, "BSc": 4, "MSc": 2, "MD PhD": 8, None: 4}
+SPECIES = ["patients", "rats", "rat", "human", "mice", "mouse", "dogs", "rabbits", "cattle", "Escherichia coli", "yeast", "pigs",
+           "sheep", "chickens", "monkeys", "guinea pigs", "hamsters", "Drosophila", "cats", "horses"]
+DRUG_ENDINGS = ["ine", "ol", "ate", "ide", "mycin", "azole", "pril", "statin", "one", "amide"]
+DISEASE_ENDINGS = ["itis", "oma", "osis", "emia", "opathy", " syndrome", " disease", " deficiency"]
+NIH_ACTIVITIES = {"R01": 0.45, "P30": 0.12, "R21": 0.08, "P01": 0.08, "K08": 0.05, "U01": 0.06, "M01": 0.04, "T32": 0.05,
+                  "G12": 0.03, "R37": 0.04}
+NIH_INSTITUTES = ["CA", "AI", "HL", "GM", "DK", "NS", "MH", "EY", "ES", "RR", "AG", "HD", "DA", "AR", "DE"]
+
+
+def zipf_ranks(rng, size, population, exponent=ZIPF_EXPONENT):
+    """size draws of ranks 0..population-1 with P(rank k) proportional to 1/(k+1)^exponent"""
+    weights = np.cumsum(1.0 / np.arange(1, population + 1) ** exponent)
+    return np.searchsorted(weights, rng.random(size) * weights[-1], side="right").clip(max=population - 1)
+
+
+def spread_ids(ranks, population, offset=0):
+    """Distinct, scattered positive ids for ranks (an affine bijection modulo a power of ten), so frequent entities are not 1, 2, 3..."""
+    modulus = 10 ** (len(str(10 * population)))
+    return (ranks.astype(np.int64) * 7919 + 104729 + offset) % modulus + 1
+
+
+def choice(rng, options, size):
+    """size draws from a {value: probability} dict (probabilities are renormalized)"""
+    values = list(options)
+    p = np.array(list(options.values()), dtype=float)
+    return np.array(values, dtype=object)[rng.choice(len(values), size=size, p=p / p.sum())]
+
+
+def pick(pool, keys):
+    """pool[key % len(pool)] for an array of keys, as an object array"""
+    return np.array(pool, dtype=object)[np.asarray(keys) % len(pool)]
+
+
+def surnames(ranks):
+    """A stable, pronounceable surname per rank"""
+    r = np.asarray(ranks, dtype=np.int64)
+    parts = [pick(ONSETS, r), pick(VOWELS, r // 23), pick(CODAS, r // 184), pick(ENDINGS, r // 2208)]
+    return pd.Series(parts[0]) + parts[1] + parts[2] + parts[3]
+
+
+def forenames(ranks):
+    """Full first name plus a middle initial for most authors, bare initials (as in the older records) for the rest"""
+    r = np.asarray(ranks, dtype=np.int64)
+    first = pd.Series(pick(FIRST_NAMES, r // 7))
+    middle = pd.Series(pick(list("ABCDEFGHJKLMNPRSTW"), r // 11))
+    initials_only = (r % 5) == 0
+    names = np.where(r % 3 == 0, first, first + " " + middle)
+    return pd.Series(np.where(initials_only, first.str[0] + " " + middle, names))
+
+
+def organizations(ranks, patterns=ORG_PATTERNS):
+    """Organization name and (city, state, country) per rank; the big place-named ones ("University of Boston") recur"""
+    r = np.asarray(ranks, dtype=np.int64)
+    places = np.array(PLACES, dtype=object)[r % len(PLACES)]
+    patterns = pick(patterns, r // len(PLACES))
+    names = surnames(r + 17)
+    orgs = [pattern.format(place=place, name=name) for pattern, place, name in zip(patterns, places[:, 0], names)]
+    return pd.Series(orgs), places
+
+
+class SyntheticPKG:
+    """The shared draws the tables are joined on (OA01 articles and authors, OA02 ids), built lazily"""
+
+    def __init__(self, rows, seed=0):
+        self.rows = rows
+        self.seed = seed
+        self._oa01 = None
+
+    def rng(self, table, stream=0):
+        return np.random.default_rng([self.seed, int(table[2:]), stream])
+
+    def oa01(self):
+        """Numeric OA01 columns: PMID, AND_ID rank, AuOrder, AuNum, PubYear, BeginYear"""
+        if self._oa01 is None:
+            rng = self.rng("OA01")
+            n = self.rows
+            sizes = 1 + rng.poisson(AUTHORS_PER_ARTICLE, size=int(n / (1 + AUTHORS_PER_ARTICLE) * 1.2) + 10).clip(max=19)
+            ends = np.cumsum(sizes)
+            nb_articles = int(np.searchsorted(ends, n)) + 1
+            sizes = sizes[:nb_articles]
+            sizes[-1] -= ends[nb_articles - 1] - n
+            article = np.repeat(np.arange(nb_articles), sizes)
+            first_row = np.repeat(np.cumsum(sizes) - sizes, sizes)
+            # Lotka's law for papers per author, then the author slots are shuffled over the rows
+            papers = rng.zipf(LOTKA_EXPONENT, size=n).clip(max=MAX_PAPERS)
+            authors = int(np.searchsorted(np.cumsum(papers), n)) + 1
+            slots = rng.permutation(np.repeat(np.arange(authors), papers[:authors])[:n])
+            frame = pd.DataFrame({
+                "PMID": article + 1,
+                "author": slots,
+                "AuOrder": np.arange(n) - first_row + 1,
+                "AuNum": np.repeat(sizes, sizes),
+                "PubYear": 1975 + (45 * article // max(1, nb_articles)),
+            })
+            frame["BeginYear"] = frame.groupby("author")["PubYear"].transform("min")
+            self.authors = authors
+            self._oa01 = frame
+        return self._oa01
+
+    def and_ids(self, ranks):
+        return spread_ids(ranks, self.authors)
+
+    def author_rows(self, rng, size):
+        """OA01 row numbers drawn uniformly, so prolific authors show up in the enrichment tables as often as in OA01"""
+        return np.sort(rng.integers(0, self.rows, size=size))
+
+    # ---- one generator per table: (numeric frame, function turning a slice of it into output rows) ----
+
+    def table_oa01(self):
+        frame = self.oa01()
+        rng = self.rng("OA01", stream=1)
+        suffix = choice(rng, {**SUFFIXES, None: 1 - sum(SUFFIXES.values())}, len(frame))
+
+        def rows(part):
+            fore = forenames(part["author"])
+            return pd.DataFrame({
+                "id": part.index + 1.0,
+                "PMID": part["PMID"].to_numpy(),
+                "AND_ID": self.and_ids(part["author"].to_numpy()),
+                "AuOrder": part["AuOrder"].to_numpy(),
+                "LastName": surnames(part["author"]).to_numpy(),
+                "ForeName": fore.to_numpy(),
+                "Initials": fore.str.replace(r"[^A-Z]", "", regex=True).to_numpy(),
+                "Suffix": suffix[part.index],
+                "AuNum": part["AuNum"].to_numpy(),
+                "PubYear": part["PubYear"].to_numpy(),
+                "BeginYear": part["BeginYear"].to_numpy(),
+            })
+        return frame, rows
+
+    def table_oa02(self):
+        rng = self.rng("OA02")
+        n = self.rows
+        nb_articles = int(self.oa01()["PMID"].iloc[-1])
+        counts = rng.negative_binomial(*MENTIONS_PER_ARTICLE, size=n // 10 + 10).clip(min=1)
+        ends = np.cumsum(counts)
+        needed = int(np.searchsorted(ends, n)) + 1
+        counts = counts[:needed]
+        counts[-1] -= ends[needed - 1] - n
+        pmids = np.sort(rng.choice(nb_articles, size=needed, replace=needed > nb_articles)) + 1
+
+        types = choice(rng, ENTITY_TYPES, n)
+        ranks = np.zeros(n, dtype=np.int64)
+        entity_ids = np.zeros(n, dtype=np.int64)
+        for k, entity_type in enumerate(ENTITY_TYPES):
+            rows = types == entity_type
+            population = max(10, int(rows.sum() * 0.08))
+            ranks[rows] = zipf_ranks(rng, int(rows.sum()), population)
+            entity_ids[rows] = spread_ids(ranks[rows], population, offset=k * 1_000_003) * 100 + k + 1
+        unnormalized = rng.random(n) < UNNORMALIZED_ENTITY
+        entity_ids[unnormalized] = 0
+        ranks[unnormalized] = rng.integers(0, 10 * n, size=int(unnormalized.sum()))
+
+        frame = pd.DataFrame({"PMID": np.repeat(pmids, counts), "Type": types, "rank": ranks, "EntityID": entity_ids,
+                              "gap": rng.geometric(1 / 38, size=n)})
+        frame["Start"] = frame.groupby("PMID")["gap"].cumsum() - frame["gap"]
+
+        def rows(part):
+            mention = mentions(part["Type"].to_numpy(), part["rank"].to_numpy())
+            return pd.DataFrame({"id": part.index + 1, "PMID": part["PMID"].to_numpy(), "Start": part["Start"].to_numpy(),
+                                 "End": part["Start"].to_numpy() + mention.str.len().to_numpy(), "Mention": mention.to_numpy(),
+                                 "EntityID": part["EntityID"].to_numpy(), "Type": part["Type"].to_numpy()})
+        return frame, rows
+
+    def table_oa03(self):
+        rng = self.rng("OA03")
+        n = self.rows
+        frame = pd.DataFrame({
+            "Main_id": np.sort(rng.integers(1, self.rows + 1, size=n)),
+            "MutationType": choice(rng, MUTATION_TYPES, n),
+            "change": choice(rng, CHANGES, n),
+            "position": np.rint(rng.lognormal(5.0, 1.1, size=n)).astype(np.int64) + 1,
+            "upstream": rng.random(n) < 0.08,
+            "ref": rng.integers(0, 20, size=n),
+            "alt": rng.integers(0, 20, size=n),
+            "rs": np.where(rng.random(n) < RS_SHARE, rng.integers(1000, 800_000_000, size=n), 0),
+            "style": rng.integers(0, 3, size=n),
+        })
+
+        def rows(part):
+            names, texts = mutation_notation(part)
+            return pd.DataFrame({"Main_id": part["Main_id"].to_numpy(), "Mention": texts,
+                                 "MutationType": part["MutationType"].to_numpy(), "NormalizedName": names})
+        return frame, rows
+
+    def table_oa04(self):
+        rng = self.rng("OA04")
+        n = self.rows
+        source = self.oa01().iloc[self.author_rows(rng, n)]
+        frame = pd.DataFrame({"PMID": source["PMID"].to_numpy(), "author": source["author"].to_numpy(),
+                              "AuOrder": source["AuOrder"].to_numpy(), "org": zipf_ranks(rng, n, max(20, n // 25), exponent=ORG_EXPONENT),
+                              "department": rng.integers(0, 4 * len(DEPARTMENTS), size=n)})
+
+        def rows(part):
+            orgs, places = organizations(part["org"])
+            department = pd.Series(pick(DEPARTMENTS, part["department"]))
+            return pd.DataFrame({"id": part.index + 1, "PMID": part["PMID"].to_numpy(), "AND_ID": self.and_ids(part["author"].to_numpy()),
+                                 "AuOrder": part["AuOrder"].to_numpy(), "Affiliation": orgs.to_numpy(),
+                                 "Department": ("Department of " + department).where(part["department"].to_numpy() < len(DEPARTMENTS) * 3),
+                                 "City": places[:, 0], "State": places[:, 1], "Country": places[:, 2]})
+        return frame, rows
+
+    def table_oa05(self):
+        rng = self.rng("OA05")
+        n = self.rows
+        source = self.oa01().iloc[self.author_rows(rng, n)]
+        start = rng.integers(1960, 2020, size=n)
+        end = np.minimum(start + rng.geometric(0.15, size=n), 2020).astype(float)
+        end[rng.random(n) < 0.35] = np.nan
+        frame = pd.DataFrame({"author": source["author"].to_numpy(), "org": zipf_ranks(rng, n, max(20, n // 25), exponent=ORG_EXPONENT),
+                              "Role": choice(rng, ROLES, n), "StartYear": start, "EndYear": end})
+
+        def rows(part):
+            orgs, places = organizations(part["org"])
+            return pd.DataFrame({"id": part.index + 1, "AND_ID": self.and_ids(part["author"].to_numpy()), "Organization": orgs.to_numpy(),
+                                 "Role": part["Role"].to_numpy(), "City": places[:, 0], "State": places[:, 1], "Country": places[:, 2],
+                                 "StartYear": part["StartYear"].to_numpy(), "EndYear": part["EndYear"].to_numpy()})
+        return frame, rows
+
+    def table_oa06(self):
+        rng = self.rng("OA06")
+        n = self.rows
+        source = self.oa01().iloc[self.author_rows(rng, n)]
+        degree = choice(rng, DEGREES, n)
+        start = rng.integers(1950, 2016, size=n)
+        end = start + np.array([DEGREE_YEARS[d] for d in degree]) + rng.integers(0, 2, size=n)
+        org = zipf_ranks(rng, n, max(20, n // 40), exponent=ORG_EXPONENT)
+        frame = pd.DataFrame({"author": source["author"].to_numpy(), "org": org, "Degree": degree, "StartYear": start,
+                              "EndYear": np.where(rng.random(n) < 0.2, np.nan, end)})
+
+        def rows(part):
+            orgs, places = organizations(part["org"], UNIVERSITY_PATTERNS)
+            return pd.DataFrame({"id": part.index + 1, "AND_ID": self.and_ids(part["author"].to_numpy()), "Institution": orgs.to_numpy(),
+                                 "Degree": part["Degree"].to_numpy(), "City": places[:, 0], "Country": places[:, 2],
+                                 "StartYear": part["StartYear"].to_numpy(), "EndYear": part["EndYear"].to_numpy()})
+        return frame, rows
+
+    def table_oa07(self):
+        rng = self.rng("OA07")
+        n = self.rows
+        oa01 = self.oa01()
+        projects = max(5, n // 14)
+        project = np.sort(zipf_ranks(rng, n, projects, exponent=0.8))
+        pi_rows = rng.integers(0, self.rows, size=projects)
+        activity = choice(rng, NIH_ACTIVITIES, projects)
+        sub_project = np.where(rng.random(n) < 0.68, rng.integers(1, 400, size=n) + 8600 * (rng.random(n) < 0.5), np.nan)
+        frame = pd.DataFrame({"project": project, "PMID": rng.integers(1, int(oa01["PMID"].iloc[-1]) + 1, size=n),
+                              "subProjectNumber": sub_project})
+
+        def rows(part):
+            p = part["project"].to_numpy()
+            pi = oa01["author"].to_numpy()[pi_rows[p]]
+            number = pd.Series(activity[p]) + pick(NIH_INSTITUTES, p) + pd.Series(spread_ids(p, 100_000) % 1_000_000).astype(str).str.zfill(6)
+            name = surnames(pi).str.upper() + ", " + forenames(pi).str.upper()
+            return pd.DataFrame({"id": part.index + 1, "AND_ID": self.and_ids(pi), "PI_ID": spread_ids(p, projects, offset=555),
+                                 "PMID": part["PMID"].to_numpy(), "ProjectNumber": number.to_numpy(),
+                                 "subProjectNumber": part["subProjectNumber"].to_numpy(), "PI_Name": name.to_numpy()})
+        return frame, rows
+
+
+def mentions(types, ranks):
+    """Surface text of bio-entity mentions: one stable name per (type, rank)"""
+    names = pd.Series(np.empty(len(types), dtype=object))
+    stem = surnames(ranks).str.lower()
+    for entity_type in ENTITY_TYPES:
+        rows = types == entity_type
+        if entity_type == "species":
+            names[rows] = pick(SPECIES, ranks[rows])
+        elif entity_type == "gene":
+            names[rows] = (stem[rows].str[:3].str.upper() + (ranks[rows] % 20 + 1).astype(str)).to_numpy()
+        elif entity_type == "drug":
+            names[rows] = (stem[rows] + pick(DRUG_ENDINGS, ranks[rows] // 7)).to_numpy()
+        elif entity_type == "desease":
+            names[rows] = (stem[rows].str.capitalize() + pick(DISEASE_ENDINGS, ranks[rows] // 7)).to_numpy()
+        else:
+            names[rows] = pick(AMINO_ACIDS, ranks[rows]) + (ranks[rows] % 500 + 1).astype(str).astype(object) + pick(AMINO_ACIDS, ranks[rows] // 20)
+    return names
+
+
+def mutation_notation(part):
+    """(NormalizedName, Mention) in tmVar notation for the drawn mutation fields"""
+    protein = (part["MutationType"] == "ProteinMutation").to_numpy()
+    snp = (part["MutationType"] == "SNP").to_numpy()
+    change = part["change"].to_numpy()
+    position = part["position"].to_numpy()
+    position = np.where(part["upstream"].to_numpy() & ~protein, -position, position).astype(str)
+    ref = np.where(protein, AMINO_ACIDS[part["ref"].to_numpy()], BASES[part["ref"].to_numpy() % 4])
+    alt = np.where(protein, AMINO_ACIDS[part["alt"].to_numpy()], BASES[part["alt"].to_numpy() % 4])
+    seq = np.where(protein, "p", "c")
+
+    names = pd.Series(seq, dtype=object) + "|" + change + "|"
+    names = names + np.select([np.isin(change, ["SUB", "FS"]), change == "DEL"],
+                              [pd.Series(ref) + "|" + position + "|" + alt, pd.Series(position) + "|" + ref],
+                              pd.Series(position) + "|" + alt)
+    rs = part["rs"].to_numpy()
+    names = names.where(~((rs > 0) & (change == "SUB")), names + ";RS#:" + rs.astype(str))
+
+    three = pd.Series(ref).map(THREE_LETTER).fillna(pd.Series(ref))
+    style = part["style"].to_numpy()
+    texts = np.select(
+        [change == "SUB", change == "DEL", change == "INS", change == "FS"],
+        [np.where((style == 0) & protein, pd.Series(three) + "-" + position + " to " + pd.Series(alt).map(THREE_LETTER).fillna(pd.Series(alt)),
+                  pd.Series(ref) + position + alt),
+         pd.Series(position) + " delta", pd.Series(position) + "ins" + alt, pd.Series(ref) + position + "fs"],
+        pd.Series(position) + "dup" + alt)
+    rs_names = "RS" + pd.Series(rs.clip(min=1000)).astype(str)
+    return np.where(snp, rs_names, names), np.where(snp, rs_names, texts)
+
+
+def generate(rows, output, seed=0, tables=None):
+    """Write the synthetic tables (all by default) with `rows` rows each to output/; returns {file name: seconds}"""
+    os.makedirs(output, exist_ok=True)
+    pkg = SyntheticPKG(rows, seed)
+    timings = {}
+    for table, filename in TABLES.items():
+        if tables and table not in tables:
+            continue
+        start = time.time()
+        frame, to_rows = getattr(pkg, f"table_{table.lower()}")()
+        path = os.path.join(output, filename)
+        with open(path, "w", newline="") as f:
+            for first in range(0, len(frame), WRITE_CHUNK):
+                to_rows(frame.iloc[first:first + WRITE_CHUNK]).to_csv(f, header=(first == 0), index=False)
+        timings[filename] = time.time() - start
+        print(f"  {filename:<34} {len(frame):>10,} rows {os.path.getsize(path) / 2**20:>9.1f} MB {timings[filename]:>7.1f}s")
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic PKG2020 OA01-OA07 tables at a given scale")
+    parser.add_argument("--rows", type=int, required=True, help="rows per table, e.g. 10000 to 10000000")
+    parser.add_argument("--output", required=True, help="directory for the CSVs (then set PKG2020_DATA_DIR to it)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tables", nargs="+", choices=list(TABLES), default=None, help="only these tables (default: all)")
+    args = parser.parse_args()
+
+    print(f"Generating {args.rows:,} rows per table into {args.output} (seed {args.seed})")
+    generate(args.rows, args.output, args.seed, args.tables)
@@ -0,0 +1,188 @@
+"""
+PKG2020 Term Dictionary - Integer IDs for IRIs and Repeated Literals
+PURPOSE: Long IRIs (…ontology.owl#Authorship_30941_6192779) and literals such as entityType "gene" repeat across millions of triples;
+         a bidirectional term <-> int32 map lets ingestion, export and local lookups work on integer ids and decode strings only at output.
+HOW: Terms are N-Triples terms ("<iri>", '"value"^^<datatype>', "_:n"), so a decoded id is ready to print. Columns are encoded with one
+     dictionary lookup per distinct value (pd.factorize). Triples are (n, 3) int32 arrays; match() answers triple patterns with numpy masks.
+FILE FORMAT: b"PKGTERMS", uint64 count, uint64 offsets[count + 1], UTF-8 blob, padding to 8 bytes, uint64 sorted term
+     hashes[count], int32 ids[count] - memory-mapped on load, so opening it costs no parsing; a term is found by bisecting its
+     hash (np.searchsorted) in the mapped index, and only saving decodes every term.
+USAGE: python term_dictionary.py --decode pkg2020_triples.npy [--terms pkg2020_terms.dict] [--output pkg2020_decoded.nt]
+"""
+from stage_store import OWL_DIR
+import numpy as np
+import pandas as pd
+import argparse
+import os
+
+MAGIC = b"PKGTERMS"
+MAX_ID = np.iinfo(np.int32).max
+TERMS_FILE = "pkg2020_terms.dict"
+TRIPLES_FILE = "pkg2020_triples.npy"
+
+
+def term_hashes(terms):
+    """64-bit hashes of a list of terms (pd.util.hash_array: the same on every run, unlike hash())"""
+    return pd.util.hash_array(np.asarray(terms, dtype=object), categorize=False)
+
+
+class TermDictionary:
+    """Bidirectional N-Triples term <-> int32 id map: the terms of a loaded file stay memory-mapped (ids below _base), terms
+    added since live in a list and a dict"""
+
+    def __init__(self, terms=()):
+        self._terms = []
+        self._ids = {}
+        self._base = 0
+        self._offsets = self._blob = self._hashes = self._order = None
+        for term in terms:
+            self.encode(term)
+
+    def __len__(self):
+        return self._base + len(self._terms)
+
+    def _index(self):
+        """(sorted hashes of the mapped terms, their ids in that order); a file saved without them is hashed once, in memory"""
+        if self._hashes is None:
+            hashes = term_hashes([self.term(i) for i in range(self._base)])
+            self._order = np.argsort(hashes, kind="stable").astype(np.int32)
+            self._hashes = hashes[self._order]
+        return self._hashes, self._order
+
+    def _mapped_ids(self, terms):
+        """Ids of terms in the mapped file, -1 where absent: each hash is bisected in the sorted index, and the terms under
+        it compared"""
+        found = np.full(len(terms), -1, dtype=np.int64)
+        if not self._base or not len(terms):
+            return found
+        hashes, order = self._index()
+        wanted = term_hashes(terms)
+        lo, hi = np.searchsorted(hashes, wanted), np.searchsorted(hashes, wanted, side="right")
+        for k in np.flatnonzero(hi > lo).tolist():
+            for term_id in order[lo[k]:hi[k]].tolist():
+                if self.term(term_id) == terms[k]:
+                    found[k] = term_id
+                    break
+        return found
+
+    def _add(self, term):
+        """Id of a term not in the mapped file, added if new"""
+        term_id = self._ids.get(term)
+        if term_id is None:
+            term_id = len(self)
+            if term_id > MAX_ID:
+                raise OverflowError("Term dictionary is full (int32 ids)")
+            self._terms.append(term)
+            self._ids[term] = term_id
+        return term_id
+
+    def encode(self, term):
+        """Id of a term, added if new"""
+        term_id = int(self._mapped_ids([term])[0])
+        return term_id if term_id >= 0 else self._add(term)
+
+    def encode_series(self, values):
+        """int32 ids of a column of terms; each distinct term is looked up once"""
+        codes, uniques = pd.factorize(values)
+        uniques = list(uniques)
+        ids = self._mapped_ids(uniques)
+        for k in np.flatnonzero(ids < 0).tolist():
+            ids[k] = self._add(uniques[k])
+        return ids.astype(np.int32)[codes]
+
+    def lookup(self, term):
+        """Id of a known term, or None (never adds)"""
+        term_id = int(self._mapped_ids([term])[0])
+        return term_id if term_id >= 0 else self._ids.get(term)
+
+    def term(self, term_id):
+        if term_id >= self._base:
+            return self._terms[term_id - self._base]
+        return bytes(self._blob[self._offsets[term_id]:self._offsets[term_id + 1]]).decode("utf-8")
+
+    def decode(self, ids):
+        """Terms of an id array (object array of str); each distinct id is decoded once"""
+        uniques, inverse = np.unique(np.asarray(ids), return_inverse=True)
+        terms = np.empty(len(uniques), dtype=object)
+        mapped = uniques < self._base
+        if mapped.any():
+            # Slice the mapped blob through a memoryview: numpy slicing per term costs more than the decoding itself
+            blob = memoryview(self._blob)
+            starts, ends = self._offsets[uniques[mapped]].tolist(), self._offsets[uniques[mapped] + 1].tolist()
+            terms[mapped] = [str(blob[start:end], "utf-8") for start, end in zip(starts, ends)]
+        if not mapped.all():
+            terms[~mapped] = [self._terms[i - self._base] for i in uniques[~mapped].tolist()]
+        return terms[inverse].reshape(np.shape(ids))
+
+    def save(self, path):
+        """Write every term (the full scan that decodes the mapped ones), then the sorted hash index load() maps for lookups"""
+        terms = [self.term(i) for i in range(self._base)] + self._terms
+        encoded = [term.encode("utf-8") for term in terms]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        hashes = term_hashes(terms)
+        order = np.argsort(hashes, kind="stable")
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(np.uint64(len(encoded)).tobytes())
+            f.write(offsets.tobytes())
+            for b in encoded:
+                f.write(b)
+            f.write(b"\0" * (-f.tell() % 8))
+            f.write(hashes[order].tobytes())
+            f.write(order.astype(np.int32).tobytes())
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map a saved dictionary; terms are decoded on access and looked up through the mapped hash index"""
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a PKG2020 term dictionary")
+            count = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+        dictionary = cls()
+        dictionary._base = count
+        header = len(MAGIC) + 8
+        dictionary._offsets = np.memmap(path, dtype=np.uint64, mode="r", offset=header, shape=(count + 1,))
+        blob_size = int(dictionary._offsets[-1])
+        if blob_size:
+            dictionary._blob = np.memmap(path, dtype=np.uint8, mode="r", offset=header + 8 * (count + 1), shape=(blob_size,))
+        else:
+            dictionary._blob = np.zeros(0, dtype=np.uint8)
+        # Files written before the index was added end with the blob; _index() hashes their terms on the first lookup
+        index = header + 8 * (count + 1) + blob_size
+        index += -index % 8
+        if count and os.path.getsize(path) >= index + 12 * count:
+            dictionary._hashes = np.memmap(path, dtype=np.uint64, mode="r", offset=index, shape=(count,))
+            dictionary._order = np.memmap(path, dtype=np.int32, mode="r", offset=index + 8 * count, shape=(count,))
+        return dictionary
+
+
+def match(triples, s=None, p=None, o=None):
+    """Rows of an (n, 3) id array matching a triple pattern; None is a wildcard"""
+    mask = np.ones(len(triples), dtype=bool)
+    for column, term_id in enumerate((s, p, o)):
+        if term_id is not None:
+            mask &= triples[:, column] == term_id
+    return triples[mask]
+
+
+def write_ntriples(f, triples, dictionary, block_size=1000000):
+    """Decode id triples to N-Triples lines, one block at a time"""
+    for start in range(0, len(triples), block_size):
+        terms = dictionary.decode(triples[start:start + block_size])
+        lines = pd.Series(terms[:, 0]) + " " + terms[:, 1] + " " + terms[:, 2] + " .\n"
+        f.write("".join(lines).encode("utf-8"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Decode an encoded triple array back to N-Triples")
+    parser.add_argument("--decode", default=TRIPLES_FILE, help="(n, 3) int32 .npy triple array in owl/")
+    parser.add_argument("--terms", default=TERMS_FILE, help="term dictionary in owl/")
+    parser.add_argument("--output", default="pkg2020_decoded.nt", help="output file name, written to owl/")
+    args = parser.parse_args()
+
+    dictionary = TermDictionary.load(os.path.join(OWL_DIR, args.terms))
+    triples = np.load(os.path.join(OWL_DIR, args.decode), mmap_mode="r")
+    with open(os.path.join(OWL_DIR, args.output), "wb") as f:
+        write_ntriples(f, triples, dictionary)
+    print(f"Decoded {len(triples):,} triples ({len(dictionary):,} terms) -> {args.output}")
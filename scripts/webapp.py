@@ -2,7 +2,8 @@
 PKG2020 Knowledge Graph Web Application - Flask + GraphDB Integration (BONUS)
 PURPOSE: Interactive web dashboard for exploring the biomedical knowledge graph with live SPARQL queries and D3.js visualization.
 HOW: Flask backend proxies authenticated SPARQL queries to GraphDB Sandbox, serves HTML/JS frontend with graph explorer and query builder.
-ENDPOINTS: / (dashboard), /sparql (raw SPARQL), /api/query (execute query), /api/stats (graph statistics), /api/competency-queries (15 CQs).
+ENDPOINTS: / (dashboard), /sparql (raw SPARQL), /api/query (execute query), /api/stats (graph statistics), /api/competency-queries (15 CQs),
+           /api/triples (triple patterns answered from the local owl/pkg2020_final.pkgsnap snapshot, see rdf_snapshot.py).
 VISUALIZATION: D3.js force-directed graph showing 23 classes and their relationships, interactive query results table, entity statistics.
 DEPLOYMENT: Configured for Heroku (Procfile), connects to GraphDB at https://x1327f4041a654297998.sandbox.graphwise.ai/repositories/KRR-Project.
 """
@@ -181,6 +182,39 @@ def run_query():
     except Exception as e:
         return jsonify({"error": str(e), "columns": [], "rows": []})
 
+# ============================================================
+# LOCAL SNAPSHOT LOOKUPS (no GraphDB round trip)
+# ============================================================
+SNAPSHOT = None
+
+def local_snapshot():
+    """The memory-mapped graph snapshot (convert_to_ttl.py --format snapshot), opened once; None if there is none"""
+    global SNAPSHOT
+    if SNAPSHOT is None:
+        from rdf_snapshot import Snapshot, SNAPSHOT_FILE
+        from stage_store import OWL_DIR
+        path = os.environ.get("PKG2020_SNAPSHOT", os.path.join(OWL_DIR, SNAPSHOT_FILE))
+        if os.path.exists(path):
+            SNAPSHOT = Snapshot.open(path)
+    return SNAPSHOT
+
+@app.route('/api/triples')
+def get_triples():
+    """Triple-pattern lookup (?s=&p=&o=, N-Triples terms or bare IRIs) against the local snapshot"""
+    snapshot = local_snapshot()
+    if snapshot is None:
+        return jsonify({"error": "No local snapshot (run convert_to_ttl.py --format snapshot)", "triples": []}), 404
+    pattern = [request.args.get(key) or None for key in ("s", "p", "o")]
+    limit = request.args.get('limit', default=100, type=int)
+    try:
+        return jsonify({
+            "count": snapshot.count(*pattern),
+            "triples": [list(triple) for triple in snapshot.triples(*pattern, limit=limit)],
+            "source": os.path.basename(snapshot.path)
+        })
+    except Exception as e:
+        return jsonify({"error": str(e), "triples": []}), 400
+
 # ============================================================
 # RAW SPARQL ENDPOINT (for direct access)
 # ============================================================
@@ -0,0 +1,106 @@
+"""
+Shared fixtures: a T-Box generated once per session, a small synthetic data drop, and a runner for the scripts/ entry points
+that points them at a temporary owl/ and data/ directory (PKG2020_OWL_DIR, PKG2020_DATA_DIR), so no test touches the repo's.
+"""
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.join(os.path.dirname(TESTS_DIR), "scripts")
+sys.path.insert(0, SCRIPTS_DIR)
+
+DROP_ROWS = 1500
+STORE_ROWS = 300
+# Literals every exporter has to escape, added to the store fixture's graph (argv[1])
+ESCAPES = """
+import sys
+from owlready2 import World, locstr
+from stage_store import ONTOLOGY_IRI
+world = World(filename=sys.argv[1])
+onto = world.get_ontology(ONTOLOGY_IRI).load()
+author = onto.Author("Author_escapes")
+author.lastName = ['Quote " backslash \\\\ tab \\t newline \\n carriage \\r end']
+author.foreName = [locstr("Müller 𝄞", lang="de"), "plain"]
+world.save()
+"""
+# Settings of the developer's shell that would leak into the runs
+PIPELINE_ENV = ["PKG2020_STORE", "PKG2020_COLUMNAR", "PKG2020_CHECKPOINT_EVERY", "PKG2020_PROFILE"]
+
+
+@pytest.fixture(scope="session")
+def tbox_dir(tmp_path_factory):
+    """owl/ with pkg2020_core.owl and pkg2020_constrained.owl, built by their scripts (which write to ../owl)"""
+    root = tmp_path_factory.mktemp("tbox")
+    os.makedirs(root / "owl")
+    os.makedirs(root / "run")
+    for script in ["ontology_core.py", "ontology_constraints.py"]:
+        subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, script)], cwd=root / "run", check=True,
+                       stdout=subprocess.DEVNULL)
+    return root / "owl"
+
+
+@pytest.fixture(scope="session")
+def drop_dir(tmp_path_factory):
+    """The seven OA0x tables, DROP_ROWS synthetic rows each"""
+    import synthetic_data
+    directory = tmp_path_factory.mktemp("drop")
+    synthetic_data.generate(DROP_ROWS, str(directory), seed=0)
+    return directory
+
+
+@pytest.fixture
+def owl_dir(tmp_path, tbox_dir):
+    """A fresh owl/ directory holding the T-Box"""
+    directory = tmp_path / "owl"
+    shutil.copytree(tbox_dir, directory)
+    return directory
+
+
+@pytest.fixture
+def run(owl_dir):
+    """run(script, *args, data=DIR): a scripts/ entry point in a subprocess, on owl_dir (and the data in DIR) - or, with
+    code=, that Python source run with args as sys.argv[1:]; returns the CompletedProcess (stdout and stderr together) and
+    fails the test on a non-zero exit unless check=False"""
+    def run_script(script, *args, data=None, check=True, code=None):
+        env = {name: value for name, value in os.environ.items() if name not in PIPELINE_ENV + ["PKG2020_DATA_DIR"]}
+        env["PKG2020_OWL_DIR"] = str(owl_dir)
+        if data is not None:
+            env["PKG2020_DATA_DIR"] = str(data)
+        command = [sys.executable, "-c", code, *map(str, args)] if code else [sys.executable, script, *map(str, args)]
+        result = subprocess.run(command, cwd=SCRIPTS_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                text=True)
+        if check and result.returncode != 0:
+            pytest.fail(f"{script} {' '.join(map(str, args))} exited with {result.returncode}:\n{result.stdout[-5000:]}")
+        return result
+    return run_script
+
+
+@pytest.fixture
+def store(tmp_path, drop_dir, run):
+    """A small pipeline store: STORE_ROWS rows of authors / articles and bio-entities, plus an Author with ESCAPES literals"""
+    path = tmp_path / "store.sqlite3"
+    for script in ["populate_authors_articles.py", "populate_bioentities.py"]:
+        run(script, "--store", path, "--nrows", STORE_ROWS, data=drop_dir)
+    run(None, path, code=ESCAPES)
+    return path
+
+
+def store_triples(path):
+    """Every triple of a pipeline store as IRIs and literal values (blank nodes all read _:b: storids are file-local)"""
+    db = sqlite3.connect(path)
+    iris = dict(db.execute("SELECT storid, iri FROM resources"))
+    name = lambda storid: iris.get(storid, "_:b") if storid > 0 else "_:b"
+    triples = {(name(s), name(p), name(o)) for s, p, o in db.execute("SELECT s, p, o FROM objs")}
+    triples |= {(name(s), name(p), repr(o), d) for s, p, o, d in db.execute("SELECT s, p, o, d FROM datas")}
+    db.close()
+    return triples
+
+
+@pytest.fixture
+def triples():
+    return store_triples
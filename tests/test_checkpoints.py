@@ -0,0 +1,54 @@
+"""checkpoints.py: a build that crashes mid-stage and is resumed holds the same triples as one that never crashed"""
+import sqlite3
+
+import pytest
+
+# run_pipeline.py with a stage that dies after ingesting two chunks of one of its inputs
+CRASHING_RUN = """
+import runpy
+import {module} as stage
+
+load_data = stage.load_data
+
+def crash(frames):
+    for number, df in enumerate(frames):
+        if number == 2:
+            raise RuntimeError("killed mid-stage")
+        yield df
+
+def crashing_load_data(chunk_size=None, nrows=None):
+    data = load_data(chunk_size, nrows)
+    if not isinstance(data, tuple):
+        return crash(data)
+    return tuple(crash(frames) if number == {position} else frames for number, frames in enumerate(data))
+
+stage.load_data = crashing_load_data
+runpy.run_path("run_pipeline.py", run_name="__main__")
+"""
+
+
+# (stage, its module, the input it crashes in, that input's position in load_data()); OA03 joins to the OA02 rows the
+# crashed run committed
+@pytest.mark.parametrize("stage, module, table, position", [
+    ("employment", "populate_employment", "OA05_Researcher_Employment.csv", 0),
+    ("bioentities", "populate_bioentities", "OA03_Bio_entities_Mutation.csv", 1),
+])
+def test_resumed_build_matches_uninterrupted_build(tmp_path, drop_dir, run, triples, stage, module, table, position):
+    resumed, clean = tmp_path / "resumed.sqlite3", tmp_path / "clean.sqlite3"
+    options = ["--nrows", 0, "--checkpoint-every", 300, "--no-cache"]
+
+    crash = run(None, "--store", resumed, *options, data=drop_dir, check=False,
+                code=CRASHING_RUN.format(module=module, position=position))
+    assert crash.returncode != 0 and "killed mid-stage" in crash.stdout
+    db = sqlite3.connect(resumed)
+    progress = {(stage, input): (rows, complete) for stage, input, rows, complete in
+                db.execute("SELECT stage, input, rows, complete FROM ingest_checkpoints")}
+    db.close()
+    assert progress["authors", "OA01_Author_List.csv"][1] and progress[stage, table] == (600, 0)
+
+    result = run("run_pipeline.py", "--store", resumed, "--nrows", 0, "--resume", data=drop_dir)
+    assert "Skipping authors: completed before the interruption" in result.stdout
+    assert f"600 rows of {table}" in result.stdout
+
+    run("run_pipeline.py", "--store", clean, *options, data=drop_dir)
+    assert triples(resumed) == triples(clean)
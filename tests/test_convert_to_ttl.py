@@ -0,0 +1,74 @@
+"""convert_to_ttl.py: the streamed Turtle and N-Triples exports of a store parse back to the same graph"""
+import gzip
+import json
+
+import pytest
+import rdflib
+from rdflib import Literal, URIRef, XSD
+from rdflib.compare import isomorphic
+
+from convert_to_ttl import file_sha256
+
+PKG = "http://example.org/pkg2020/ontology.owl#"
+
+
+def graph(path, format):
+    """path parsed with rdflib (gzip-compressed when it ends in .gz); xsd:string literals read as the plain literals they
+    are in RDF 1.1 (Turtle writes them plain, rdflib keeps the two apart)"""
+    g = rdflib.Graph()
+    data = gzip.decompress(path.read_bytes()) if path.suffix == ".gz" else path.read_bytes()
+    g.parse(data=data.decode("utf-8"), format=format)
+    plain = rdflib.Graph()
+    for s, p, o in g:
+        plain.add((s, p, Literal(str(o)) if isinstance(o, Literal) and o.datatype == XSD.string else o))
+    return plain
+
+
+def test_turtle_reloads_as_the_ntriples_export(store, owl_dir, run):
+    run("convert_to_ttl.py", "--store", store, "--format", "ntriples", "--output", "reference.nt")
+    # Small batches: a subject's ';' / ',' groups continue across fetches
+    run("convert_to_ttl.py", "--store", store, "--output", "graph.ttl", "--batch-size", 7)
+    run("convert_to_ttl.py", "--store", store, "--output", "graph.ttl", "--compress", "gzip")
+
+    reference = graph(owl_dir / "reference.nt", "nt")
+    assert len(reference) > 5000
+    author = URIRef(PKG + "Author_escapes")
+    escaped = Literal('Quote " backslash \\ tab \t newline \n carriage \r end')
+    assert escaped in set(reference.objects(author, URIRef(PKG + "lastName")))
+    assert Literal("Müller 𝄞", lang="de") in set(reference.objects(author, URIRef(PKG + "foreName")))
+    assert isomorphic(graph(owl_dir / "graph.ttl", "turtle"), reference)
+    assert isomorphic(graph(owl_dir / "graph.ttl.gz", "turtle"), reference)
+
+
+def test_ntriples_export_matches_owlready2(store, owl_dir, run):
+    """The streamed N-Triples are the lines OWLReady2's own serializer writes, in any order - except that a carriage return
+    in a literal is escaped, where OWLReady2 writes it as is"""
+    run("convert_to_ttl.py", "--store", store, "--format", "ntriples", "--output", "streamed.nt", "--batch-size", 100)
+    run("stage_store.py", "--store", store, "--export", "owlready2.nt", "--format", "ntriples")
+    streamed = (owl_dir / "streamed.nt").read_bytes().decode("utf-8").split("\n")
+    owlready2 = (owl_dir / "owlready2.nt").read_bytes().decode("utf-8").replace("\r", "\\r").split("\n")
+    assert sorted(streamed) == sorted(owlready2)
+
+
+@pytest.mark.parametrize("options", [["--shards", 3], ["--shard-by", "class", "--format", "ntriples", "--compress", "gzip"]])
+def test_shards_reload_as_the_single_export(store, owl_dir, run, options):
+    run("convert_to_ttl.py", "--store", store, "--format", "ntriples", "--output", "reference.nt")
+    run("convert_to_ttl.py", "--store", store, "--output", "graph.ttl", "--batch-size", 50, "--jobs", 2, *options)
+    directory = owl_dir / "graph_shards"
+    manifest = json.loads((directory / "manifest.json").read_text())
+
+    union, subjects = rdflib.Graph(), []
+    for entry in manifest["shards"]:
+        path = directory / entry["file"]
+        assert file_sha256(path) == entry["sha256"] and path.stat().st_size == entry["bytes"]
+        # Each shard loads on its own: the blank nodes it refers to are all in it
+        shard = graph(path, "nt" if ".nt" in path.name else "turtle")
+        assert len(shard) == entry["triples"]
+        union += shard
+        subjects.append({s for s in shard.subjects() if isinstance(s, URIRef)})
+    names = [entry["shard"] for entry in manifest["shards"]]
+    assert names == ["0", "1", "2"] if "--shards" in options else {"authors", "articles", "bioentities", "other"} <= set(names)
+    assert manifest["triples"] == len(union)
+    # A subject's triples never span two shards
+    assert sum(len(s) for s in subjects) == len(set().union(*subjects))
+    assert isomorphic(union, graph(owl_dir / "reference.nt", "nt"))
@@ -0,0 +1,30 @@
+"""mutation_index.py: NormalizedName parsing and the stored index, missing names included"""
+import numpy as np
+import pandas as pd
+from owlready2 import World
+
+from mutation_index import MutationIndex, parse_normalized_names, FIELDS, INDEX_TABLE
+
+NAMES = ["p|SUB|T|14|V", None, "c|DEL|522_525|AG", np.nan, "1deltag", "p|SUB|T|14|V;RS#:121913529"]
+
+
+def test_missing_names_parse_as_all_null_fields():
+    parsed = parse_normalized_names(pd.Series(NAMES, index=range(10, 16), dtype=object))
+    assert list(parsed.index) == list(range(10, 16))
+    assert parsed.loc[10, ["seq_type", "change", "ref", "position", "alt"]].tolist() == ["p", "SUB", "T", 14, "V"]
+    for row in [11, 13, 14]:
+        assert parsed.loc[row, FIELDS].isna().all()
+    assert parsed.loc[12, "change"] == "DEL" and pd.isna(parsed.loc[12, "position"])
+    assert parsed.loc[15, "rs"] == 121913529
+
+
+def test_missing_names_are_stored_as_null():
+    onto = World().get_ontology("http://example.org/pkg2020/ontology.owl#")
+    index = MutationIndex(onto)
+    mutations = pd.Series([f"Mutation_{i}" for i in range(len(NAMES))])
+    index.record(mutations, pd.Series(NAMES, dtype=object))
+    stored = dict(index.db.execute(f"SELECT mutation, normalized_name FROM {INDEX_TABLE}"))
+    assert stored["Mutation_1"] is None and stored["Mutation_3"] is None
+    assert stored["Mutation_4"] == "1deltag"
+    assert index.db.execute(f"SELECT COUNT(*) FROM {INDEX_TABLE} WHERE change IS NOT NULL").fetchone()[0] == 3
+    assert index.lookup(10, 20)["mutation"].tolist() == ["Mutation_0", "Mutation_5"]
@@ -0,0 +1,47 @@
+"""rdf_snapshot.py: a snapshot of a store holds the N-Triples export's triples and answers every triple pattern like a scan"""
+import itertools
+
+import numpy as np
+
+from rdf_snapshot import Snapshot
+
+PKG = "http://example.org/pkg2020/ontology.owl#"
+
+
+def terms(line):
+    """(s, p, o) N-Triples terms of a line (subjects and predicates have no spaces)"""
+    s, p, o = line.split(" ", 2)
+    return s, p, o[:-len(" .")]
+
+
+def test_snapshot_matches_the_ntriples_export(store, owl_dir, run):
+    run("convert_to_ttl.py", "--store", store, "--format", "ntriples", "--output", "reference.nt")
+    run("convert_to_ttl.py", "--store", store, "--format", "snapshot", "--output", "graph.pkgsnap", "--batch-size", 500)
+    reference = [terms(line) for line in (owl_dir / "reference.nt").read_bytes().decode("utf-8").split("\n") if line]
+
+    snapshot = Snapshot.open(str(owl_dir / "graph.pkgsnap"))
+    try:
+        assert len(snapshot) == len(reference) and snapshot.count() == len(reference)
+        streamed = [triple for batch in snapshot.iter_triples(batch_size=1000) for triple in batch]
+        assert streamed == sorted(reference, key=lambda triple: [term.encode("utf-8") for term in triple])
+
+        # Every combination of bound and free positions, for a few triples (escaped and language-tagged literals included)
+        escapes = [triple for triple in reference if triple[0] == f"<{PKG}Author_escapes>"]
+        samples = escapes + reference[::max(1, len(reference) // 20)]
+        for triple in samples:
+            for bound in itertools.product([False, True], repeat=3):
+                pattern = [term if keep else None for term, keep in zip(triple, bound)]
+                expected = sorted(t for t in reference if all(value is None or value == term for value, term in zip(pattern, t)))
+                assert snapshot.count(*pattern) == len(expected)
+                assert sorted(snapshot.triples(*pattern)) == expected
+                ids = [None if value is None else snapshot.lookup(value) for value in pattern]
+                assert len(snapshot.match_ids(*ids)) == len(expected)
+
+        # Bare and prefixed IRIs are accepted; unknown terms match nothing
+        assert snapshot.count(f"{PKG}Author_escapes") == snapshot.count("pkg:Author_escapes") == len(escapes)
+        assert snapshot.lookup(f"<{PKG}Author_missing>") is None
+        assert snapshot.count(f"<{PKG}Author_missing>") == 0 and snapshot.triples(None, None, '"missing"') == []
+        ids = snapshot.match_ids(p=snapshot.lookup(f"<{PKG}lastName>"))
+        assert np.array_equal(snapshot.decode(ids)[:, 1], [f"<{PKG}lastName>"] * len(ids))
+    finally:
+        snapshot.close()
@@ -0,0 +1,19 @@
+"""sample_graph.py: a sample within the triple budget still answers every competency query the source answers"""
+import re
+
+import rdflib
+
+BUDGET = 20000
+
+
+def test_sample_answers_the_source_queries(tmp_path, drop_dir, owl_dir, run):
+    store = tmp_path / "store.sqlite3"
+    run("run_pipeline.py", "--store", store, "--nrows", 0, "--no-cache", data=drop_dir)
+    result = run("sample_graph.py", "--store", store, "--max-triples", BUDGET, "--format", "ntriples", "--check")
+
+    # --check exits with status 1 (failing run()) when a query answered on the source has no answer on the sample
+    answered = re.search(r"Competency queries with answers on the source: (\d+) of 15", result.stdout)
+    assert answered and int(answered.group(1)) >= 12
+    sample = rdflib.Graph()
+    sample.parse(owl_dir / "pkg2020_sample.nt", format="nt")
+    assert 0 < len(sample) <= BUDGET
@@ -0,0 +1,9 @@
+"""shard_pipeline.py: the merged export of a sharded build holds the same triples as one unsharded build (--check)"""
+import pytest
+
+
+@pytest.mark.parametrize("chunk_size", [None, 500])
+def test_sharded_build_matches_single_store(drop_dir, run, chunk_size):
+    chunks = ["--chunk-size", chunk_size] if chunk_size else []
+    result = run("shard_pipeline.py", "--shards", 3, "--jobs", 3, "--nrows", 0, "--check", *chunks, data=drop_dir)
+    assert "0 extra, 0 missing" in result.stdout
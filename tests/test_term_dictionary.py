@@ -0,0 +1,80 @@
+"""term_dictionary.py: N-Triples encoded to ids, saved, memory-mapped back and decoded give the source lines"""
+import io
+
+import numpy as np
+import pandas as pd
+
+from term_dictionary import TermDictionary, match, write_ntriples
+
+PKG = "http://example.org/pkg2020/ontology.owl#"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+SOURCE = [
+    (f"<{PKG}Author_1>", f"<{PKG}lastName>", f'"Smith"^^<{XSD}string>'),
+    (f"<{PKG}Author_1>", f"<{PKG}foreName>", f'"Anna \\"Annie\\"\\nline two\\\\"^^<{XSD}string>'),
+    (f"<{PKG}Author_2>", f"<{PKG}lastName>", '"Müller"@de'),
+    (f"<{PKG}Article_10>", f"<{PKG}writtenBy>", f"<{PKG}Author_1>"),
+    (f"<{PKG}Article_10>", f"<{PKG}writtenBy>", f"<{PKG}Author_2>"),
+    (f"<{PKG}Article_10>", f"<{PKG}hasPMID>", f'"10"^^<{XSD}integer>'),
+    ("_:n1", "<http://www.w3.org/2002/07/owl#onProperty>", f"<{PKG}writtenBy>"),
+]
+
+
+def ntriples(triples):
+    return "".join(f"{s} {p} {o} .\n" for s, p, o in triples).encode("utf-8")
+
+
+def encode(dictionary, triples):
+    frame = pd.DataFrame(triples)
+    return np.column_stack([dictionary.encode_series(frame[column]) for column in frame.columns])
+
+
+def test_saved_dictionary_decodes_to_the_source(tmp_path):
+    dictionary = TermDictionary()
+    triples = encode(dictionary, SOURCE)
+    dictionary.save(tmp_path / "terms.dict")
+    loaded = TermDictionary.load(tmp_path / "terms.dict")
+    assert len(loaded) == len(dictionary)
+
+    # Every term is found through the mapped hash index, under the id it was saved with
+    assert np.array_equal(encode(loaded, SOURCE), triples)
+    escaped = loaded.lookup(SOURCE[1][2])
+    assert escaped == dictionary.lookup(SOURCE[1][2]) and loaded.term(escaped) == SOURCE[1][2]
+
+    written = match(triples, p=loaded.lookup(f"<{PKG}writtenBy>"))
+    assert [tuple(row) for row in loaded.decode(written)] == SOURCE[3:5]
+    out = io.BytesIO()
+    write_ntriples(out, triples, loaded, block_size=3)
+    assert out.getvalue() == ntriples(SOURCE)
+
+
+def test_missing_terms_are_added_after_the_mapped_ones(tmp_path):
+    dictionary = TermDictionary()
+    triples = encode(dictionary, SOURCE)
+    dictionary.save(tmp_path / "terms.dict")
+    loaded = TermDictionary.load(tmp_path / "terms.dict")
+
+    missing = f"<{PKG}Author_3>"
+    assert loaded.lookup(missing) is None
+    extra = [(missing, f"<{PKG}lastName>", '"Tab\\there"^^<' + XSD + 'string>')]
+    added = encode(loaded, extra)
+    assert added[0, 0] == len(dictionary) and added[0, 1] == triples[0, 1]
+    assert loaded.lookup(missing) == len(dictionary)
+
+    out = io.BytesIO()
+    write_ntriples(out, np.vstack([triples, added]), loaded)
+    assert out.getvalue() == ntriples(SOURCE + extra)
+
+    # Saved again, the added terms are mapped too
+    loaded.save(tmp_path / "more.dict")
+    again = TermDictionary.load(tmp_path / "more.dict")
+    assert again.lookup(missing) == len(dictionary) and np.array_equal(encode(again, SOURCE + extra), np.vstack([triples, added]))
+
+
+def test_encoded_export_decodes_to_the_text_export(drop_dir, owl_dir, run):
+    run("direct_ntriples.py", "--nrows", 0, "--chunk-size", 500, "--output", "direct.nt", data=drop_dir)
+    run("direct_ntriples.py", "--nrows", 0, "--chunk-size", 500, "--encode", data=drop_dir)
+    run("term_dictionary.py", "--output", "decoded.nt")
+    decoded = (owl_dir / "decoded.nt").read_bytes().splitlines()
+    assert len(decoded) > 10000
+    assert sorted(decoded) == sorted((owl_dir / "direct.nt").read_bytes().splitlines())